@@ -0,0 +1,95 @@
+"""Streaming parser for the AMFI nav-history all_for_date payload.
+
+The payload is {"data": [{..., "schemes": [{..., "navs": [{NAV_Name, ...}]}]}]}
+covering every scheme in the industry. Instead of json.loads on the whole
+response, each chunk is searched (in C) for "NAV_Name": "..." pairs and the
+name is looked up in a set; only the flat NAV record around a wanted name is
+decoded, and reading stops once every wanted name has been seen. Memory is a
+chunk plus KEEP characters whatever the payload size.
+"""
+import codecs
+import json
+import re
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+CHUNK_SIZE = 64 * 1024
+# Scanned text kept in front of the next chunk; the record around a
+# NAV_Name key starts before the key and NAV records are well under 1 KB
+KEEP = 16 * 1024
+# Longest key/name pair that may be cut off at the end of a chunk
+OVERLAP = 1024
+
+# Possessive quantifiers (Python 3.11+) keep unterminated strings at the end
+# of the buffer from backtracking
+STRING = r'"(?:[^"\\]++|\\.)*+"'
+NAV_NAME = re.compile(rf'"NAV_Name"\s*:\s*({STRING})')
+# Text up to the next brace outside a string (stops at an incomplete string)
+RUN = re.compile(rf'(?:[^{{}}"]++|{STRING})*+')
+
+
+def _record_at(buf: str, key: int) -> Optional[Dict]:
+    """The flat object holding the NAV_Name key at buf[key]; None when the
+    buffer ends inside it, {} when it cannot be decoded"""
+    end = RUN.match(buf, key).end()
+    if end >= len(buf) or buf[end] == '"':
+        return None
+    # The nearest '{' before the key may sit inside an earlier string value
+    start = buf.rfind('{', 0, key)
+    while start >= 0:
+        try:
+            record = json.loads(buf[start:end + 1])
+            if isinstance(record, dict):
+                return record
+        except ValueError:
+            pass
+        start = buf.rfind('{', 0, start)
+    return {}
+
+
+def find_navs(chunks: Iterable[Union[bytes, str]], names: Iterable[str],
+              stop_early: bool = True) -> Dict[str, Dict]:
+    """NAV record per wanted NAV_Name.
+
+    names becomes a set, so each NAV costs one hash lookup and records for
+    other schemes are never decoded. With stop_early the rest of the stream
+    is left unread once all names are found (the first record per name wins).
+    """
+    wanted = set(names)
+    found: Dict[str, Dict] = {}
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buf = ''
+    # buf[:scanned] has been searched for NAV_Name keys
+    scanned = 0
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        drop = max(0, scanned - KEEP)
+        buf = buf[drop:] + chunk
+        scanned -= drop
+
+        for match in NAV_NAME.finditer(buf, scanned):
+            raw = match.group(1)
+            name = raw[1:-1] if '\\' not in raw else json.loads(raw)
+            if name in wanted:
+                record = _record_at(buf, match.start())
+                if record is None:
+                    # Finish the record with the next chunk
+                    break
+                if record and name not in found:
+                    found[name] = record
+                    if stop_early and len(found) == len(wanted):
+                        return found
+            scanned = match.end()
+        else:
+            # A key cut off at the end is searched again with the next chunk
+            scanned = max(scanned, len(buf) - OVERLAP)
+    return found
+
+
+def iter_file(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,246 @@
+"""Benchmark suite for iv_calculator on synthetic Black-76 chains.
+
+Chains of 20, 200, 2,000 and 20,000 strikes (+/- 5% around the future, a
+known smile) are priced exactly and fed back through:
+
+    construction            CalcIvGreeks(...) per strike
+    get_tte[<DayCountType>] one get_tte() per strike, each day count
+    time_to_expiry[...]     vectorized TTE for an array of expiries
+    Call/PutImplVol         scalar brentq per strike
+    GetImpVolAndGreeks      scalar IV + Greeks per strike
+    implied_vol_chain       vectorized chain solver
+    GetGreeksChain          vectorized chain Greeks
+    calculate_iv_for_dataframe  the nifty_options path, DataFrame in, IVs out
+
+Each result has the best wall time over --repeat runs, throughput
+(strikes/sec), peak traced memory (a separate tracemalloc run) and, for the
+IV paths, the max/median error against the known vols in vol points.
+Per-strike scalar paths are timed on at most --scalar-limit strikes.
+Results go to a JSON file; --compare prints speedups against an older one.
+
+    python Scripts/bench_iv.py [--sizes 20 200 2000 20000] [--output bench_iv.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import scipy
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import iv_calculator
+from benchmark import best_of, write_report
+from iv_calculator import (
+    CalcIvGreeks,
+    DayCountType,
+    black76_price_and_vega,
+    implied_vol_chain,
+    time_to_expiry,
+)
+from nifty_options import calculate_iv_for_dataframe
+
+FUTURE = 25000.0
+
+
+def make_chain(strikes, days=7, width=0.05):
+    """Exact Black-76 prices for a smile around FUTURE with known vols"""
+    now = datetime.now().replace(microsecond=0)
+    expiry = (now + timedelta(days=days)).replace(hour=15, minute=30, second=0)
+    T = CalcIvGreeks(FUTURE, FUTURE, 100, 100, expiry, FromDateTime=now).T
+    K = np.round(np.linspace(FUTURE * (1 - width), FUTURE * (1 + width), strikes), 2)
+    vols = 0.12 + 0.4 * np.log(K / FUTURE) ** 2
+    isCall = np.ones(strikes, dtype=bool)
+    calls, _ = black76_price_and_vega(FUTURE, K, T, vols, isCall)
+    puts, _ = black76_price_and_vega(FUTURE, K, T, vols, ~isCall)
+    atm = int(np.argmin(np.abs(K - FUTURE)))
+    return {
+        "now": now, "expiry": expiry, "T": T, "K": K, "vols": vols,
+        "calls": calls, "puts": puts,
+        "atm": (float(K[atm]), float(calls[atm]), float(puts[atm])),
+        # Below the 5 paisa floor the solver cannot recover the vol
+        "recoverable": (np.where(K >= FUTURE, calls, puts) > 0.05),
+    }
+
+
+def otm(chain, callValues, putValues):
+    return np.where(chain["K"] >= FUTURE, callValues, putValues)
+
+
+def iv_error(chain, ivs, idx=slice(None)):
+    """Max and median |IV - known vol| in vol points over recoverable strikes"""
+    mask = chain["recoverable"][idx]
+    err = np.abs(np.asarray(ivs, dtype=float)[mask] - chain["vols"][idx][mask]) * 100
+    if err.size == 0:
+        return None, None
+    return float(np.max(err)), float(np.median(err))
+
+
+def calculator(chain, dayCountType=DayCountType.CALENDARDAYS):
+    K0, C0, P0 = chain["atm"]
+    return CalcIvGreeks(
+        FUTURE, K0, C0, P0, chain["expiry"],
+        FromDateTime=chain["now"], dayCountType=dayCountType,
+    )
+
+
+def cases(chain, scalarLimit):
+    """(name, strikes timed, fn) where fn returns IVs (or None) for the timed strikes"""
+    n = len(chain["K"])
+    m = min(n, scalarLimit)
+    # Spread the scalar sample over the whole chain
+    sample = np.linspace(0, n - 1, m).astype(int)
+    K0, C0, P0 = chain["atm"]
+
+    def construction():
+        for i in sample:
+            CalcIvGreeks(
+                FUTURE, K0, C0, P0, chain["expiry"],
+                StrikePrice=chain["K"][i],
+                StrikeCallPrice=chain["calls"][i],
+                StrikePutPrice=chain["puts"][i],
+                FromDateTime=chain["now"],
+            )
+
+    def get_tte(dayCountType):
+        calc = calculator(chain, dayCountType)
+        def run():
+            for _ in sample:
+                calc.get_tte()
+        return run
+
+    def vector_tte(dayCountType):
+        expiries = np.datetime64(chain["expiry"].date(), "D") + (np.arange(n) % 400)
+        def run():
+            time_to_expiry(chain["now"], expiries, dayCountType)
+        return run
+
+    def scalar_iv():
+        calc = calculator(chain)
+        calls, puts = [], []
+        for i in sample:
+            calc.K = float(chain["K"][i])
+            calc.C = max(float(chain["calls"][i]), 0.05)
+            calc.P = max(float(chain["puts"][i]), 0.05)
+            calls.append(calc.CallImplVol())
+            puts.append(calc.PutImplVol())
+        return np.where(chain["K"][sample] >= FUTURE, calls, puts)
+
+    def scalar_greeks():
+        calc = calculator(chain)
+        ivs = []
+        for i in sample:
+            result = calc.GetImpVolAndGreeks(
+                float(chain["K"][i]), float(chain["calls"][i]), float(chain["puts"][i])
+            )
+            ivs.append(result["ImplVol"] / 100)
+        return np.array(ivs)
+
+    def chain_iv():
+        callIV, putIV = implied_vol_chain(FUTURE, chain["T"], chain["K"], chain["calls"], chain["puts"])
+        return otm(chain, callIV, putIV)
+
+    def chain_greeks():
+        calculator(chain).GetGreeksChain(chain["K"], chain["vols"], FromDateTime=chain["now"])
+
+    frame = pd.DataFrame({
+        "STRIKE": chain["K"].tolist(),
+        "CALL LTP": chain["calls"].tolist(),
+        "PUT LTP": chain["puts"].tolist(),
+    })
+
+    def dataframe_iv():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ivs = calculate_iv_for_dataframe(frame, FUTURE, chain["expiry"])
+        return np.array([iv / 100 if iv != "" else np.nan for iv in ivs])
+
+    yield "construction", sample, construction
+    for dayCountType in DayCountType:
+        yield f"get_tte[{dayCountType.name}]", sample, get_tte(dayCountType)
+        yield f"time_to_expiry[{dayCountType.name}]", slice(None), vector_tte(dayCountType)
+    yield "Call/PutImplVol", sample, scalar_iv
+    yield "GetImpVolAndGreeks", sample, scalar_greeks
+    yield "implied_vol_chain", slice(None), chain_iv
+    yield "GetGreeksChain", slice(None), chain_greeks
+    yield "calculate_iv_for_dataframe", slice(None), dataframe_iv
+
+
+def measure(fn, repeat):
+    best, result = best_of(fn, repeat)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def run(sizes, repeat, scalarLimit):
+    results = []
+    for size in sizes:
+        chain = make_chain(size)
+        for name, idx, fn in cases(chain, scalarLimit):
+            timed = size if isinstance(idx, slice) else len(idx)
+            seconds, peak, ivs = measure(fn, repeat)
+            errMax, errMedian = iv_error(chain, ivs, idx) if ivs is not None else (None, None)
+            results.append({
+                "strikes": size,
+                "benchmark": name,
+                "strikes_timed": timed,
+                "seconds": seconds,
+                "strikes_per_sec": timed / seconds if seconds > 0 else None,
+                "peak_mem_kb": round(peak / 1024, 1),
+                "iv_err_max_volpts": errMax,
+                "iv_err_median_volpts": errMedian,
+            })
+            print(f"{size:>6} {name:36} {timed:>6} {seconds * 1000:>10.2f}ms "
+                  f"{timed / seconds if seconds > 0 else float('inf'):>12.0f}/s "
+                  f"{peak / 1024:>9.1f}KB "
+                  f"{'' if errMax is None else f'{errMax:.2e}':>9}")
+    return results
+
+
+def compare(results, path):
+    with open(path) as f:
+        old = {(r["strikes"], r["benchmark"]): r for r in json.load(f)["results"]}
+    print(f"\nSpeedup vs {path} (old time / new time, per strike timed)")
+    for r in results:
+        before = old.get((r["strikes"], r["benchmark"]))
+        if before and r["strikes_per_sec"] and before["strikes_per_sec"]:
+            ratio = r["strikes_per_sec"] / before["strikes_per_sec"]
+            print(f"{r['strikes']:>6} {r['benchmark']:36} {ratio:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000, 20000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scalar-limit", type=int, default=2000)
+    parser.add_argument("--output", default="bench_iv.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare with")
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'benchmark':36} {'timed':>6} {'best':>12} "
+          f"{'throughput':>14} {'peak mem':>11} {'IV err':>9}")
+    results = run(args.sizes, args.repeat, args.scalar_limit)
+
+    write_report(
+        args.output, results,
+        numpy=np.__version__, scipy=scipy.__version__, pandas=pd.__version__,
+        norm_backend=next(
+            name for name, fns in iv_calculator.NORM_BACKENDS.items()
+            if fns[0] is iv_calculator.NORM_CDF
+        ),
+        repeat=args.repeat, scalar_limit=args.scalar_limit,
+    )
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
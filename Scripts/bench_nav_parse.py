@@ -0,0 +1,168 @@
+"""Parse time and peak RSS: AMFI all_for_date payload, json.loads vs streaming.
+
+Each approach runs in a fresh interpreter against a payload file:
+
+    json.loads          what nav_fetch did: the whole body decoded, then the
+                        data/schemes/navs loops with a list lookup per NAV
+    stream (early exit) amfi_stream.find_navs, stops after the last tracked fund
+    stream (full scan)  same with one name that is not in the payload, so the
+                        whole file is read
+
+--fixture points at a recorded payload; when the file does not exist a
+synthetic one of full size (--schemes AMFI-like schemes, two plans each,
+the tracked funds at random positions) is written there first. Usage:
+
+    python Scripts/bench_nav_parse.py [--fixture bench_nav_fixture.json] [--output bench_nav_parse.json]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPTS_DIR)
+from benchmark import write_report
+from nav_fetch import target_funds
+
+MISSING = "No Such Scheme - Direct Plan - Growth"
+
+
+def write_fixture(path, schemes, seed=0):
+    """Synthetic payload shaped like nav-history?query_type=all_for_date"""
+    rng = random.Random(seed)
+    amcs = 45
+    slots = rng.sample(range(schemes * 2), len(target_funds))
+    names = dict(zip(slots, target_funds))
+    data = []
+    n = 0
+    for a in range(amcs):
+        amc = {"Mf_Id": a + 1, "Mf_Name": f"Synthetic {a + 1} Mutual Fund", "schemes": []}
+        for s in range(schemes // amcs):
+            scheme = {"Scheme_Id": a * 10000 + s, "Scheme_Name": f"Synthetic {a + 1} Scheme {s}",
+                      "Scheme_Category": "Equity Scheme - Sectoral/ Thematic", "navs": []}
+            for plan in ("Direct Plan - Growth", "Regular Plan - Growth"):
+                scheme["navs"].append({
+                    "NAV_Name": names.get(n, f"Synthetic {a + 1} Scheme {s} - {plan}"),
+                    "Scheme_Code": 100000 + n,
+                    "ISIN_Div_Payout": f"INF{n:09d}",
+                    "ISIN_Div_Reinvestment": f"INF{n:09d}R",
+                    "hNAV_Amt": f"{rng.uniform(8, 900):.4f}",
+                    "hNAV_Date": "27-Dec-2025",
+                    "hNAV_Upload_display": "27 Dec 2025 09:15 PM",
+                    "Repurchase_Price": None,
+                    "Sale_Price": None,
+                })
+                n += 1
+            amc["schemes"].append(scheme)
+        data.append(amc)
+    # Targets past the generated range still end up in the payload
+    for slot, name in names.items():
+        if slot >= n:
+            data[-1]["schemes"][-1]["navs"].append(dict(data[-1]["schemes"][-1]["navs"][0], NAV_Name=name))
+    with open(path, "w") as f:
+        json.dump({"data": data}, f)
+
+
+def run_json(path, names):
+    """The previous nav_fetch parse: whole body, triple loop, list lookups"""
+    with open(path, "rb") as f:
+        data = json.loads(f.read().decode("utf-8"))
+    found = {}
+    if 'data' in data:
+        for fund in data['data']:
+            if 'schemes' in fund:
+                for scheme in fund['schemes']:
+                    if 'navs' in scheme:
+                        for nav in scheme['navs']:
+                            if nav['NAV_Name'] in names:
+                                found[nav['NAV_Name']] = nav
+    return found
+
+
+def run_stream(path, names):
+    from amfi_stream import find_navs, iter_file
+
+    read = [0]
+
+    def counted():
+        for chunk in iter_file(path):
+            read[0] += len(chunk)
+            yield chunk
+
+    found = find_navs(counted(), names)
+    return found, read[0]
+
+
+def run_one(mode, path):
+    """Child process: run one approach, print JSON with time and peak RSS"""
+    names = list(target_funds) + ([MISSING] if mode == "stream (full scan)" else [])
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "json.loads":
+        found, read = run_json(path, names), os.path.getsize(path)
+    else:
+        found, read = run_stream(path, names)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "parse_ms": round(elapsed * 1000, 1),
+        "peak_rss_mb": round(peak / 1024, 1),
+        "rss_growth_mb": round((peak - baseline) / 1024, 1),
+        "bytes_read": read,
+        "found": len(found),
+        "navs": {name: found[name]["hNAV_Amt"] for name in sorted(found)},
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixture", default="bench_nav_fixture.json")
+    parser.add_argument("--schemes", type=int, default=9000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", default="bench_nav_parse.json")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(args.run_one, args.fixture)
+        return
+
+    if not os.path.exists(args.fixture):
+        print(f"Writing synthetic payload to {args.fixture}")
+        write_fixture(args.fixture, args.schemes)
+    size = os.path.getsize(args.fixture)
+
+    results = []
+    for mode in ("json.loads", "stream (early exit)", "stream (full scan)"):
+        runs = []
+        for _ in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--fixture", args.fixture, "--run-one", mode],
+                capture_output=True, text=True, check=True,
+            )
+            runs.append(json.loads(out.stdout.splitlines()[-1]))
+        best = min(runs, key=lambda r: r["parse_ms"])
+        best["peak_rss_mb"] = min(r["peak_rss_mb"] for r in runs)
+        best["rss_growth_mb"] = min(r["rss_growth_mb"] for r in runs)
+        results.append(best)
+
+    reference = results[0]["navs"]
+    print(f"Payload: {size / 1e6:.1f} MB, {len(target_funds)} tracked funds")
+    print(f"{'approach':22} {'parse':>9} {'peak RSS':>9} {'growth':>8} {'read':>8} {'found':>6} {'same NAVs':>10}")
+    for r in results:
+        same = all(r["navs"].get(k) == v for k, v in reference.items())
+        r["matches_json_loads"] = same
+        print(f"{r['mode']:22} {r['parse_ms']:>7}ms {r['peak_rss_mb']:>7}MB {r['rss_growth_mb']:>6}MB "
+              f"{r['bytes_read'] / size:>7.0%} {r['found']:>6} {str(same):>10}")
+
+    write_report(args.output, [{k: v for k, v in r.items() if k != "navs"} for r in results],
+                 fixture=args.fixture, fixture_bytes=size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Accuracy/speed benchmark for the normal CDF backends in iv_calculator.
+
+For every backend in NORM_BACKENDS: max CDF/PDF error against scipy, ns per
+scalar call, ns per element on an array, and the time to solve a synthetic
+chain with the per-strike brentq path and with implied_vol_chain, plus how
+many strike IVs differ from the scipy backend at 2 decimals. Usage:
+
+    python Scripts/bench_norm.py [--strikes 200] [--output bench_norm.json]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy.stats import norm
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import iv_calculator
+from benchmark import best_of, write_report
+from iv_calculator import CalcIvGreeks, implied_vol_chain, black76_price_and_vega
+
+
+def synthetic_chain(strikes, future=25000.0, days=7):
+    """Strikes around the future with a smile, prices rounded to 5 paisa ticks"""
+    expiry = (datetime.now() + timedelta(days=days)).replace(hour=15, minute=30)
+    now = datetime.now().replace(microsecond=0)
+    T = CalcIvGreeks(future, future, 100, 100, expiry, FromDateTime=now).T
+    K = future + 50.0 * (np.arange(strikes) - strikes // 2)
+    vols = 0.12 + 0.4 * np.log(K / future) ** 2
+    isCall = np.ones(strikes, dtype=bool)
+    calls, _ = black76_price_and_vega(future, K, T, vols, isCall)
+    puts, _ = black76_price_and_vega(future, K, T, vols, ~isCall)
+    tick = lambda p: np.maximum(np.round(p / 0.05) * 0.05, 0.05)
+    return future, expiry, now, T, K, tick(calls), tick(puts)
+
+
+def otm_iv(K, future, callIV, putIV):
+    return np.round(np.where(K >= future, callIV, putIV) * 100, 2)
+
+
+def scalar_chain(future, expiry, now, K, calls, puts):
+    calc = CalcIvGreeks(future, future, 100, 100, expiry, FromDateTime=now)
+    callIV, putIV = [], []
+    for k, c, p in zip(K, calls, puts):
+        calc.K, calc.C, calc.P = float(k), float(c), float(p)
+        callIV.append(calc.CallImplVol())
+        putIV.append(calc.PutImplVol())
+    return np.array(callIV), np.array(putIV)
+
+
+def bench(strikes, repeat):
+    grid = np.linspace(-12, 12, 200001)
+    refCdf, refPdf = norm.cdf(grid), norm.pdf(grid)
+    vector = np.random.default_rng(0).normal(size=100_000)
+    future, expiry, now, T, K, calls, puts = synthetic_chain(strikes)
+
+    # Unrounded OTM IVs from the scipy backend for the max-diff column
+    iv_calculator.set_norm_backend("scipy")
+    refCall, refPut = implied_vol_chain(future, T, K, calls, puts)
+    referenceRaw = np.where(K >= future, refCall, refPut)
+
+    results, reference = [], {}
+    for name in iv_calculator.NORM_BACKENDS:
+        iv_calculator.set_norm_backend(name)
+        cdf, pdf = iv_calculator.NORM_CDF, iv_calculator.NORM_PDF
+
+        n = 20000
+        scalarNs = min(timeit.repeat(lambda: cdf(0.3), number=n, repeat=3)) / n * 1e9
+        vectorNs = min(timeit.repeat(lambda: cdf(vector), number=5, repeat=3)) / 5 / len(vector) * 1e9
+
+        scalarTime, (scalarCall, scalarPut) = best_of(
+            lambda: scalar_chain(future, expiry, now, K, calls, puts), repeat
+        )
+        chainTime, (chainCall, chainPut) = best_of(
+            lambda: implied_vol_chain(future, T, K, calls, puts), repeat
+        )
+        scalarIV = otm_iv(K, future, scalarCall, scalarPut)
+        chainIV = otm_iv(K, future, chainCall, chainPut)
+        if name == "scipy":
+            reference = {"scalar": scalarIV, "chain": chainIV}
+
+        results.append({
+            "backend": name,
+            "max_cdf_error": float(np.max(np.abs(cdf(grid) - refCdf))),
+            "max_pdf_error": float(np.max(np.abs(pdf(grid) - refPdf))),
+            "scalar_ns_per_call": round(scalarNs, 1),
+            "vector_ns_per_element": round(vectorNs, 2),
+            "brentq_chain_ms": round(scalarTime * 1000, 2),
+            "vectorized_chain_ms": round(chainTime * 1000, 3),
+            "brentq_iv_mismatch_2dp": int(np.sum(scalarIV != reference["scalar"])),
+            "vectorized_iv_mismatch_2dp": int(np.sum(chainIV != reference["chain"])),
+            "max_iv_diff_vol_pts": float(np.max(np.abs(
+                np.where(K >= future, chainCall, chainPut) - referenceRaw
+            )) * 100),
+        })
+    iv_calculator.set_norm_backend("scipy")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strikes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_norm.json")
+    args = parser.parse_args()
+
+    results = bench(args.strikes, args.repeat)
+
+    print(f"{'backend':8} {'cdf err':>9} {'ns/call':>8} {'ns/elem':>8} "
+          f"{'brentq ms':>10} {'vector ms':>10} {'IV diffs @2dp':>14}")
+    for r in results:
+        print(f"{r['backend']:8} {r['max_cdf_error']:>9.1e} {r['scalar_ns_per_call']:>8} "
+              f"{r['vector_ns_per_element']:>8} {r['brentq_chain_ms']:>10} "
+              f"{r['vectorized_chain_ms']:>10} "
+              f"{r['brentq_iv_mismatch_2dp']:>6}/{r['vectorized_iv_mismatch_2dp']:<6}")
+
+    write_report(args.output, results, strikes=args.strikes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Cold-start benchmark for the cron-invoked collectors.
+
+Each scenario runs in a fresh interpreter with -X importtime; the report has
+the wall time, the cumulative import time, the heaviest imports and whether
+pandas/numpy/scipy/requests were loaded at all. Usage:
+
+    python Scripts/bench_startup.py [--runs 5] [--output bench_startup.json]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from benchmark import write_report
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ["pandas", "numpy", "scipy", "requests"]
+
+# name -> code run after the module import; importing a collector must not
+# fetch anything, the closed-market scenarios stop at their gate
+SCENARIOS = {
+    "fetch_and_save": "import fetch_and_save",
+    "nifty50_top10": "import nifty50_top10",
+    "etf_fetch": "import etf_fetch",
+    "global_data": "import global_data",
+    "global_commodity": "import global_commodity",
+    "eco": "import eco",
+    "cash": "import cash",
+    "fetch_emails": "import fetch_emails",
+    "nav_fetch": "import nav_fetch",
+    "nifty_options": "import nifty_options",
+    "nifty_options (market closed)": (
+        "import nifty_options; nifty_options.get_market_status_message()"
+    ),
+    "iv_calculator": "import iv_calculator",
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_scenario(code):
+    """Run code in a fresh interpreter, return wall seconds, imports and stderr"""
+    probe = (
+        f"import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); {code}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(SCRIPTS_DIR),
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = result.stdout.splitlines()
+    loaded = [m for m in (lines[-1] if lines else "").split(",") if m]
+    return wall, loaded, result.stderr
+
+
+def parse_importtime(stderr):
+    """Top-level (cumulative) import times in microseconds from -X importtime"""
+    top = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 1:
+            top[match.group(4)] = int(match.group(2))
+    return top
+
+
+def bench(runs):
+    results = []
+    for name, code in SCENARIOS.items():
+        walls = []
+        for _ in range(runs):
+            wall, loaded, stderr = run_scenario(code)
+            walls.append(wall)
+        top = parse_importtime(stderr)
+        heaviest = sorted(top.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        results.append({
+            "scenario": name,
+            "wall_ms_min": round(min(walls) * 1000, 1),
+            "wall_ms_median": round(sorted(walls)[len(walls) // 2] * 1000, 1),
+            "import_ms_total": round(sum(top.values()) / 1000, 1),
+            "heavy_modules_loaded": loaded,
+            "heaviest_imports_ms": {mod: round(us / 1000, 1) for mod, us in heaviest},
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default="bench_startup.json")
+    args = parser.parse_args()
+
+    baseline, _, _ = run_scenario("pass")
+    results = bench(args.runs)
+
+    print(f"{'scenario':32} {'wall min':>9} {'imports':>9}  heavy modules")
+    for r in results:
+        print(f"{r['scenario']:32} {r['wall_ms_min']:>7}ms {r['import_ms_total']:>7}ms  "
+              f"{','.join(r['heavy_modules_loaded']) or '-'}")
+    print(f"(bare interpreter: {baseline * 1000:.1f}ms)")
+
+    write_report(args.output, results, runs=args.runs, bare_interpreter_ms=round(baseline * 1000, 1))
+
+
+if __name__ == "__main__":
+    main()
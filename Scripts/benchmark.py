@@ -0,0 +1,27 @@
+"""Timing and report helpers shared by the Scripts/bench_*.py scripts"""
+import json
+import sys
+import time
+
+
+def best_of(fn, repeat):
+    """Fastest of repeat calls of fn, in seconds, and the last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def write_report(path, results, **fields):
+    """Write results to path as JSON with the time, Python version and
+    the run's settings (fields)"""
+    with open(path, "w") as f:
+        json.dump({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            **fields,
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {path}")
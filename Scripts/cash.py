@@ -1,33 +1,66 @@
-import requests
-import csv
+import math
 import os
-from datetime import datetime
+import sys
+from datetime import date, datetime
 import pytz
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from flow_store import EPOCH, FlowStore, record_from_sensibull
+from http_client import get_client
+import metrics
+from output_store import write_csv
+
 url = "https://oxide.sensibull.com/v1/compute/cache/fii_dii_daily"
-response = requests.get(url)
-data = response.json()
+# Rows in Data/Cash.csv when the response cannot say (it lists about a month)
+PANEL_DAYS = 22
 
-os.makedirs("Data", exist_ok=True)
+def fetch_flows():
+    """{date: record fields} for every date of the response, None on failure"""
+    try:
+        # A stale payload only repeats days the store already has
+        data = get_client().fetch_json(url)
+        flows = {}
+        for date_str, day in data["data"].items():
+            record = record_from_sensibull(day)
+            if not all(math.isnan(v) for v in record.values()):
+                flows[date.fromisoformat(date_str)] = record
+        return flows
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print(f"Warning: could not fetch FII/DII flows: {e}")
+        return None
+
+@metrics.job('cash')
+def main():
+    with metrics.span('fetch'):
+        flows = fetch_flows()
+    with metrics.span('store'):
+        store = FlowStore()
+        if flows:
+            print(f"FII/DII flows: {store.append(flows)} days written, {store.stats['count']} stored")
+    panel_days = sum(1 for r in flows.values() if not math.isnan(r['fii_net'])) if flows else PANEL_DAYS
+
+    rows = [["Date", "FII Net Buy/Sell", "DII Net Buy/Sell"]]
+    for record in store.latest(panel_days):
+        if math.isnan(record['fii_net']) or math.isnan(record['dii_net']):
+            continue
+        formatted_date = date.fromordinal(EPOCH.toordinal() + int(record['date'])).strftime("%d %b %y")
+        
+        fii_val = int(record['fii_net'])
+        dii_val = int(record['dii_net'])
+        
+        rows.append([formatted_date, f"{fii_val} Cr.", f"{dii_val} Cr."])
+
+    if len(rows) == 1:
+        # Nothing fetched and nothing stored yet: keep the last good CSV
+        sys.exit("No FII/DII flows to write, Data/Cash.csv left as is")
 
-with open("Data/Cash.csv", "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Date", "FII Net Buy/Sell", "DII Net Buy/Sell"])
-    
-    sorted_dates = sorted(data["data"], reverse=True)
-    
-    for date_str in sorted_dates:
-        day = data["data"][date_str]
-        if "cash" in day:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%d %b %y")
-            
-            fii_val = int(day["cash"]["fii"]["buy_sell_difference"])
-            dii_val = int(day["cash"]["dii"]["buy_sell_difference"])
-            
-            writer.writerow([formatted_date, f"{fii_val} Cr.", f"{dii_val} Cr."])
-    
     # Add timestamp row with IST
     ist = pytz.timezone('Asia/Kolkata')
     timestamp = datetime.now(ist).strftime("%d %b %H:%M")
-    writer.writerow(["", "Update Time:", timestamp])
+    rows.append(["", "Update Time:", timestamp])
+    
+    with metrics.span('write'):
+        write_csv("Data/Cash.csv", rows, footer_rows=1, lineterminator="\r\n")
+
+if __name__ == "__main__":
+    main()
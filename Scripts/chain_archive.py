@@ -0,0 +1,239 @@
+"""Binary archive of intraday option-chain snapshots.
+
+One segment directory per trading day (ROOT/YYYY-MM-DD) holding
+    records.bin  fixed-width per-strike records (RECORD_DTYPE, 80 bytes),
+                 each snapshot's strikes contiguous and sorted; IVs are
+                 decimal fractions
+    index.bin    one INDEX_DTYPE entry per snapshot: time, symbol, expiry,
+                 spot, future and the snapshot's slice of records.bin
+Appending a snapshot writes its records and then its index entry, both at
+the end of their files. Readers memory-map the two files, so a snapshot is
+a slice and a strike's time series is a gather, with no text parsing.
+"""
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from market_calendar import IST
+
+ARCHIVE_DIR = os.getenv('OPTION_ARCHIVE_DIR', 'Data/option_archive')
+
+SIDE_FIELDS = [('oi', '<f8'), ('oi_chg', '<f8'), ('volume', '<i8'),
+               ('ltp', '<f4'), ('chng', '<f4'), ('iv', '<f4')]
+RECORD_DTYPE = ([('strike', '<f8')]
+                + [(f'call_{name}', t) for name, t in SIDE_FIELDS]
+                + [(f'put_{name}', t) for name, t in SIDE_FIELDS])
+INDEX_DTYPE = [('time', '<i8'), ('symbol', 'S16'), ('expiry', '<i4'),
+               ('spot', '<f8'), ('future', '<f8'), ('offset', '<i8'), ('count', '<i4')]
+
+# NSE option-chain-v3 keys for each side field
+NSE_FIELDS = {'oi': 'openInterest', 'oi_chg': 'changeinOpenInterest', 'volume': 'totalTradedVolume',
+              'ltp': 'lastPrice', 'chng': 'change', 'iv': None}
+
+EPOCH = date(1970, 1, 1)
+
+# Appends from several threads (one per symbol/expiry) must not interleave
+_append_lock = threading.Lock()
+
+
+def _day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+class DaySegment:
+    """Memory-mapped view of one day's snapshots"""
+
+    def __init__(self, path: str) -> None:
+        import numpy as np
+
+        self.path = path
+        self.index = self._map(os.path.join(path, 'index.bin'), np.dtype(INDEX_DTYPE))
+        self.records = self._map(os.path.join(path, 'records.bin'), np.dtype(RECORD_DTYPE))
+        # Entries whose records did not make it to disk are ignored
+        if len(self.index):
+            complete = self.index['offset'] + self.index['count'] <= len(self.records)
+            self.index = self.index[complete]
+
+    @staticmethod
+    def _map(path, dtype):
+        import numpy as np
+
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def select(self, symbol: Optional[str] = None, expiry: Optional[date] = None):
+        """Index positions of the snapshots for symbol and/or expiry, by time"""
+        import numpy as np
+
+        mask = np.ones(len(self.index), dtype=bool)
+        if symbol is not None:
+            mask &= self.index['symbol'] == symbol.encode()
+        if expiry is not None:
+            mask &= self.index['expiry'] == _day_number(expiry)
+        positions = np.flatnonzero(mask)
+        return positions[np.argsort(self.index['time'][positions], kind='stable')]
+
+    def snapshot(self, position: int):
+        """Records of one snapshot (a view into the memmap)"""
+        entry = self.index[position]
+        return self.records[entry['offset']:entry['offset'] + entry['count']]
+
+    def strike_series(self, symbol: str, expiry: date, strike: float, fields: List[str]):
+        """(UTC times as datetime64[s], {field: values}) for one strike, NaN
+        in snapshots where the strike is missing"""
+        import numpy as np
+
+        positions = self.select(symbol, expiry)
+        entries = self.index[positions]
+        found = np.zeros(len(positions), dtype=bool)
+        rows = np.zeros(len(positions), dtype=np.int64)
+        for i, entry in enumerate(entries):
+            strikes = self.records['strike'][entry['offset']:entry['offset'] + entry['count']]
+            j = np.searchsorted(strikes, strike)
+            if j < len(strikes) and strikes[j] == strike:
+                found[i] = True
+                rows[i] = entry['offset'] + j
+        values = {}
+        for field in fields:
+            column = np.full(len(positions), np.nan)
+            column[found] = self.records[field][rows[found]]
+            values[field] = column
+        return entries['time'].astype('datetime64[s]'), values
+
+
+class ChainArchive:
+    def __init__(self, root: str = ARCHIVE_DIR) -> None:
+        self.root = root
+
+    def days(self) -> List[date]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(date.fromisoformat(name) for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, 'index.bin')))
+
+    def day(self, day: date) -> DaySegment:
+        return DaySegment(os.path.join(self.root, day.isoformat()))
+
+    def append(self, symbol: str, expiry: date, columns: Dict[str, object],
+               spot: float = float('nan'), future: float = float('nan'),
+               timestamp: Optional[datetime] = None) -> int:
+        """Append one snapshot; columns maps RECORD_DTYPE fields to arrays
+        (strike required, missing fields are zero / NaN). Returns its index
+        position in the day's segment."""
+        import numpy as np
+
+        timestamp = IST.localize(timestamp) if timestamp and timestamp.tzinfo is None else timestamp
+        timestamp = timestamp or datetime.now(IST)
+        segment = os.path.join(self.root, timestamp.astimezone(IST).date().isoformat())
+        os.makedirs(segment, exist_ok=True)
+
+        recordType = np.dtype(RECORD_DTYPE)
+        strikes = np.asarray(columns['strike'], dtype=np.float64)
+        order = np.argsort(strikes, kind='stable')
+        records = np.zeros(len(strikes), dtype=recordType)
+        for name in recordType.names:
+            if name in columns:
+                records[name] = np.asarray(columns[name], dtype=np.float64)[order]
+            elif recordType[name].kind == 'f' and name.endswith('iv'):
+                records[name] = np.nan
+
+        recordsPath = os.path.join(segment, 'records.bin')
+        indexPath = os.path.join(segment, 'index.bin')
+        indexType = np.dtype(INDEX_DTYPE)
+        with _append_lock:
+            with open(recordsPath, 'ab') as f:
+                # Drop a torn record left by an interrupted append
+                offset = f.seek(0, os.SEEK_END) // recordType.itemsize
+                f.truncate(offset * recordType.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(records.tobytes())
+            entry = np.array([(int(timestamp.timestamp()), symbol.encode()[:16], _day_number(expiry),
+                               spot, future, offset, len(records))], dtype=indexType)
+            with open(indexPath, 'ab') as f:
+                position = f.seek(0, os.SEEK_END) // indexType.itemsize
+                f.truncate(position * indexType.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(entry.tobytes())
+        return position
+
+    def strike_series(self, symbol: str, expiry: date, strike: float, fields: List[str],
+                      start: Optional[date] = None, end: Optional[date] = None):
+        """strike_series over every day segment in [start, end]"""
+        import numpy as np
+
+        times, values = [], {field: [] for field in fields}
+        for day in self.days():
+            if (start and day < start) or (end and day > end):
+                continue
+            t, v = self.day(day).strike_series(symbol, expiry, strike, fields)
+            times.append(t)
+            for field in fields:
+                values[field].append(v[field])
+        if not times:
+            return np.zeros(0, dtype='datetime64[s]'), {f: np.zeros(0) for f in fields}
+        return np.concatenate(times), {f: np.concatenate(v) for f, v in values.items()}
+
+
+def columns_from_nse(data: Dict) -> Dict[str, object]:
+    """Every strike of an option-chain-v3 response as float64 columns named
+    like RECORD_DTYPE (strike, call_oi, put_ltp, ...), sorted by strike; a
+    side or field the response leaves out is 0. IV columns are not set."""
+    import numpy as np
+
+    items = data['records']['data']
+    n = len(items)
+    strikes = np.fromiter((item['strikePrice'] for item in items), dtype=float, count=n)
+    order = np.argsort(strikes, kind='stable')
+    columns: Dict[str, object] = {'strike': strikes[order]}
+    for side, key in (('call', 'CE'), ('put', 'PE')):
+        legs = [item.get(key) or {} for item in items]
+        for name, source in NSE_FIELDS.items():
+            if source is None:
+                continue
+            values = np.fromiter((leg.get(source) or 0 for leg in legs), dtype=float, count=n)
+            columns[f'{side}_{name}'] = values[order]
+    return columns
+
+
+def parse_nse_timestamp(data: Dict) -> Optional[datetime]:
+    try:
+        return IST.localize(datetime.strptime(data['records']['timestamp'], '%d-%b-%Y %H:%M:%S'))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def main():
+    import argparse
+
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Option-chain snapshot archive")
+    parser.add_argument('--root', default=ARCHIVE_DIR)
+    parser.add_argument('--symbol', default='NIFTY')
+    parser.add_argument('--expiry', help="YYYY-MM-DD: print a strike's series for this expiry")
+    parser.add_argument('--strike', type=float)
+    parser.add_argument('--fields', default='call_ltp,call_iv,put_ltp,put_iv')
+    args = parser.parse_args()
+
+    archive = ChainArchive(args.root)
+    if args.expiry and args.strike is not None:
+        fields = args.fields.split(',')
+        times, values = archive.strike_series(args.symbol, date.fromisoformat(args.expiry), args.strike, fields)
+        print(f"{'time (IST)':20} " + ' '.join(f"{f:>10}" for f in fields))
+        for i, t in enumerate(times + np.timedelta64(330, 'm')):
+            print(f"{str(t):20} " + ' '.join(f"{values[f][i]:>10.2f}" for f in fields))
+        return
+
+    for day in archive.days():
+        segment = archive.day(day)
+        size = segment.records.nbytes + segment.index.nbytes
+        symbols = sorted({s.decode() for s in segment.index['symbol']})
+        print(f"{day}  {len(segment.index):>5} snapshots  {len(segment.records):>8} records  "
+              f"{size / 1e6:>6.2f} MB  {', '.join(symbols)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
-import requests, pandas as pd, os, pytz
+import json, os, sys
 from datetime import datetime, timedelta
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from http_client import get_client
+from market_calendar import IST
+from output_store import write_csv, write_output
+
 headers = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Encoding': 'gzip, deflate, br, zstd',
@@ -11,19 +17,136 @@ headers = {
     'Cache-Control': 'no-store, no-cache, must-revalidate, max-age=0, no-transform'
 }
 
-today = datetime.now()
-payload = {
-    "from_date": (today - timedelta(days=15)).strftime("%Y-%m-%d"),
-    "to_date": (today + timedelta(days=15)).strftime("%Y-%m-%d"),
-    "countries": ["India", "China", "Japan", "Euro Area", "USA"],
-    "impacts": []
-}
+ECO_URL = "https://oxide.sensibull.com/v1/compute/market_global_events"
+COUNTRIES = ["India", "China", "Japan", "Euro Area", "USA"]
+WINDOW_DAYS = 15
+
+# Events by key (committed) and the last fetch of each day (a local
+# sidecar, so a refetch that changes no event changes no committed file),
+# kept between runs. A day is refetched only when it can have changed: a
+# past day once after it is over (SETTLE later, for late actuals), today
+# when an event without an actual is near its time or every TODAY_TTL,
+# later days every FAR_TTL.
+ECO_CACHE_FILE = os.getenv('ECO_CACHE_FILE', 'Data/eco_cache.json')
+ECO_FETCHED_FILE = os.getenv('ECO_FETCHED_FILE', 'Data/eco_fetched.json')
+SETTLE = timedelta(hours=6)
+DUE_BEFORE, DUE_AFTER = timedelta(minutes=15), timedelta(hours=3)
+TODAY_TTL = timedelta(hours=3)
+FAR_TTL = timedelta(days=1)
+
+def fetch_events(from_date, to_date):
+    """Events between two dates (inclusive), None when the request fails"""
+    payload = {
+        "from_date": from_date.strftime("%Y-%m-%d"),
+        "to_date": to_date.strftime("%Y-%m-%d"),
+        "countries": COUNTRIES,
+        "impacts": []
+    }
+
+    # A read-only query, safe to retry; the event cache is the fallback
+    try:
+        data = get_client().fetch_json(ECO_URL, method='POST', headers=headers, json=payload,
+                                       idempotent=True, stale=False)
+        return data.get('payload', {}).get('data', []) if data.get('success') else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def event_key(item):
+    if item.get('id') is not None:
+        return str(item['id'])
+    return f"{item.get('date', '')}|{item.get('country', '')}|{item.get('title', '')}"
+
+def _load_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_cache(path=ECO_CACHE_FILE, fetched_path=ECO_FETCHED_FILE):
+    """{'events': ..., 'fetched': ...}; days without a fetch time (no
+    sidecar yet) are stale"""
+    return {'events': _load_json(path).get('events', {}), 'fetched': _load_json(fetched_path)}
 
-try:
-    data = requests.post("https://oxide.sensibull.com/v1/compute/market_global_events", headers=headers, json=payload, timeout=10).json()
-    raw_data = data.get('payload', {}).get('data', []) if data.get('success') else []
-except:
-    raw_data = []
+def save_cache(cache, path=ECO_CACHE_FILE, fetched_path=ECO_FETCHED_FILE):
+    """Events through write_output (rewritten only when they change), the
+    fetch times straight to the sidecar"""
+    write_output(path, json.dumps({'events': cache['events']}, ensure_ascii=False, indent=0, sort_keys=True))
+    tmp = f"{fetched_path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache['fetched'], f, indent=0, sort_keys=True)
+    os.replace(tmp, fetched_path)
+
+def _event_time(item):
+    try:
+        return IST.localize(datetime.strptime(f"{item['date']} {item['time'][:5]}", "%Y-%m-%d %H:%M"))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def stale_days(cache, now):
+    """Days of the window that need fetching at now (IST)"""
+    today = now.date()
+    window = [today + timedelta(days=d) for d in range(-WINDOW_DAYS, WINDOW_DAYS + 1)]
+    due_today = any(
+        not item.get('actual') and (t := _event_time(item)) is not None and t - DUE_BEFORE <= now <= t + DUE_AFTER
+        for item in cache['events'].values() if item.get('date') == today.isoformat()
+    )
+    stale = []
+    for day in window:
+        fetched = cache['fetched'].get(day.isoformat())
+        fetched = datetime.fromisoformat(fetched) if fetched else None
+        if fetched is None:
+            stale.append(day)
+        elif day < today:
+            end = IST.localize(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+            if fetched < end + SETTLE <= now:
+                stale.append(day)
+        elif day == today:
+            if due_today or now - fetched >= TODAY_TTL:
+                stale.append(day)
+        elif now - fetched >= FAR_TTL:
+            stale.append(day)
+    return stale
+
+def day_ranges(days):
+    """Sorted days as (first, last) runs of consecutive days"""
+    ranges = []
+    for day in days:
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+def refresh(cache, now, fetch=fetch_events):
+    """Fetch the stale days (one request per run of consecutive days) and
+    merge them into cache; days outside the window are dropped. Returns
+    the number of requests and how many failed."""
+    requests_made, failed = 0, 0
+    for first, last in day_ranges(stale_days(cache, now)):
+        items = fetch(first, last)
+        requests_made += 1
+        if items is None:
+            failed += 1
+            continue
+        # The fetched days are replaced, so moved or cancelled events go
+        days = {(first + timedelta(days=d)).isoformat() for d in range((last - first).days + 1)}
+        cache['events'] = {k: v for k, v in cache['events'].items() if v.get('date') not in days}
+        for seq, item in enumerate(items):
+            cache['events'][event_key(item)] = dict(item, seq=seq)
+        for day in days:
+            cache['fetched'][day] = now.isoformat(timespec='seconds')
+
+    oldest = (now.date() - timedelta(days=WINDOW_DAYS)).isoformat()
+    cache['events'] = {k: v for k, v in cache['events'].items() if v.get('date', '') >= oldest}
+    cache['fetched'] = {d: t for d, t in cache['fetched'].items() if d >= oldest}
+    return requests_made, failed
+
+def cached_events(cache, now):
+    """Events of the window, in date and time order"""
+    last = (now.date() + timedelta(days=WINDOW_DAYS)).isoformat()
+    events = [item for item in cache['events'].values() if item.get('date', '') <= last]
+    return sorted(events, key=lambda item: (item.get('date', ''), item.get('time') or '', item.get('seq', 0)))
 
 def impact_to_stars(impact):
     if "high" in impact.lower(): return "★★★"
@@ -31,31 +154,48 @@ def impact_to_stars(impact):
     if "low" in impact.lower(): return "★"
     return impact.capitalize()
 
-records = []
-for item in raw_data:
-    date_str = item.get('date', '')
-    try:
-        formatted_date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d %b")
-    except:
-        formatted_date = date_str
-    area = item.get('country', '')
-    if area == "Euro Area":
-        area = "Euro"
+def build_records(raw_data):
+    records = []
+    for item in raw_data:
+        date_str = item.get('date', '')
+        try:
+            formatted_date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d %b")
+        except ValueError:
+            formatted_date = date_str
+        area = item.get('country', '')
+        if area == "Euro Area":
+            area = "Euro"
+        records.append({
+            'Date': formatted_date,
+            'Time': item.get('time', '')[:5] if item.get('time') else '',
+            'Area': area,
+            'Title': item.get('title', ''),
+            'Imp.': impact_to_stars(item.get('impact', '')),
+            'Actual': item.get('actual', ''),
+            'Exp.': item.get('expected', ''),
+            'Prev.': item.get('previous', '')
+        })
+
     records.append({
-        'Date': formatted_date,
-        'Time': item.get('time', '')[:5] if item.get('time') else '',
-        'Area': area,
-        'Title': item.get('title', ''),
-        'Imp.': impact_to_stars(item.get('impact', '')),
-        'Actual': item.get('actual', ''),
-        'Exp.': item.get('expected', ''),
-        'Prev.': item.get('previous', '')
+        'Date': '', 'Time': '', 'Area': '', 'Title': '', 'Imp.': '', 'Actual': '',
+        'Exp.': 'Update Time:', 'Prev.': datetime.now(IST).strftime('%d-%b %H:%M')
     })
+    return records
+
+@metrics.job('eco')
+def main():
+    now = datetime.now(IST)
+    cache = load_cache()
+    with metrics.span('fetch'):
+        requests_made, failed = refresh(cache, now)
+    with metrics.span('write'):
+        save_cache(cache)
+    print(f"Economic calendar: {requests_made} requests ({failed} failed), {len(cache['events'])} events cached")
 
-records.append({
-    'Date': '', 'Time': '', 'Area': '', 'Title': '', 'Imp.': '', 'Actual': '',
-    'Exp.': 'Update Time:', 'Prev.': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M')
-})
+    with metrics.span('transform'):
+        records = build_records(cached_events(cache, now))
+    with metrics.span('write'):
+        write_csv('Data/Economic.csv', records, fieldnames=list(records[0]), footer_rows=1)
 
-os.makedirs('Data', exist_ok=True)
-pd.DataFrame(records).to_csv('Data/Economic.csv', index=False)
+if __name__ == "__main__":
+    main()
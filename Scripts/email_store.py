@@ -0,0 +1,140 @@
+"""Local archive of every fetched email, searchable with SQLite FTS5.
+
+fetch_emails adds each new message's headers and the start of its text to
+messages (keyed by UIDVALIDITY and UID, so a refetch is a no-op), and an
+FTS5 index over subject, sender and text is kept in step by triggers.
+Data/email.csv is the newest EMAIL_LIMIT rows of this table, and searches
+run against the file instead of the mail server:
+
+    python Scripts/email_store.py "contract note" [--from zerodha] [--subject margin]
+                                  [--since 2025-12-01] [--until 2025-12-31] [--limit 20]
+"""
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+EMAIL_DB = os.getenv('EMAIL_DB', 'Data/email.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    time TEXT NOT NULL,       -- ISO 8601, IST ('' when the Date header is unreadable)
+    date TEXT NOT NULL,       -- as shown in the CSV, '%d %b %H:%M'
+    sender TEXT NOT NULL,     -- decoded From header
+    sender_short TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    text TEXT NOT NULL,       -- start of the first text part
+    PRIMARY KEY (uidvalidity, uid)
+);
+CREATE INDEX IF NOT EXISTS messages_time ON messages (time);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, text, content='messages', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, subject, sender, text) VALUES (new.rowid, new.subject, new.sender, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, text)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.text);
+END;
+"""
+
+COLUMNS = ['uidvalidity', 'uid', 'time', 'date', 'sender', 'sender_short', 'subject', 'text']
+
+
+def _fts_phrase(value: str) -> str:
+    """value as one FTS5 string (a phrase), so user input is not query syntax"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+class EmailStore:
+    def __init__(self, path: str = EMAIL_DB) -> None:
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def add(self, uidvalidity: int, messages: Iterable[Dict]) -> int:
+        """Insert messages (dicts with uid and the text columns); ones already
+        stored are skipped. Returns the number inserted."""
+        rows = [(uidvalidity, m['uid'], m['time'], m['date'], m['sender'], m['from'], m['subject'], m['text'])
+                for m in messages]
+        with self.db:
+            cursor = self.db.executemany(f"INSERT OR IGNORE INTO messages ({', '.join(COLUMNS)}) "
+                                         f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+        return max(cursor.rowcount, 0)
+
+    def latest(self, limit: int = 20) -> List[sqlite3.Row]:
+        """Newest messages by arrival (UID order within a UIDVALIDITY)"""
+        return self.db.execute("SELECT * FROM messages ORDER BY uidvalidity DESC, uid DESC LIMIT ?",
+                               (limit,)).fetchall()
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def search(self, text: Optional[str] = None, sender: Optional[str] = None, subject: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None, limit: int = 50) -> List[sqlite3.Row]:
+        """Messages matching every given filter. text is an FTS5 query over
+        subject, sender and text (best matches first); sender and subject
+        are words/prefixes of those fields; since/until are ISO dates or
+        times, until inclusive of that day. Without text, newest first."""
+        terms, where, params = [], [], []
+        if text:
+            terms.append(f"({text})")
+        if sender:
+            terms.append(f"sender : {_fts_phrase(sender)}*")
+        if subject:
+            terms.append(f"subject : {_fts_phrase(subject)}*")
+        if since:
+            where.append("m.time >= ?")
+            params.append(since)
+        if until:
+            where.append("m.time < ?")
+            params.append(until if 'T' in until else until + 'T24')
+        if terms:
+            sql = ("SELECT m.*, snippet(messages_fts, 2, '[', ']', '...', 12) AS snippet "
+                   "FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+                   "WHERE messages_fts MATCH ?")
+            params.insert(0, ' AND '.join(terms))
+            order = "bm25(messages_fts)" if text else "m.time DESC"
+        else:
+            sql = "SELECT m.*, substr(m.text, 1, 80) AS snippet FROM messages m WHERE 1"
+            order = "m.time DESC"
+        sql += ''.join(f" AND {w}" for w in where) + f" ORDER BY {order} LIMIT ?"
+        return self.db.execute(sql, params + [limit]).fetchall()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search the local email archive")
+    parser.add_argument('text', nargs='?', help="full-text query (FTS5 syntax: words, \"phrases\", OR, prefix*)")
+    parser.add_argument('--from', dest='sender', help="sender name or address")
+    parser.add_argument('--subject')
+    parser.add_argument('--since', help="YYYY-MM-DD")
+    parser.add_argument('--until', help="YYYY-MM-DD (inclusive)")
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--db', default=EMAIL_DB)
+    args = parser.parse_args()
+
+    store = EmailStore(args.db)
+    try:
+        rows = store.search(args.text, args.sender, args.subject, args.since, args.until, args.limit)
+    except sqlite3.OperationalError as e:
+        raise SystemExit(f"Bad query: {e}")
+    print(f"{len(rows)} of {store.count()} archived messages")
+    for row in rows:
+        print(f"{row['time'][:16]:16}  {row['sender_short'][:20]:20}  {row['subject'][:60]}")
+        if row['snippet']:
+            print(f"{'':38}{' '.join(row['snippet'].split())}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,63 @@
-import requests, pandas as pd, os, pytz
-from datetime import datetime
+import os, sys, pytz
 
-headers = {'User-Agent': 'Mozilla/5.0'}
-url = "https://www.nseindia.com/api/etf"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from http_client import fetched_at
+from nse_client import get_client
+from output_store import write_csv
+
+url = "/api/etf"
 target_symbols = ["NIFTYBEES", "METALIETF", "PVTBANIETF", "ALPHA", "GOLDBEES", "SILVERBEES", "PHARMABEES", "ITBEES", "BANKBEES"]
 
-try:
-    data = requests.get(url, headers=headers).json()
-except:
-    data = {}
-
-symbol_dict = {}
-for item in data.get('data', []):
-    symbol = item.get('symbol')
-    if symbol in target_symbols:
-        per = item.get('per', '-')
-        percent = f"{per}%" if per != '-' and per is not None else '-'
-        symbol_dict[symbol] = {
-            'SYMBOL': symbol,
-            'LTP': item.get('ltP', '-'),
-            'CHNG': item.get('chn', '-'),
-            '%': percent,
-            'Prev.': item.get('prevClose', '-'),
-            'Yr Hi': item.get('wkhi', '-'),
-            'Yr Lo': item.get('wklo', '-')
-        }
-
-records = []
-for symbol in target_symbols:
-    if symbol in symbol_dict:
-        records.append(symbol_dict[symbol])
-    else:
-        records.append({
-            'SYMBOL': symbol,
-            'LTP': '-', 'CHNG': '-', '%': '-',
-            'Prev.': '-', 'Yr Hi': '-', 'Yr Lo': '-'
-        })
-
-records.append({
-    'SYMBOL': '', 'LTP': '', 'CHNG': '', '%': '',
-    'Prev.': '', 'Yr Hi': 'Update Time', 'Yr Lo': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M')
-})
-
-os.makedirs('Data', exist_ok=True)
-pd.DataFrame(records).to_csv('Data/etf.csv', index=False)
+def fetch_etf_data():
+    try:
+        return get_client().get_json(url)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not fetch ETF quotes: {e}")
+        return {}
+
+def build_records(data):
+    symbol_dict = {}
+    for item in data.get('data', []):
+        symbol = item.get('symbol')
+        if symbol in target_symbols:
+            per = item.get('per', '-')
+            percent = f"{per}%" if per != '-' and per is not None else '-'
+            symbol_dict[symbol] = {
+                'SYMBOL': symbol,
+                'LTP': item.get('ltP', '-'),
+                'CHNG': item.get('chn', '-'),
+                '%': percent,
+                'Prev.': item.get('prevClose', '-'),
+                'Yr Hi': item.get('wkhi', '-'),
+                'Yr Lo': item.get('wklo', '-')
+            }
+
+    records = []
+    for symbol in target_symbols:
+        if symbol in symbol_dict:
+            records.append(symbol_dict[symbol])
+        else:
+            records.append({
+                'SYMBOL': symbol,
+                'LTP': '-', 'CHNG': '-', '%': '-',
+                'Prev.': '-', 'Yr Hi': '-', 'Yr Lo': '-'
+            })
+
+    records.append({
+        'SYMBOL': '', 'LTP': '', 'CHNG': '', '%': '',
+        'Prev.': '', 'Yr Hi': 'Update Time', 'Yr Lo': fetched_at(data, pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M')
+    })
+    return records
+
+@metrics.job('etf_fetch')
+def main():
+    with metrics.span('fetch'):
+        data = fetch_etf_data()
+    with metrics.span('transform'):
+        records = build_records(data)
+    with metrics.span('write'):
+        write_csv('Data/etf.csv', records, fieldnames=list(records[0]), footer_rows=1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-import requests, pandas as pd, os, pytz
-from datetime import datetime
+import os, sys, pytz
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from http_client import fetched_at
+from nse_client import get_client
+from tv_quotes import fetch_quotes
+from output_store import write_csv
 
-headers = {'User-Agent': 'Mozilla/5.0'}
 TV_SYMBOLS = {"USD/INR": "FX_IDC:USDINR", "GIFT-NIFTY": "NSEIX:NIFTY1!", "GOLD": "MCX:GOLD1!", "SILVER": "MCX:SILVER1!", "IND 5Y": "TVC:IN05Y", "IND 10Y": "TVC:IN10Y", "IND 30Y": "TVC:IN30Y"}
 target_indices = ["NIFTY 50", "INDIA VIX", "GIFT-NIFTY", "USD/INR", "GOLD", "SILVER", "IND 5Y", "IND 10Y", "IND 30Y", "NIFTY NEXT 50", "NIFTY MIDCAP SELECT", "NIFTY MIDCAP 50", "NIFTY SMALLCAP 50", "NIFTY 500", "NIFTY ALPHA 50", "NIFTY IT", "NIFTY BANK", "NIFTY FINANCIAL SERVICES", "NIFTY PSU BANK", "NIFTY PRIVATE BANK", "NIFTY FMCG", "NIFTY CONSUMER DURABLES", "NIFTY PHARMA", "NIFTY HEALTHCARE INDEX", "NIFTY METAL", "NIFTY AUTO", "NIFTY SERVICES SECTOR", "NIFTY OIL & GAS", "NIFTY CHEMICALS", "NIFTY COMMODITIES", "NIFTY INDIA CONSUMPTION", "NIFTY PSE"]
 
@@ -22,44 +27,59 @@ def format_value(value, key, index_name):
             val = float(value)
             return str(int(val)) if not val.is_integer() else str(int(val))
         return str(float(value))
-    except: return '-'
+    except (TypeError, ValueError): return '-'
         
-index_dict = {}
-for name, symbol in TV_SYMBOLS.items():
-    url = f"https://scanner.tradingview.com/symbol?symbol={symbol}&fields=close[1],change_abs,price_52_week_high,price_52_week_low,close,change&no_404=true"
+def fetch_index_data():
+    """(index rows by name, when the NSE indices were fetched)"""
+    index_dict = {}
+    quotes = fetch_quotes(list(TV_SYMBOLS.values()), timeout=5)
+    for name, data in zip(TV_SYMBOLS, quotes):
+        if data is not None:
+            index_dict[name] = {
+                'Index': format_index_name(name), 'LTP': data.get('close'), 'Chng': data.get('change_abs'),
+                '%': data.get('change'), 'Prev.': data.get('close[1]'), 'Adv:Dec': '-',
+                'Yr Hi': data.get('price_52_week_high'), 'Yr Lo': data.get('price_52_week_low')
+            }
+
+    nse = None
     try:
-        data = requests.get(url, headers=headers, timeout=5).json()
-        index_dict[name] = {
-            'Index': format_index_name(name), 'LTP': data.get('close'), 'Chng': data.get('change_abs'),
-            '%': data.get('change'), 'Prev.': data.get('close[1]'), 'Adv:Dec': '-',
-            'Yr Hi': data.get('price_52_week_high'), 'Yr Lo': data.get('price_52_week_low')
-        }
-    except: pass
+        nse = get_client().get_json("/api/allIndices")
+        for item in nse.get('data', []):
+            name = item.get('index')
+            if name in TV_SYMBOLS or name not in target_indices: continue
+            adv, dec = int(item.get('advances') or 0), int(item.get('declines') or 0)
+            adv_dec = f"{adv/dec:.2f}" if dec != 0 else "Max" if adv > 0 else "-"
+            index_dict[name] = {
+                'Index': format_index_name(name), 'LTP': item.get('last'), 'Chng': item.get('variation'),
+                '%': item.get('percentChange'), 'Prev.': item.get('previousClose'), 'Adv:Dec': adv_dec,
+                'Yr Hi': item.get('yearHigh'), 'Yr Lo': item.get('yearLow')
+            }
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"Warning: could not fetch NSE indices: {e}")
+    return index_dict, fetched_at(nse, pytz.timezone('Asia/Kolkata'))
+
+def build_records(index_dict, updated):
+    records = []
+    for idx in target_indices:
+        formatted_name = format_index_name(idx)
+        if idx in index_dict:
+            rec = {k: format_value(v, k, idx) for k, v in index_dict[idx].items()}
+            rec['Index'] = formatted_name
+        else:
+            rec = {'Index': formatted_name, 'LTP': '-', 'Chng': '-', '%': '-', 'Prev.': '-', 'Adv:Dec': '-', 'Yr Hi': '-', 'Yr Lo': '-'}
+        records.append(rec)
 
-try:
-    data = requests.get("https://www.nseindia.com/api/allIndices", headers=headers, timeout=5).json()
-    for item in data.get('data', []):
-        name = item.get('index')
-        if name in TV_SYMBOLS or name not in target_indices: continue
-        adv, dec = int(item.get('advances', 0)), int(item.get('declines', 0))
-        adv_dec = f"{adv/dec:.2f}" if dec != 0 else "Max" if adv > 0 else "-"
-        index_dict[name] = {
-            'Index': format_index_name(name), 'LTP': item.get('last'), 'Chng': item.get('variation'),
-            '%': item.get('percentChange'), 'Prev.': item.get('previousClose'), 'Adv:Dec': adv_dec,
-            'Yr Hi': item.get('yearHigh'), 'Yr Lo': item.get('yearLow')
-        }
-except: pass
+    records.append({'Index': '', 'LTP': '', 'Chng': '', '%': '', 'Prev.': '', 'Adv:Dec': '', 'Yr Hi': 'Updated Time:', 'Yr Lo': updated.strftime('%d-%b %H:%M')})
+    return records
 
-records = []
-for idx in target_indices:
-    formatted_name = format_index_name(idx)
-    if idx in index_dict:
-        rec = {k: format_value(v, k, idx) for k, v in index_dict[idx].items()}
-        rec['Index'] = formatted_name
-    else:
-        rec = {'Index': formatted_name, 'LTP': '-', 'Chng': '-', '%': '-', 'Prev.': '-', 'Adv:Dec': '-', 'Yr Hi': '-', 'Yr Lo': '-'}
-    records.append(rec)
+@metrics.job('fetch_and_save')
+def main():
+    with metrics.span('fetch'):
+        index_dict, updated = fetch_index_data()
+    with metrics.span('transform'):
+        records = build_records(index_dict, updated)
+    with metrics.span('write'):
+        write_csv('Data/nse_all_indices.csv', records, fieldnames=list(records[0]), footer_rows=1)
 
-records.append({'Index': '', 'LTP': '', 'Chng': '', '%': '', 'Prev.': '', 'Adv:Dec': '', 'Yr Hi': 'Updated Time:', 'Yr Lo': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M')})
-os.makedirs('Data', exist_ok=True)
-pd.DataFrame(records).to_csv('Data/nse_all_indices.csv', index=False)
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,33 @@
-import imaplib, email, csv, os, sys, re, pytz
+import imaplib, email, json, os, sys, re, pytz
+import base64, binascii, quopri
 from datetime import datetime
 from email.header import decode_header
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from email_store import EmailStore
+from output_store import write_csv, write_output
+
 IST = pytz.timezone('Asia/Kolkata')
 
+IMAP_HOST = os.getenv('EMAIL_IMAP_HOST', 'imap.yandex.com')
+IMAP_PORT = int(os.getenv('EMAIL_IMAP_PORT', '993'))
+IMAP_SSL = os.getenv('EMAIL_IMAP_SSL', '1') != '0'
+# UIDVALIDITY, UIDNEXT and the last UID seen between runs; the messages
+# themselves go to the email_store archive
+EMAIL_STATE_FILE = os.getenv('EMAIL_STATE_FILE', 'Data/email_state.json')
+EMAIL_LIMIT = int(os.getenv('EMAIL_LIMIT', '20'))
+# Bytes of the message text fetched for the preview (enough for the MIME
+# preamble and part headers in front of the first text part); the archive
+# keeps no more of the text than the CSV shows
+PREVIEW_BYTES = int(os.getenv('EMAIL_PREVIEW_BYTES', '2048'))
+ARCHIVE_CHARS = 200
+
+# One FETCH for the whole new range: the headers shown plus the ones needed
+# to find and decode the first text part, and the start of the text
+FETCH_ITEMS = (f'(UID BODY.PEEK[HEADER.FIELDS (DATE FROM SUBJECT CONTENT-TYPE CONTENT-TRANSFER-ENCODING)] '
+               f'BODY.PEEK[TEXT]<0.{PREVIEW_BYTES}>)')
+
 def decode_text(text):
     if not text: return ""
     return " ".join(
@@ -19,67 +43,163 @@ def format_date(date_str):
     try:
         date_obj = email.utils.parsedate_to_datetime(date_str).astimezone(IST)
         return date_obj.strftime('%d %b %H:%M')
-    except:
+    except (TypeError, ValueError):
         return ''
 
 def clean_text(text):
     return text.replace(',', ' ').replace('\n', ' ').replace('\r', ' ').strip() if text else ''
 
+def load_state(path=EMAIL_STATE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'uidvalidity': None, 'uidnext': None, 'last_uid': 0}
+
+def parse_fetch(data):
+    """imaplib FETCH response -> [{'uid', 'header', 'text'}] in response order"""
+    messages = []
+    for item in data:
+        prefix = item[0] if isinstance(item, tuple) else item
+        if not isinstance(prefix, bytes):
+            continue
+        if re.match(rb'\d+ \(', prefix):
+            messages.append({'uid': None, 'header': b'', 'text': b''})
+        if not messages:
+            continue
+        current = messages[-1]
+        uid = re.search(rb'UID (\d+)', prefix)
+        if uid:
+            current['uid'] = int(uid.group(1))
+        if isinstance(item, tuple):
+            key = 'header' if b'HEADER' in prefix else 'text' if b'TEXT' in prefix else None
+            if key:
+                current[key] = item[1]
+    return [m for m in messages if m['uid'] is not None]
+
+def _decode_part(part):
+    """Text of a (possibly truncated) MIME part"""
+    raw = part.get_payload(decode=False)
+    if isinstance(raw, list):
+        return ''
+    data = raw.encode('ascii', errors='ignore') if isinstance(raw, str) else raw
+    encoding = str(part.get('Content-Transfer-Encoding', '')).strip().lower()
+    try:
+        if encoding == 'base64':
+            # The partial fetch can end mid-quantum
+            data = re.sub(rb'\s+', b'', data)
+            data = base64.b64decode(data[:len(data) // 4 * 4])
+        elif encoding == 'quoted-printable':
+            data = quopri.decodestring(re.sub(rb'=[0-9A-Fa-f]?$', b'', data))
+    except (binascii.Error, ValueError):
+        return ''
+    try:
+        return data.decode(part.get_content_charset() or 'utf-8', errors='ignore')
+    except LookupError:
+        return data.decode('utf-8', errors='ignore')
+
+def summarize(uid, header, text):
+    """Preview row for one message from its headers and the start of its text"""
+    msg = email.message_from_bytes(header.rstrip(b'\r\n') + b'\r\n\r\n' + text)
+    parts = [p for p in msg.walk() if p.get_content_maintype() == 'text'
+             and 'attachment' not in str(p.get('Content-Disposition'))]
+    plain = [p for p in parts if p.get_content_type() == 'text/plain']
+    body = _decode_part((plain or parts)[0]) if parts else ''
+    try:
+        time = email.utils.parsedate_to_datetime(msg.get('Date', '')).astimezone(IST).isoformat()
+    except (TypeError, ValueError):
+        time = ''
+    sender = decode_text(msg.get('From', ''))
+    return {
+        'uid': uid,
+        'time': time,
+        'date': clean_text(format_date(msg.get('Date', ''))),
+        'sender': sender.strip(),
+        'from': clean_text(extract_email(sender)),
+        'subject': clean_text(decode_text(msg.get('Subject', ''))),
+        'preview': clean_text(body[:200]),
+        'text': body[:ARCHIVE_CHARS],
+    }
+
+def connect():
+    if IMAP_SSL:
+        return imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT, timeout=30)
+    return imaplib.IMAP4(IMAP_HOST, IMAP_PORT, timeout=30)
+
+def sync(mail, state, limit=EMAIL_LIMIT):
+    """Fetch what arrived since state (UIDVALIDITY, UIDNEXT and the last UID)
+    in one FETCH, none when UIDNEXT has not moved; returns (new messages
+    newest first, updated state)"""
+    typ, data = mail.select('INBOX', readonly=True)
+    if typ != 'OK':
+        raise imaplib.IMAP4.error(f"SELECT failed: {data}")
+    exists = int(data[0] or 0)
+    uidvalidity = int(mail.response('UIDVALIDITY')[1][0])
+    uidnext = mail.response('UIDNEXT')[1][0]
+    uidnext = int(uidnext) if uidnext is not None else None
+
+    if uidvalidity != state.get('uidvalidity'):
+        # First run or the mailbox was rebuilt: UIDs are meaningless, start
+        # over with the newest messages
+        state = {'uidvalidity': uidvalidity, 'uidnext': None, 'last_uid': 0}
+    last_uid = state['last_uid']
+
+    # UIDNEXT only moves when a message arrives
+    if exists == 0 or (uidnext is not None and uidnext == state.get('uidnext')):
+        return [], dict(state, uidnext=uidnext)
+    if last_uid:
+        typ, data = mail.uid('FETCH', f'{last_uid + 1}:*', FETCH_ITEMS)
+    else:
+        typ, data = mail.fetch(f'{max(1, exists - limit + 1)}:{exists}', FETCH_ITEMS)
+    if typ != 'OK':
+        raise imaplib.IMAP4.error(f"FETCH failed: {data}")
+
+    # N:* also matches the newest message when nothing is newer than N
+    metrics.add(bytes=sum(len(item[1]) for item in data if isinstance(item, tuple)))
+    fetched = [m for m in parse_fetch(data) if m['uid'] > last_uid]
+    new = [summarize(m['uid'], m['header'], m['text']) for m in sorted(fetched, key=lambda m: m['uid'], reverse=True)]
+    last_uid = max([last_uid] + [m['uid'] for m in fetched])
+    return new, {'uidvalidity': uidvalidity, 'uidnext': uidnext, 'last_uid': last_uid}
+
+def preview_rows(store, limit=EMAIL_LIMIT):
+    """CSV rows for the newest limit archived messages"""
+    return [[m['date'], m['sender_short'], m['subject'], clean_text(m['text'][:200])] for m in store.latest(limit)]
+
+def save(new, state, store, state_file=EMAIL_STATE_FILE, output='Data/email.csv', limit=EMAIL_LIMIT):
+    """Archive the new messages, then write the state and the CSV (the
+    newest limit archived messages)"""
+    store.add(state['uidvalidity'], new)
+    write_output(state_file, json.dumps(state, indent=1))
+    rows = [['Date-Time', 'From', 'Subject', 'Body_Preview']] + preview_rows(store, limit)
+    rows.append(['', '', 'Update Time', clean_text(datetime.now(IST).strftime('%d %b %H:%M'))])
+    return write_csv(output, rows, footer_rows=1, lineterminator='\r\n')
+
+@metrics.job('fetch_emails')
 def fetch_emails():
     user, pwd = os.getenv('YANDEX_EMAIL'), os.getenv('YANDEX_APP_PASSWORD')
     if not user or not pwd: sys.exit('ERROR: Missing credentials')
 
     try:
-        mail = imaplib.IMAP4_SSL('imap.yandex.com', 993)
-        mail.login(user, pwd)
-        mail.select('INBOX')
-        
-        _, messages = mail.search(None, 'ALL')
-        email_ids = messages[0].split()[-20:]
-        
-        emails_data = []
-        for eid in reversed(email_ids):
-            _, msg_data = mail.fetch(eid, '(RFC822)')
-            msg = email.message_from_bytes(msg_data[0][1])
-            
-            date_time = clean_text(format_date(msg.get('Date', '')))
-            from_raw = decode_text(msg.get('From', ''))
-            from_short = clean_text(extract_email(from_raw))
-            subject = clean_text(decode_text(msg.get('Subject', '')))
-            
-            body = ''
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == 'text/plain' and 'attachment' not in str(part.get('Content-Disposition')):
-                        try: body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                        except: body = part.get_payload(decode=True).decode('latin-1', errors='ignore')
-                        break
-            else:
-                try: body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
-                except: body = msg.get_payload(decode=True).decode('latin-1', errors='ignore')
-            
-            body_clean = clean_text(body[:200])
-            emails_data.append([date_time, from_short, subject, body_clean])
-        
-        os.makedirs('Data', exist_ok=True)
-        
-        old_csv = 'Data/email.csv'
-        if os.path.exists(old_csv):
-            os.remove(old_csv)
-            print(f"🗑️ Deleted old file")
-        
-        update_time = clean_text(datetime.now(IST).strftime('%d %b %H:%M'))
-        emails_data.append(['', '', 'Update Time', update_time])
-        
-        with open('Data/email.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Date-Time', 'From', 'Subject', 'Body_Preview'])
-            writer.writerows(emails_data)
-        
-        print(f"✅ Saved {len(emails_data)-1} emails + update row (newest first)")
+        with metrics.span('connect'):
+            mail = connect()
+            mail.login(user, pwd)
+        store = EmailStore()
+        with metrics.span('fetch'):
+            # The archive is not committed; when it starts out empty (first
+            # run, evicted cache) fetch the newest messages again
+            new, state = sync(mail, load_state() if store.count() else {})
+
+        with metrics.span('write'):
+            written = save(new, state, store)
+        print(f"{len(new)} new emails, {store.count()} archived")
+        store.close()
+        if written:
+            print(f"✅ Saved the newest {EMAIL_LIMIT} emails + update row (newest first)")
+        else:
+            print("No new emails, Data/email.csv unchanged")
         mail.close()
         mail.logout()
-        
+
     except Exception as e:
         sys.exit(f'ERROR: {e}')
 
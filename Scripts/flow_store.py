@@ -0,0 +1,254 @@
+"""Append-only daily FII/DII flow history with running aggregates.
+
+flows.bin is a run of RECORD_DTYPE records (days since 1970-01-01, then
+buy / sell / net for FII and DII cash and the F&O nets, Rs crore, NaN when
+the source leaves them out), oldest first, opened with np.memmap. Dates
+after the last stored one are appended, and any of the last REVISE_DAYS
+stored days a later response has more fields for is rewritten in place
+(Sensibull publishes F&O flows after cash). stats.json holds, per net
+series in AGGREGATES, the rolling sums over WINDOWS days, the current
+buy/sell streak and the month-to-date total; each append updates them in
+O(1) -- the value leaving a window is read back from the memmap -- so a
+run never rescans the history unless a day was rewritten. recompute()
+derives the same numbers from the whole file:
+
+    python Scripts/flow_store.py [--root Data/fii_dii] [--days 10] [--verify]
+"""
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+FLOW_STORE_DIR = os.getenv('FLOW_STORE_DIR', 'Data/fii_dii')
+RECORD_DTYPE = [('date', '<i4'),
+                ('fii_buy', '<f8'), ('fii_sell', '<f8'), ('fii_net', '<f8'),
+                ('dii_buy', '<f8'), ('dii_sell', '<f8'), ('dii_net', '<f8'),
+                ('fii_fno_net', '<f8'), ('dii_fno_net', '<f8')]
+AGGREGATES = ['fii_net', 'dii_net', 'fii_fno_net', 'dii_fno_net']
+WINDOWS = [5, 10, 20, 60]
+REVISE_DAYS = 5
+
+EPOCH = date(1970, 1, 1)
+
+
+def _record_dtype():
+    import numpy as np
+    return np.dtype(RECORD_DTYPE)
+
+
+def record_from_sensibull(day: Dict) -> Dict[str, float]:
+    """One date of the fii_dii_daily payload as record fields. F&O nets are
+    summed over every segment other than cash that carries the side."""
+    nan = float('nan')
+    values = {}
+    for side in ('fii', 'dii'):
+        cash = (day.get('cash') or {}).get(side) or {}
+        for field, key in (('buy', 'buy'), ('sell', 'sell'), ('net', 'buy_sell_difference')):
+            value = cash.get(key)
+            values[f'{side}_{field}'] = float(value) if value is not None else nan
+        fno = [seg[side]['buy_sell_difference'] for name, seg in day.items()
+               if name != 'cash' and isinstance(seg, dict) and isinstance(seg.get(side), dict)
+               and seg[side].get('buy_sell_difference') is not None]
+        values[f'{side}_fno_net'] = float(sum(fno)) if fno else nan
+    return values
+
+
+def _empty_stats():
+    return {'last': None, 'count': 0,
+            'series': {name: {'sums': {str(w): 0.0 for w in WINDOWS}, 'streak': 0, 'month': None, 'mtd': 0.0}
+                       for name in AGGREGATES}}
+
+
+def _streak(streak: int, value: float) -> int:
+    """Consecutive net-buy (positive) or net-sell (negative) days"""
+    if value > 0:
+        return streak + 1 if streak > 0 else 1
+    if value < 0:
+        return streak - 1 if streak < 0 else -1
+    return 0
+
+
+class FlowStore:
+    def __init__(self, root: str = FLOW_STORE_DIR) -> None:
+        self.root = root
+        self.path = os.path.join(root, 'flows.bin')
+        self.stats_path = os.path.join(root, 'stats.json')
+        try:
+            with open(self.stats_path) as f:
+                self.stats = json.load(f)
+        except (OSError, ValueError):
+            self.stats = None
+        if self.stats is None or self.stats.get('count') != len(self.records()):
+            # Missing, or out of step with flows.bin after an interrupted run
+            self.stats = self.recompute()
+
+    def records(self):
+        """All records as a read-only structured memmap (empty if none)"""
+        import numpy as np
+
+        dtype = _record_dtype()
+        count = os.path.getsize(self.path) // dtype.itemsize if os.path.exists(self.path) else 0
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', shape=(count,))
+
+    def last_date(self) -> Optional[date]:
+        return date.fromisoformat(self.stats['last']) if self.stats['last'] else None
+
+    def append(self, days: Dict[date, Dict[str, float]]) -> int:
+        """Append the days after the last stored date, oldest first, fill in
+        recent stored days the response now has more fields for, and update
+        the aggregates. Returns the number of records written."""
+        import numpy as np
+
+        dtype = _record_dtype()
+        last = self.last_date()
+        new = sorted(d for d in days if last is None or d > last)
+        revised = self._revise({d: v for d, v in days.items() if last is not None and d <= last})
+        if not new and not revised:
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+        records = np.zeros(len(new), dtype=dtype)
+        for i, day in enumerate(new):
+            records[i]['date'] = (day - EPOCH).days
+            for name in dtype.names[1:]:
+                records[i][name] = days[day].get(name, np.nan)
+
+        with open(self.path, 'ab') as f:
+            # Drop a torn record left by an interrupted append
+            f.truncate(os.path.getsize(self.path) // dtype.itemsize * dtype.itemsize)
+            f.write(records.tobytes())
+        if revised:
+            self.stats = self.recompute()
+        else:
+            history = self.records()
+            for day in new:
+                self._update(history, self.stats['count'], day)
+        tmp = f"{self.stats_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.stats, f, indent=1)
+        os.replace(tmp, self.stats_path)
+        return len(new) + revised
+
+    def _revise(self, days: Dict[date, Dict[str, float]]) -> int:
+        """Rewrite the last REVISE_DAYS stored records in place where days
+        carries a value for a field they hold as NaN. Returns the number of
+        records rewritten."""
+        import numpy as np
+
+        history = self.records()
+        start = max(len(history) - REVISE_DAYS, 0)
+        tail = np.array(history[start:])
+        changed = []
+        for day, values in days.items():
+            i = np.searchsorted(tail['date'], (day - EPOCH).days)
+            if i == len(tail) or tail[i]['date'] != (day - EPOCH).days:
+                continue
+            filled = [name for name in tail.dtype.names[1:]
+                      if np.isnan(tail[i][name]) and np.isfinite(values.get(name, np.nan))]
+            if not filled:
+                continue
+            for name in tail.dtype.names[1:]:
+                if np.isfinite(values.get(name, np.nan)):
+                    tail[i][name] = values[name]
+            changed.append(i)
+        if changed:
+            history = np.memmap(self.path, dtype=tail.dtype, mode='r+', shape=(len(history),))
+            for i in changed:
+                history[start + i] = tail[i]
+            history.flush()
+            del history
+        return len(changed)
+
+    def _update(self, history, position: int, day: date) -> None:
+        """Fold record `position` of history (dated day) into the aggregates"""
+        import numpy as np
+
+        record = history[position]
+        for name, series in self.stats['series'].items():
+            value = float(record[name])
+            value = value if np.isfinite(value) else 0.0
+            for w in WINDOWS:
+                leaving = 0.0
+                if position >= w:
+                    leaving = float(history[position - w][name])
+                    leaving = leaving if np.isfinite(leaving) else 0.0
+                series['sums'][str(w)] += value - leaving
+            series['streak'] = _streak(series['streak'], value)
+            month = day.strftime('%Y-%m')
+            series['mtd'] = series['mtd'] + value if series['month'] == month else value
+            series['month'] = month
+        self.stats['last'] = day.isoformat()
+        self.stats['count'] = position + 1
+
+    def recompute(self) -> Dict:
+        """The aggregates from the whole history, vectorized"""
+        import numpy as np
+
+        history = self.records()
+        stats = _empty_stats()
+        if not len(history):
+            return stats
+        days = history['date'].astype('datetime64[D]')
+        month = days.astype('datetime64[M]')
+        stats['last'] = str(days[-1])
+        stats['count'] = len(history)
+        for name, series in stats['series'].items():
+            values = np.nan_to_num(np.asarray(history[name], dtype=float))
+            for w in WINDOWS:
+                series['sums'][str(w)] = float(values[-w:].sum())
+            sign = np.sign(values)
+            run = 0
+            while run < len(sign) and sign[-1 - run] == sign[-1] != 0:
+                run += 1
+            series['streak'] = int(run * sign[-1])
+            series['month'] = str(month[-1])
+            series['mtd'] = float(values[month == month[-1]].sum())
+        return stats
+
+    def latest(self, count: int):
+        """The newest count records, newest first"""
+        return self.records()[::-1][:count]
+
+
+def main():
+    import argparse
+
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="FII/DII flow history and aggregates")
+    parser.add_argument('--root', default=FLOW_STORE_DIR)
+    parser.add_argument('--days', type=int, default=10, help="recent days to list")
+    parser.add_argument('--verify', action='store_true', help="check the running aggregates against a full recompute")
+    args = parser.parse_args()
+
+    store = FlowStore(args.root)
+    records = store.records()
+    if not len(records):
+        print("No flows stored")
+        return
+    first = EPOCH + timedelta(days=int(records['date'][0]))
+    print(f"{len(records)} days, {first} to {store.stats['last']}")
+    print(f"{'date':10} {'FII net':>10} {'DII net':>10} {'FII F&O':>10} {'DII F&O':>10}")
+    for r in store.latest(args.days):
+        print(f"{str(EPOCH + timedelta(days=int(r['date']))):10} " +
+              ' '.join(f"{r[n]:>10.0f}" for n in AGGREGATES))
+    print(f"\n{'series':12} " + ' '.join(f"{str(w) + 'D':>9}" for w in WINDOWS) + f" {'MTD':>9} {'streak':>7}")
+    for name, series in store.stats['series'].items():
+        print(f"{name:12} " + ' '.join(f"{series['sums'][str(w)]:>9.0f}" for w in WINDOWS) +
+              f" {series['mtd']:>9.0f} {series['streak']:>7}")
+    if args.verify:
+        full = store.recompute()
+        same = all(np.isclose(full['series'][n]['sums'][k], s['sums'][k], atol=1e-6)
+                   and full['series'][n]['streak'] == s['streak'] and np.isclose(full['series'][n]['mtd'], s['mtd'])
+                   for n, s in store.stats['series'].items() for k in s['sums'])
+        print(f"\nRunning aggregates match a full recompute: {same}")
+        # A rewritten day must replace its record, never add a second one
+        print(f"Dates strictly increasing: {bool(np.all(np.diff(records['date']) > 0))}")
+        tail = records[-REVISE_DAYS:]
+        partial = [str(EPOCH + timedelta(days=int(r['date']))) for r in tail
+                   if any(np.isnan(r[n]) for n in AGGREGATES)]
+        print(f"Last {REVISE_DAYS} days still missing a net: {', '.join(partial) or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
-import requests, pandas as pd, os, pytz
+import os, sys, pytz
 from datetime import datetime
 
-headers = {'User-Agent': 'Mozilla/5.0'}
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from tv_quotes import fetch_quotes
+from output_store import write_csv
+
 commodity_symbols = [
     {"name": "Dow Jones", "symbol": "OANDA:US30USD"},
     {"name": "S&P 500", "symbol": "CME_MINI:ES1!"},
@@ -28,32 +32,42 @@ def format_value(value, key, name):
             val = float(value)
             return str(int(val))
         return str(float(value))
-    except: return "0"
+    except (TypeError, ValueError): return "0"
 
-commodity_data = []
-for c in commodity_symbols:
-    try:
-        data = requests.get(f"https://scanner.tradingview.com/symbol?symbol={c['symbol']}&fields=close[1],change_abs,price_52_week_high,price_52_week_low,close,change&no_404=true", headers=headers, timeout=5).json()
-        commodity_data.append({
-            'Index': c["name"],
-            'LTP': format_value(data.get('close'), 'LTP', c["name"]),
-            'Chng': format_value(data.get('change_abs'), 'Chng', c["name"]),
-            '%': format_value(data.get('change'), '%', c["name"]),
-            'Prev.': format_value(data.get('close[1]'), 'Prev.', c["name"]),
-            'Yr Hi': format_value(data.get('price_52_week_high'), 'Yr Hi', c["name"]),
-            'Yr Lo': format_value(data.get('price_52_week_low'), 'Yr Lo', c["name"])
-        })
-    except:
-        commodity_data.append({
-            'Index': c["name"],
-            'LTP': "0", 'Chng': "0", '%': "0.00%",
-            'Prev.': "0", 'Yr Hi': "0", 'Yr Lo': "0"
-        })
+def build_records(quotes):
+    commodity_data = []
+    for c, data in zip(commodity_symbols, quotes):
+        try:
+            commodity_data.append({
+                'Index': c["name"],
+                'LTP': format_value(data.get('close'), 'LTP', c["name"]),
+                'Chng': format_value(data.get('change_abs'), 'Chng', c["name"]),
+                '%': format_value(data.get('change'), '%', c["name"]),
+                'Prev.': format_value(data.get('close[1]'), 'Prev.', c["name"]),
+                'Yr Hi': format_value(data.get('price_52_week_high'), 'Yr Hi', c["name"]),
+                'Yr Lo': format_value(data.get('price_52_week_low'), 'Yr Lo', c["name"])
+            })
+        except AttributeError:  # no quote
+            commodity_data.append({
+                'Index': c["name"],
+                'LTP': "0", 'Chng': "0", '%': "0.00%",
+                'Prev.': "0", 'Yr Hi': "0", 'Yr Lo': "0"
+            })
+
+    commodity_data.append({
+        'Index': '', 'LTP': '', 'Chng': '', '%': '',
+        'Prev.': '', 'Yr Hi': 'Update Time', 'Yr Lo': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M')
+    })
+    return commodity_data
 
-commodity_data.append({
-    'Index': '', 'LTP': '', 'Chng': '', '%': '',
-    'Prev.': '', 'Yr Hi': 'Update Time', 'Yr Lo': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M')
-})
+@metrics.job('global_data')
+def main():
+    with metrics.span('fetch'):
+        quotes = fetch_quotes([c["symbol"] for c in commodity_symbols], timeout=5)
+    with metrics.span('transform'):
+        commodity_data = build_records(quotes)
+    with metrics.span('write'):
+        write_csv('Data/GLOBAL_DATA.csv', commodity_data, fieldnames=list(commodity_data[0]), footer_rows=1)
 
-os.makedirs('Data', exist_ok=True)
-pd.DataFrame(commodity_data).to_csv('Data/GLOBAL_DATA.csv', index=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""Shared HTTP layer for the collectors: timeouts, deadlines, retries,
+hedged requests and per-host circuit breakers.
+
+Every request goes through HttpClient.request with the Policy of its host
+(POLICIES, else DEFAULT_POLICY):
+
+- timeout bounds each connect and read, deadline the whole call, retries
+  and backoff included. The attempt runs on the client's pool, so a server
+  that trickles bytes cannot hold the caller past the deadline either.
+- Idempotent requests (GET/HEAD, or idempotent=True for read-only POSTs)
+  are retried on connection errors, timeouts and RETRY_STATUSES with
+  exponential backoff and jitter.
+- With hedge set, a duplicate is sent when the first attempt has not
+  answered after hedge seconds, and whichever answers first wins.
+- After breaker_failures consecutive failures a host's breaker opens: calls
+  fail at once with CircuitOpenError for breaker_cooldown seconds, then one
+  trial request decides whether it closes again.
+
+fetch_json / with_fallback keep the last good payload per request in
+LAST_GOOD_DIR and, when a request fails, return it marked stale (see
+stale_since) instead of raising. Errors raised here are OSError subclasses,
+as are requests' own, so `except (OSError, ValueError)` covers a failed
+request and a bad JSON body.
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import metrics
+
+# Last good payloads, one file per request (empty HTTP_LAST_GOOD_DIR:
+# in-process only); older than LAST_GOOD_MAX_AGE they are not served
+LAST_GOOD_DIR = os.getenv('HTTP_LAST_GOOD_DIR', os.path.join(tempfile.gettempdir(), 'http_last_good'))
+LAST_GOOD_MAX_AGE = float(os.getenv('HTTP_LAST_GOOD_MAX_AGE', str(24 * 3600)))
+MAX_WORKERS = int(os.getenv('HTTP_MAX_WORKERS', '32'))
+
+IDEMPOTENT = {'GET', 'HEAD', 'OPTIONS'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+headers = {'User-Agent': 'Mozilla/5.0'}
+
+
+class Policy(NamedTuple):
+    timeout: float = 10          # seconds per connect / read
+    deadline: float = 30         # seconds for the whole call
+    retries: int = 2             # extra attempts for idempotent requests
+    backoff: float = 0.5         # first retry delay, doubled each time
+    backoff_max: float = 4
+    hedge: Optional[float] = None  # seconds before a duplicate is sent
+    breaker_failures: int = 5
+    breaker_cooldown: float = 60
+
+
+DEFAULT_POLICY = Policy()
+POLICIES = {
+    'www.nseindia.com': Policy(timeout=10, deadline=25, retries=2, backoff=1),
+    'scanner.tradingview.com': Policy(timeout=5, deadline=10, retries=1, backoff=0.25, hedge=1.5),
+    'oxide.sensibull.com': Policy(timeout=10, deadline=25, retries=2),
+    'www.amfiindia.com': Policy(timeout=30, deadline=90, retries=2, backoff=2),
+    'techfanetechnologies.github.io': Policy(timeout=5, deadline=10, retries=1),
+}
+
+
+class HttpError(OSError):
+    """A request that failed after its retries; response is the last one
+    received, if any"""
+
+    def __init__(self, message: str, response=None) -> None:
+        super().__init__(message)
+        self.response = response
+
+
+class CircuitOpenError(HttpError):
+    pass
+
+
+class DeadlineExceeded(HttpError, TimeoutError):
+    pass
+
+
+class StaleDict(dict):
+    fetched = 0.0
+
+
+class StaleList(list):
+    fetched = 0.0
+
+
+def stale_since(value) -> Optional[float]:
+    """Epoch time a stale fallback value was fetched, None for fresh data"""
+    return value.fetched if isinstance(value, (StaleDict, StaleList)) else None
+
+
+def fetched_at(value, tz=None) -> datetime:
+    """When value was fetched: now, or the original time of a stale value"""
+    since = stale_since(value)
+    return datetime.fromtimestamp(since, tz) if since is not None else datetime.now(tz)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one host"""
+
+    def __init__(self, failures: int, cooldown: float) -> None:
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened is None:
+            return 'closed'
+        return 'open' if time.monotonic() - self.opened < self.cooldown else 'half-open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened is None:
+                return True
+            if time.monotonic() - self.opened < self.cooldown:
+                return False
+            # Half-open: this caller makes the trial, the rest keep failing
+            # fast until it reports back
+            self.opened = time.monotonic()
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened = time.monotonic()
+
+
+class HttpClient:
+    def __init__(self, policies: Optional[Dict[str, Policy]] = None, default: Policy = DEFAULT_POLICY,
+                 last_good_dir: Optional[str] = LAST_GOOD_DIR, pool_size: int = 16,
+                 max_workers: int = MAX_WORKERS) -> None:
+        self.policies = POLICIES if policies is None else policies
+        self.default = default
+        self.last_good_dir = last_good_dir
+        self.pool_size = pool_size
+        self.stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'hedges': 0,
+                      'failures': 0, 'rejected': 0, 'stale': 0}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._last_good: Dict[str, tuple] = {}
+        self._session = None
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http')
+
+    @property
+    def session(self):
+        """Default keep-alive session (callers may pass their own)"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update(headers)
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def policy(self, url: str) -> Policy:
+        return self.policies.get(urlsplit(url).netloc, self.default)
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        policy = self.policy(url)
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(policy.breaker_failures, policy.breaker_cooldown)
+            return self._breakers[host]
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def request(self, method: str, url: str, session=None, idempotent: Optional[bool] = None,
+                timeout: Optional[float] = None, deadline: Optional[float] = None,
+                retries: Optional[int] = None, hedge: Optional[float] = None, **kwargs):
+        """One request under the host's Policy (arguments override it).
+
+        Returns the response, whatever its status, unless the status is in
+        RETRY_STATUSES and retries run out; raises HttpError (CircuitOpenError,
+        DeadlineExceeded) or the last requests exception otherwise.
+        """
+        policy = self.policy(url)
+        breaker = self.breaker(url)
+        session = session or self.session
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT
+        timeout = policy.timeout if timeout is None else timeout
+        end = time.monotonic() + (policy.deadline if deadline is None else deadline)
+        retries = (policy.retries if retries is None else retries) if idempotent else 0
+        hedge = (policy.hedge if hedge is None else hedge) if idempotent else None
+        self._count('requests')
+
+        error = None
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                self._count('rejected')
+                metrics.add(requests=1, retries=attempt)
+                raise CircuitOpenError(f"{urlsplit(url).netloc}: circuit open after "
+                                       f"{breaker.failures} failures") from error
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                self._count('retries')
+
+            def send():
+                self._count('attempts')
+                return session.request(method, url, timeout=min(timeout, remaining), **kwargs)
+
+            try:
+                response = self._race(send, hedge, remaining)
+            except OSError as e:
+                # Connection errors and timeouts (requests' are OSErrors too)
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.success()
+                    # A streamed body is counted by whoever reads it
+                    metrics.add(requests=1, retries=attempt,
+                                bytes=0 if kwargs.get('stream') else len(response.content))
+                    return response
+                error = HttpError(f"{method} {url}: HTTP {response.status_code}", response)
+            breaker.failure()
+            self._count('failures')
+            if attempt < retries:
+                delay = min(policy.backoff_max, policy.backoff * 2 ** attempt) * random.uniform(0.5, 1)
+                time.sleep(max(0, min(delay, end - time.monotonic())))
+        metrics.add(requests=1, retries=attempt)
+        if error is None or time.monotonic() >= end:
+            raise DeadlineExceeded(f"{method} {url}: no answer within the deadline") from error
+        raise error
+
+    def _race(self, send: Callable, hedge: Optional[float], remaining: float):
+        """send() on the pool, plus a duplicate after hedge seconds without an
+        answer; the first answer wins. Raises the last error when every copy
+        fails, DeadlineExceeded when none answers within remaining."""
+        end = time.monotonic() + remaining
+        futures = [self._pool.submit(send)]
+        error = None
+        while futures:
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            wait_for = min(left, hedge) if hedge is not None else left
+            done, pending = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            futures = list(pending)
+            if hedge is not None and not done and time.monotonic() < end:
+                # Slow, not failed: one duplicate to cut the tail
+                self._count('hedges')
+                futures.append(self._pool.submit(send))
+                hedge = None
+        if futures:
+            # Abandoned attempts end with their own timeout
+            raise DeadlineExceeded("no answer within the deadline") from error
+        raise error
+
+    def _last_good_path(self, key: str) -> str:
+        return os.path.join(self.last_good_dir, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def remember(self, key: str, data) -> None:
+        """Store data as the last good payload for key"""
+        now = time.time()
+        with self._lock:
+            self._last_good[key] = (now, data)
+        if not self.last_good_dir:
+            return
+        path = self._last_good_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.last_good_dir, exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump({'key': key, 'time': now, 'data': data}, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def last_good(self, key: str):
+        """(fetched epoch, data) last remembered for key and still young
+        enough, else None"""
+        with self._lock:
+            entry = self._last_good.get(key)
+        if entry is None and self.last_good_dir:
+            try:
+                with open(self._last_good_path(key)) as f:
+                    saved = json.load(f)
+                if saved.get('key') == key:
+                    entry = (saved['time'], saved['data'])
+            except (OSError, ValueError, KeyError):
+                pass
+        if entry is None or time.time() - entry[0] > LAST_GOOD_MAX_AGE:
+            return None
+        return entry
+
+    def with_fallback(self, key: str, fetch: Callable):
+        """fetch(), remembered under key; when it raises OSError or
+        ValueError, the last good value for key marked stale (the error is
+        re-raised when there is none)"""
+        try:
+            data = fetch()
+        except (OSError, ValueError) as e:
+            entry = self.last_good(key)
+            if entry is None or not isinstance(entry[1], (dict, list)):
+                raise
+            fetched, data = entry
+            self._count('stale')
+            print(f"Warning: {e}; serving the last good response, "
+                  f"{(time.time() - fetched) / 60:.0f} min old (stale)")
+            value = StaleDict(data) if isinstance(data, dict) else StaleList(data)
+            value.fetched = fetched
+            return value
+        self.remember(key, data)
+        return data
+
+    def fetch_json(self, url: str, method: str = 'GET', stale: bool = True, **kwargs):
+        """Decoded JSON body of a successful request; with stale, the last
+        good body (marked stale) when the request fails"""
+        def fetch():
+            response = self.request(method, url, **kwargs)
+            response.raise_for_status()
+            with metrics.span('decode'):
+                return response.json()
+
+        if not stale:
+            return fetch()
+        body = kwargs.get('json', kwargs.get('data'))
+        key = f"{method.upper()} {url}" + (f" {json.dumps(body, sort_keys=True)}" if body is not None else '')
+        return self.with_fallback(key, fetch)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Process-wide client so every collector shares breakers and pools"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
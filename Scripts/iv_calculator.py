@@ -1,27 +1,106 @@
-import datetime
+import math
+import os
 import scipy.stats
 import numpy as np
 from scipy.stats import norm
 from enum import Enum, IntEnum
 from scipy.optimize import brentq
-from datetime import datetime as dt, timedelta
+from datetime import datetime as dt
 from numpy import abs as ABS, exp as EXP, log as LOG, sqrt as SQRT
 from typing import Tuple, List, Dict, Literal, Union, Any
+from market_calendar import TradingCalendar, NSE_FO
+
+RSQRT2PI = 0.39894228040143267793994605993438
+RSQRT2 = 0.70710678118654752440084436210485
+
+
+def cnd(d):
+    """Abramowitz & Stegun 26.2.17 polynomial normal CDF"""
+    A1 = 0.31938153
+    A2 = -0.356563782
+    A3 = 1.781477937
+    A4 = -1.821255978
+    A5 = 1.330274429
+    K = 1.0 / (1.0 + 0.2316419 * ABS(d))
+    ret_val = (
+        RSQRT2PI
+        * EXP(-0.5 * d * d)
+        * (K * (A1 + K * (A2 + K * (A3 + K * (A4 + K * A5)))))
+    )
+    return np.where(d > 0, 1.0 - ret_val, ret_val)
+
+
+def hart_cdf(x):
+    """Vectorized normal CDF, Hart (1968) double precision algorithm as
+    published by West (2005): rational approximation below 7.07, continued
+    fraction in the tails"""
+    x = np.asarray(x, dtype=float)
+    a = ABS(x)
+    e = EXP(-0.5 * a * a)
+    num = ((((((3.52624965998911e-02 * a + 0.700383064443688) * a
+                + 6.37396220353165) * a + 33.912866078383) * a
+              + 112.079291497871) * a + 221.213596169931) * a
+           + 220.206867912376)
+    den = (((((((8.83883476483184e-02 * a + 1.75566716318264) * a
+                 + 16.064177579207) * a + 86.7807322029461) * a
+               + 296.564248779674) * a + 637.333633378831) * a
+             + 793.826512519948) * a + 440.413735824752)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tail = a + 0.65
+        tail = a + 4 / tail
+        tail = a + 3 / tail
+        tail = a + 2 / tail
+        tail = a + 1 / tail
+        c = np.where(a < 7.07106781186547, e * num / den, e / tail / 2.506628274631)
+    c = np.where(a > 37, 0.0, c)
+    c = np.where(x > 0, 1.0 - c, c)
+    return c if c.ndim else float(c)
+
+
+def numpy_pdf(x):
+    return RSQRT2PI * EXP(-0.5 * np.square(x))
+
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+_exp = np.frompyfunc(math.exp, 1, 1)
+
+
+def erf_cdf(x):
+    """math.erfc normal CDF, element-wise for arrays"""
+    if np.ndim(x) == 0:
+        return 0.5 * math.erfc(-float(x) * RSQRT2)
+    return np.asarray(0.5 * _erfc(np.multiply(x, -RSQRT2)), dtype=float)
+
+
+def erf_pdf(x):
+    if np.ndim(x) == 0:
+        return RSQRT2PI * math.exp(-0.5 * float(x) ** 2)
+    return np.asarray(RSQRT2PI * _exp(-0.5 * np.square(x)), dtype=float)
+
+
+# Normal CDF/PDF backends. Max abs CDF error vs scipy.stats.norm.cdf on
+# [-12, 12] (see bench_norm.py): erf ~2e-16, numpy ~4e-14 (relative
+# error under 1e-8 in the tails), cnd ~7.5e-8 (A&S bound)
+NORM_BACKENDS = {
+    "scipy": (norm.cdf, norm.pdf),
+    "erf": (erf_cdf, erf_pdf),
+    "numpy": (hart_cdf, numpy_pdf),
+    "cnd": (cnd, numpy_pdf),
+}
+
+NORM_CDF, NORM_PDF = NORM_BACKENDS["scipy"]
+
+
+def set_norm_backend(name: str) -> None:
+    """Select the normal CDF/PDF used by all pricing and IV functions"""
+    global NORM_CDF, NORM_PDF
+    if name not in NORM_BACKENDS:
+        raise ValueError(f"Unknown normal backend {name!r}, choose from {list(NORM_BACKENDS)}")
+    NORM_CDF, NORM_PDF = NORM_BACKENDS[name]
+
+
+set_norm_backend(os.getenv("IV_NORM_BACKEND", "scipy"))
 
-NORM_CDF = norm.cdf
-NORM_PDF = norm.pdf
-
-# Indian Holidays 2025&2026 (Updated)
-HOLIDAYS = [
-    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10",
-    "2025-04-14", "2025-04-18", "2025-05-01", "2025-08-15",
-    "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
-    "2025-11-05", "2025-12-25", "2026-01-26", "2026-03-03", 
-    "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14", 
-    "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", 
-    "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", 
-    "2026-12-25"
-]
 CURRENTYEAR = str(dt.now().year)
 NEXTYEAR = str(dt.now().year + 1)
 
@@ -31,19 +110,79 @@ class ExpType(Enum):
     MONTHLY = "MONTHLY"
 
 
+BUSINESS_CALENDAR = TradingCalendar()
+TRADING_CALENDAR = NSE_FO
+
+
 class DayCountType(IntEnum):
     CALENDARDAYS = 365
-    BUSINESSDAYS = np.busday_count(
-        begindates=str(CURRENTYEAR),
-        enddates=str(NEXTYEAR),
-        weekmask="1111100",
+    BUSINESSDAYS = BUSINESS_CALENDAR.days_in_year(int(CURRENTYEAR))
+    TRADINGDAYS = TRADING_CALENDAR.days_in_year(int(CURRENTYEAR))
+
+
+def days_to_expiry(
+    FromDateTime: dt,
+    ExpiryDates,
+    dayCountType: DayCountType = DayCountType.CALENDARDAYS,
+) -> np.ndarray:
+    """Days to expiry (15:30 on each expiry date) for one valuation time.
+
+    CALENDARDAYS counts wall-clock days; BUSINESSDAYS/TRADINGDAYS count the
+    trading days left minus the elapsed part of today and the 8h30m after
+    the close, as CalcIvGreeks.get_dte always has.
+    """
+    expiry = np.asarray(ExpiryDates, dtype="datetime64[D]")
+    now = np.datetime64(FromDateTime.replace(tzinfo=None), "us")
+    today = now.astype("datetime64[D]")
+    secondsInDay = CalcIvGreeks.SECONDS_IN_A_DAY
+
+    if dayCountType == DayCountType.CALENDARDAYS:
+        close = expiry + np.timedelta64(15 * 60 + 30, "m")
+        return (close - now).astype(CalcIvGreeks.TD64S) / secondsInDay
+
+    return (
+        TRADING_CALENDAR.busday_count(today, expiry + np.timedelta64(1, "D"))
+        * secondsInDay
+        - np.timedelta64(8 * 3600 + 30 * 60, "s")
+        - (now - today).astype(CalcIvGreeks.TD64S)
+    ) / secondsInDay
+
+
+def time_to_expiry(
+    FromDateTime: dt,
+    ExpiryDates,
+    dayCountType: DayCountType = DayCountType.CALENDARDAYS,
+) -> np.ndarray:
+    """Time to expiry in years for one valuation time and array of expiries.
+
+    Days from days_to_expiry over the length of the year in the same day
+    count, spanning year ends the way CalcIvGreeks.get_tte always has.
+    """
+    dte = days_to_expiry(FromDateTime, ExpiryDates, dayCountType)
+    if dayCountType == DayCountType.CALENDARDAYS:
+        return dte / DayCountType.CALENDARDAYS.value
+
+    calendar = (
+        BUSINESS_CALENDAR
+        if dayCountType == DayCountType.BUSINESSDAYS
+        else TRADING_CALENDAR
     )
-    TRADINGDAYS = np.busday_count(
-        begindates=str(CURRENTYEAR),
-        enddates=str(NEXTYEAR),
-        weekmask="1111100",
-        holidays=HOLIDAYS,
+    expiry = np.asarray(ExpiryDates, dtype="datetime64[D]")
+    today = np.datetime64(FromDateTime.replace(tzinfo=None), "D")
+    pastYear = today.astype("datetime64[Y]").astype(np.int64) + 1970
+    futureYear = expiry.astype("datetime64[Y]").astype(np.int64) + 1970
+    yearsAhead = futureYear - pastYear
+    daysInYear = np.select(
+        [yearsAhead == 0, yearsAhead == 1, yearsAhead >= 2],
+        [
+            calendar.days_in_year(pastYear),
+            calendar.busday_count(today, np.datetime64(f"{pastYear + 1}-01-01", "D"))
+            + calendar.days_in_year(futureYear),
+            calendar.busday_count(today, expiry + np.timedelta64(1, "D")),
+        ],
+        DayCountType.CALENDARDAYS.value,
     )
+    return dte / daysInYear
 
 
 class TryMatchWith(Enum):
@@ -151,21 +290,21 @@ class CalcIvGreeks:
     @staticmethod
     def getRiskFreeIntrRate() -> float:
         import pandas as pd
-        import requests
+        from http_client import get_client
         
         try:
             return (
                 pd.json_normalize(
-                    requests.get(
+                    get_client().fetch_json(
                         "https://techfanetechnologies.github.io"
                         + "/risk_free_interest_rate/RiskFreeInterestRate.json"
-                    ).json()
+                    )
                 )
                 .query('GovernmentSecurityName == "364 day T-bills"')
                 .reset_index()
                 .Percent[0]
             )
-        except:
+        except (OSError, ValueError, LookupError, NameError):  # request, JSON or payload shape
             return 6.0  # Default 6% if fetch fails
 
     @staticmethod
@@ -178,137 +317,18 @@ class CalcIvGreeks:
             self.datePast = dt.now()
 
     def get_dte(self) -> float:
-        if self.dayCountType == DayCountType.CALENDARDAYS:
-            return (
-                np.datetime64(
-                    dt.combine(
-                        self.dateFuture.date(), datetime.time(15, 30, 0)
-                    )
-                )
-                - np.datetime64(self.datePast)
-            ).astype(self.TD64S) / self.SECONDS_IN_A_DAY
-        else:
-            return (
-                (
-                    np.busday_count(
-                        begindates=self.datePast.date(),
-                        enddates=(self.dateFuture + timedelta(days=1)).date(),
-                        weekmask="1111100",
-                        holidays=HOLIDAYS,
-                    )
-                    * self.SECONDS_IN_A_DAY
-                )
-                - (
-                    np.datetime64(
-                        int(
-                            timedelta(
-                                hours=8, minutes=30, seconds=0
-                            ).total_seconds()
-                        ),
-                        "s",
-                    )
-                ).astype(self.TD64S)
-                - (
-                    np.datetime64(self.datePast)
-                    - np.datetime64(
-                        dt.combine(
-                            self.datePast.date(), datetime.time(0, 0, 0)
-                        )
-                    )
-                ).astype(self.TD64S)
-            ) / self.SECONDS_IN_A_DAY
+        return float(
+            days_to_expiry(self.datePast, self.dateFuture.date(), self.dayCountType)
+        )
 
     def get_tte(self) -> float:
         self.refreshNow()
         return float(
-            self.get_dte()
-            / (
-                self.dayCountType.value
-                if (
-                    (
-                        self.dayCountType == DayCountType.BUSINESSDAYS
-                        and self.datePast.year == self.dateFuture.year
-                    )
-                    or (
-                        self.dayCountType == DayCountType.TRADINGDAYS
-                        and self.datePast.year == self.dateFuture.year
-                    )
-                )
-                else (
-                    np.busday_count(
-                        begindates=self.datePast.date(),
-                        enddates=f"{self.datePast.year+1}-01-01",
-                        weekmask="1111100",
-                    )
-                    + np.busday_count(
-                        begindates=str(self.dateFuture.year),
-                        enddates=str(self.dateFuture.year + 1),
-                        weekmask="1111100",
-                    )
-                )
-                if (
-                    self.dayCountType == DayCountType.BUSINESSDAYS
-                    and (self.dateFuture.year > self.datePast.year)
-                    and (self.dateFuture.year - self.datePast.year == 1)
-                )
-                else (
-                    np.busday_count(
-                        begindates=self.datePast.date(),
-                        enddates=f"{self.datePast.year+1}-01-01",
-                        weekmask="1111100",
-                        holidays=HOLIDAYS,
-                    )
-                    + np.busday_count(
-                        begindates=str(self.dateFuture.year),
-                        enddates=str(self.dateFuture.year + 1),
-                        weekmask="1111100",
-                        holidays=HOLIDAYS,
-                    )
-                )
-                if (
-                    self.dayCountType == DayCountType.TRADINGDAYS
-                    and (self.dateFuture.year > self.datePast.year)
-                    and (self.dateFuture.year - self.datePast.year == 1)
-                )
-                else np.busday_count(
-                    begindates=self.datePast.date(),
-                    enddates=(self.dateFuture + timedelta(days=1)).date(),
-                    weekmask="1111100",
-                )
-                if (
-                    self.dayCountType == DayCountType.BUSINESSDAYS
-                    and (self.dateFuture.year > self.datePast.year)
-                    and (self.dateFuture.year - self.datePast.year >= 2)
-                )
-                else np.busday_count(
-                    begindates=self.datePast.date(),
-                    enddates=(self.dateFuture + timedelta(days=1)).date(),
-                    weekmask="1111100",
-                    holidays=HOLIDAYS,
-                )
-                if (
-                    self.dayCountType == DayCountType.TRADINGDAYS
-                    and (self.dateFuture.year > self.datePast.year)
-                    and (self.dateFuture.year - self.datePast.year >= 2)
-                )
-                else DayCountType.CALENDARDAYS.value
-            )
+            time_to_expiry(self.datePast, self.dateFuture.date(), self.dayCountType)
         )
 
     def CND(self, d: float):
-        A1 = 0.31938153
-        A2 = -0.356563782
-        A3 = 1.781477937
-        A4 = -1.821255978
-        A5 = 1.330274429
-        RSQRT2PI = 0.39894228040143267793994605993438
-        K = 1.0 / (1.0 + 0.2316419 * ABS(d))
-        ret_val = (
-            RSQRT2PI
-            * EXP(-0.5 * d * d)
-            * (K * (A1 + K * (A2 + K * (A3 + K * (A4 + K * A5)))))
-        )
-        return np.where(d > 0, 1.0 - ret_val, ret_val)
+        return cnd(d)
 
     def BSM(self, sigma: float):
         """Black-76 model d1 and d2 calculation"""
@@ -474,3 +494,343 @@ class CalcIvGreeks:
                 "RhoPut": round(self.RhoPut(PutIV) / 100, 4),
             },
         }
+
+
+    GREEKS_DTYPE = np.dtype(
+        [
+            ("Strike", "f8"),
+            ("ImplVol", "f8"),
+            ("CallDelta", "f8"),
+            ("PutDelta", "f8"),
+            ("Theta", "f8"),
+            ("Vega", "f8"),
+            ("Gamma", "f8"),
+            ("RhoCall", "f8"),
+            ("RhoPut", "f8"),
+        ]
+    )
+
+    def GetGreeksChain(
+        self,
+        Strikes: Union[List[float], np.ndarray],
+        ImplVols: Union[List[float], np.ndarray],
+        CallIVs: Union[List[float], np.ndarray, None] = None,
+        PutIVs: Union[List[float], np.ndarray, None] = None,
+        FromDateTime: Union[dt, None] = None,
+    ) -> np.ndarray:
+        """Greeks for a whole chain as a structured array (GREEKS_DTYPE).
+
+        Same definitions and scaling as GetImpVolAndGreeks (Theta per day from
+        the put, Vega and Rho per 1%), unrounded. IVs are decimals; rho uses
+        CallIVs/PutIVs when given, else ImplVols. d1, N(d1), N'(d1) and
+        exp(-rT) are computed once per strike, and T once for the chain at
+        FromDateTime (pinned) or the calculator's current valuation time.
+        """
+        if FromDateTime is not None:
+            self.datePast = FromDateTime
+            self.datePastType = FromDateType.FIXED
+        self.T = self.get_tte()
+
+        K = np.asarray(Strikes, dtype=float)
+        sigma = np.asarray(ImplVols, dtype=float)
+        sigmaCall = sigma if CallIVs is None else np.asarray(CallIVs, dtype=float)
+        sigmaPut = sigma if PutIVs is None else np.asarray(PutIVs, dtype=float)
+
+        return _black76_greeks(self.F, self.T, self.r, K, sigma, sigmaCall, sigmaPut)
+
+
+def _black76_greeks(F, T, r, K, sigma, sigmaCall, sigmaPut) -> np.ndarray:
+    """GetGreeksChain's arithmetic; F and T may be scalars or per-strike
+    arrays, r is a decimal"""
+    sqrtT = SQRT(T)
+    expRT = EXP(-r * T)
+    logFK = LOG(F / K)
+    valid = sigma > CalcIvGreeks.IV_LOWER_BOUND
+
+    def d1d2(vol):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d1 = np.where(
+                vol > CalcIvGreeks.IV_LOWER_BOUND,
+                (logFK + (0.5 * vol * vol) * T) / (vol * sqrtT),
+                np.where(F > K, np.inf, -np.inf),
+            )
+        return d1, d1 - vol * sqrtT
+
+    d1, d2 = d1d2(sigma)
+    cdfD1, pdfD1 = NORM_CDF(d1), NORM_PDF(d1)
+
+    # Put price at the strike IV for theta, call/put prices at their own
+    # IVs for rho (d1/d2 reused when those IVs are the same array)
+    putPrice = expRT * (K * NORM_CDF(-d2) - F * (1.0 - cdfD1))
+    if sigmaCall is sigma:
+        callD1, callD2 = d1, d2
+    else:
+        callD1, callD2 = d1d2(sigmaCall)
+    if sigmaPut is sigma:
+        putPriceRho = putPrice
+    else:
+        putD1, putD2 = d1d2(sigmaPut)
+        putPriceRho = expRT * (K * NORM_CDF(-putD2) - F * NORM_CDF(-putD1))
+    callPriceRho = expRT * (F * NORM_CDF(callD1) - K * NORM_CDF(callD2))
+
+    greeks = np.zeros(len(K), dtype=CalcIvGreeks.GREEKS_DTYPE)
+    greeks["Strike"] = K
+    greeks["ImplVol"] = sigma
+    greeks["CallDelta"] = expRT * cdfD1
+    greeks["PutDelta"] = expRT * (cdfD1 - 1)
+    greeks["Theta"] = (
+        -expRT * (F * sigma * pdfD1 / (2 * sqrtT)) + r * putPrice
+    ) / 365
+    greeks["Vega"] = expRT * pdfD1 * F * sqrtT / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        greeks["Gamma"] = np.where(valid, expRT * pdfD1 / (F * sigma * sqrtT), 0.0)
+    greeks["RhoCall"] = -T * callPriceRho / 100
+    greeks["RhoPut"] = -T * putPriceRho / 100
+    return greeks
+
+
+def black76_greeks_chain(
+    FuturePrice: Union[float, np.ndarray],
+    TimeToExpiry: Union[float, np.ndarray],
+    Strikes: Union[List[float], np.ndarray],
+    ImplVols: Union[List[float], np.ndarray],
+    CallIVs: Union[List[float], np.ndarray, None] = None,
+    PutIVs: Union[List[float], np.ndarray, None] = None,
+    interestRate: float = 0.0,
+) -> np.ndarray:
+    """CalcIvGreeks.GetGreeksChain without a calculator: forward and time to
+    expiry (in years) given directly, either one per chain or one per strike,
+    so snapshots with different forwards and expiries price in one call.
+    Interest rate in percent. Returns a GREEKS_DTYPE structured array.
+    """
+    K = np.asarray(Strikes, dtype=float)
+    sigma = np.asarray(ImplVols, dtype=float)
+    sigmaCall = sigma if CallIVs is None else np.asarray(CallIVs, dtype=float)
+    sigmaPut = sigma if PutIVs is None else np.asarray(PutIVs, dtype=float)
+    return _black76_greeks(
+        np.asarray(FuturePrice, dtype=float),
+        np.asarray(TimeToExpiry, dtype=float),
+        interestRate / 100,
+        K,
+        sigma,
+        sigmaCall,
+        sigmaPut,
+    )
+
+
+def black76_price_and_vega(
+    FuturePrice: float,
+    Strikes: np.ndarray,
+    TimeToExpiry: float,
+    sigma: np.ndarray,
+    isCall: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Undiscounted Black-76 prices and vegas for arrays of strikes/vols"""
+    sqrtT = SQRT(TimeToExpiry)
+    d1 = (LOG(FuturePrice / Strikes) + (0.5 * sigma * sigma) * TimeToExpiry) / (sigma * sqrtT)
+    d2 = d1 - sigma * sqrtT
+    # Call: F*N(d1) - K*N(d2), Put: K*N(-d2) - F*N(-d1)
+    sign = np.where(isCall, 1.0, -1.0)
+    price = sign * (FuturePrice * NORM_CDF(sign * d1) - Strikes * NORM_CDF(sign * d2))
+    vega = FuturePrice * sqrtT * NORM_PDF(d1)
+    return price, vega
+
+
+def _solve_black76_iv(
+    FuturePrice: Union[float, np.ndarray],
+    Strikes: np.ndarray,
+    TimeToExpiry: Union[float, np.ndarray],
+    targets: np.ndarray,
+    isCall: np.ndarray,
+    lower: float,
+    upper: float,
+    xtol: float,
+    maxiter: int,
+    guess: Union[np.ndarray, None] = None,
+    warmWidth: float = 0.02,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Safeguarded Newton iteration run on the whole chain at once.
+
+    Every strike keeps its own [lo, hi] bracket, a Newton step that leaves the
+    bracket (or has no vega to work with) is replaced by bisection, so each
+    strike converges like brentq on the same [lower, upper] interval.
+    Strikes with a finite guess start from it inside guess +/- warmWidth when
+    that narrow bracket holds the root (checking it counts as one iteration)
+    and from the full bracket otherwise.
+    FuturePrice and TimeToExpiry are scalars or per-strike arrays.
+    Returns the implied vols, the iteration count per strike and a mask of
+    the strikes solved from a warm start.
+    """
+    n = len(Strikes)
+    perStrike = np.ndim(FuturePrice) > 0 or np.ndim(TimeToExpiry) > 0
+    if perStrike:
+        FuturePrice = np.broadcast_to(np.asarray(FuturePrice, dtype=float), (n,))
+        TimeToExpiry = np.broadcast_to(np.asarray(TimeToExpiry, dtype=float), (n,))
+    ivs = np.full(n, CalcIvGreeks.IV_LOWER_BOUND)
+    iterations = np.zeros(n, dtype=np.int64)
+    warm = np.zeros(n, dtype=bool)
+
+    lo = np.full(n, lower)
+    hi = np.full(n, upper)
+    priceLo, _ = black76_price_and_vega(FuturePrice, Strikes, TimeToExpiry, lo, isCall)
+    priceHi, _ = black76_price_and_vega(FuturePrice, Strikes, TimeToExpiry, hi, isCall)
+    # Same rules as brentq: an endpoint that prices exactly is the root, no
+    # sign change over the bracket means there is no solution
+    ivs = np.where(priceHi == targets, upper, ivs)
+    ivs = np.where(priceLo == targets, lower, ivs)
+    active = np.flatnonzero((priceLo < targets) & (targets < priceHi))
+    if active.size == 0:
+        return ivs, iterations, warm
+
+    K, target, calls = Strikes[active], targets[active], isCall[active]
+    lo, hi = lo[active], hi[active]
+    F, T = (FuturePrice[active], TimeToExpiry[active]) if perStrike else (FuturePrice, TimeToExpiry)
+    # Brenner-Subrahmanyam ATM approximation as the starting point
+    sigma = np.clip(
+        target / F * SQRT(2 * np.pi / T),
+        lower + xtol,
+        upper - xtol,
+    )
+
+    if guess is not None:
+        start = np.asarray(guess, dtype=float)[active]
+        hasGuess = np.isfinite(start) & (start > lower) & (start < upper)
+        if hasGuess.any():
+            iterations[active[hasGuess]] += 1
+            narrowLo = np.maximum(start - warmWidth, lower)
+            narrowHi = np.minimum(start + warmWidth, upper)
+            priceNarrowLo, _ = black76_price_and_vega(F, K, T, narrowLo, calls)
+            priceNarrowHi, _ = black76_price_and_vega(F, K, T, narrowHi, calls)
+            inside = hasGuess & (priceNarrowLo <= target) & (target <= priceNarrowHi)
+            lo = np.where(inside, narrowLo, lo)
+            hi = np.where(inside, narrowHi, hi)
+            sigma = np.where(inside, start, sigma)
+            warm[active[inside]] = True
+
+    priceTol = 64 * np.finfo(float).eps * F
+    for _ in range(maxiter):
+        iterations[active] += 1
+        price, vega = black76_price_and_vega(F, K, T, sigma, calls)
+        diff = price - target
+        hi = np.where(diff > 0, sigma, hi)
+        lo = np.where(diff > 0, lo, sigma)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = sigma - diff / vega
+        useNewton = (vega > 0) & (newton > lo) & (newton < hi)
+        nextSigma = np.where(useNewton, newton, 0.5 * (lo + hi))
+
+        # Prices carry round-off of a few ulps of F, no point going below it
+        hit = ABS(diff) <= priceTol
+        done = hit | (ABS(nextSigma - sigma) <= xtol) | ((hi - lo) <= xtol)
+        sigma = np.where(hit, sigma, nextSigma)
+
+        if done.any():
+            ivs[active[done]] = sigma[done]
+            keep = ~done
+            active, K, target, calls = active[keep], K[keep], target[keep], calls[keep]
+            lo, hi, sigma = lo[keep], hi[keep], sigma[keep]
+            if perStrike:
+                F, T, priceTol = F[keep], T[keep], priceTol[keep]
+        if active.size == 0:
+            break
+    else:
+        # Did not converge within maxiter, brentq would have raised
+        ivs[active] = CalcIvGreeks.IV_LOWER_BOUND
+
+    return np.maximum(ivs, CalcIvGreeks.IV_LOWER_BOUND), iterations, warm
+
+
+def implied_vol_chain(
+    FuturePrice: Union[float, np.ndarray],
+    TimeToExpiry: Union[float, np.ndarray],
+    Strikes: Union[List[float], np.ndarray],
+    CallPrices: Union[List[float], np.ndarray],
+    PutPrices: Union[List[float], np.ndarray],
+    interestRate: float = 0.0,
+    lower: float = 0.001,
+    upper: float = 5.0,
+    xtol: float = 1e-12,
+    maxiter: int = 100,
+    initialCallIVs: Union[List[float], np.ndarray, None] = None,
+    initialPutIVs: Union[List[float], np.ndarray, None] = None,
+    warmWidth: float = 0.02,
+    returnStats: bool = False,
+):
+    """Black-76 call and put implied volatilities for a whole option chain.
+
+    Vectorized counterpart of CalcIvGreeks.CallImplVol/PutImplVol: one forward
+    and one time to expiry (in years) for all strikes, prices floored at
+    5 paisa, interest rate in percent and used only for discounting.
+    Returns (CallIV, PutIV) as decimals, IV_LOWER_BOUND where no root exists.
+    FuturePrice and TimeToExpiry may also be per-strike arrays, which solves
+    many snapshots (different forwards and expiries) in one pass.
+
+    initialCallIVs/initialPutIVs (decimals, NaN where unknown), e.g. the
+    previous snapshot's IVs, warm-start the solver in a +/- warmWidth
+    bracket. With returnStats a third element holds per-strike iteration
+    counts and warm-start masks for calls and puts.
+    """
+    K = np.asarray(Strikes, dtype=float)
+    C = np.maximum(np.nan_to_num(np.asarray(CallPrices, dtype=float)), 0.05)
+    P = np.maximum(np.nan_to_num(np.asarray(PutPrices, dtype=float)), 0.05)
+    n = len(K)
+    perStrike = np.ndim(FuturePrice) > 0 or np.ndim(TimeToExpiry) > 0
+    if perStrike:
+        F = np.broadcast_to(np.asarray(FuturePrice, dtype=float), (n,))
+        T = np.broadcast_to(np.asarray(TimeToExpiry, dtype=float), (n,))
+        usable = (F > 0) & (T > 0)
+    if perStrike and not usable.all():
+        # Solve the strikes that have a forward and time left, bound the rest
+        callIV = np.full(n, CalcIvGreeks.IV_LOWER_BOUND)
+        putIV = np.full(n, CalcIvGreeks.IV_LOWER_BOUND)
+        iterations, warm = np.zeros(2 * n, dtype=np.int64), np.zeros(2 * n, dtype=bool)
+        if usable.any():
+            def pick(values):
+                return None if values is None else np.asarray(values, dtype=float)[usable]
+
+            callIV[usable], putIV[usable], stats = implied_vol_chain(
+                F[usable], T[usable], K[usable], C[usable], P[usable], interestRate,
+                lower, upper, xtol, maxiter, pick(initialCallIVs), pick(initialPutIVs),
+                warmWidth, returnStats=True,
+            )
+            iterations[:n][usable], iterations[n:][usable] = stats["callIterations"], stats["putIterations"]
+            warm[:n][usable], warm[n:][usable] = stats["callWarm"], stats["putWarm"]
+    elif n == 0 or np.any(FuturePrice <= 0) or np.any(TimeToExpiry <= 0):
+        callIV = np.full(n, CalcIvGreeks.IV_LOWER_BOUND)
+        putIV = np.full(n, CalcIvGreeks.IV_LOWER_BOUND)
+        iterations, warm = np.zeros(2 * n, dtype=np.int64), np.zeros(2 * n, dtype=bool)
+    else:
+        guess = None
+        if initialCallIVs is not None or initialPutIVs is not None:
+            missing = np.full(n, np.nan)
+            guess = np.concatenate([
+                missing if initialCallIVs is None else np.asarray(initialCallIVs, dtype=float),
+                missing if initialPutIVs is None else np.asarray(initialPutIVs, dtype=float),
+            ])
+
+        # Solve calls and puts in the same pass on undiscounted prices
+        expRT = EXP(-(interestRate / 100) * (T if perStrike else TimeToExpiry))
+        ivs, iterations, warm = _solve_black76_iv(
+            np.concatenate([F, F]) if perStrike else FuturePrice,
+            np.concatenate([K, K]),
+            np.concatenate([T, T]) if perStrike else TimeToExpiry,
+            np.concatenate([C, P]) / (np.concatenate([expRT, expRT]) if perStrike else expRT),
+            np.concatenate([np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]),
+            lower,
+            upper,
+            xtol,
+            maxiter,
+            guess,
+            warmWidth,
+        )
+        callIV, putIV = ivs[:n], ivs[n:]
+
+    if not returnStats:
+        return callIV, putIV
+    return callIV, putIV, {
+        "callIterations": iterations[:n],
+        "putIterations": iterations[n:],
+        "callWarm": warm[:n],
+        "putWarm": warm[n:],
+    }
@@ -0,0 +1,223 @@
+import pytz
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, time, timedelta
+from typing import Dict, List, Union
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# NSE trading holidays (equity and F&O share the same list)
+NSE_HOLIDAYS = {
+    2025: [
+        "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10",
+        "2025-04-14", "2025-04-18", "2025-05-01", "2025-08-15",
+        "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+        "2025-11-05", "2025-12-25",
+    ],
+    2026: [
+        "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",
+        "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28",
+        "2026-06-26", "2026-09-14", "2026-10-02", "2026-10-20",
+        "2026-11-10", "2026-11-24", "2026-12-25",
+    ],
+}
+
+# MCX full-day closures; evening sessions MCX keeps open on some NSE
+# holidays are not modelled, so the NSE list is used as is
+MCX_HOLIDAYS = NSE_HOLIDAYS
+
+FIRST_YEAR = min(NSE_HOLIDAYS) - 5
+LAST_YEAR = max(NSE_HOLIDAYS) + 5
+
+
+class TradingCalendar:
+    """Exchange calendar with precomputed session tables.
+
+    Session checks are a weekday mask plus a holiday set lookup and need no
+    numpy. The numpy tables (np.busdaycalendar, a cumulative business-day
+    index so busday_count is two array lookups, next/previous session
+    tables over FIRST_YEAR..LAST_YEAR) are built on first use. Dates outside
+    that range fall back to numpy's busday functions.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        holidays: Union[Dict[int, List[str]], List[str], None] = None,
+        openTime: time = time(9, 15),
+        closeTime: time = time(15, 30),
+        weekmask: str = "1111100",
+        startYear: int = FIRST_YEAR,
+        endYear: int = LAST_YEAR,
+    ) -> None:
+        if isinstance(holidays, dict):
+            holidays = [day for year in sorted(holidays) for day in holidays[year]]
+        self.name = name
+        self.openTime = openTime
+        self.closeTime = closeTime
+        self.weekmask = weekmask
+        self.holidays = {date.fromisoformat(day) for day in holidays or []}
+        self.startYear = startYear
+        self.endYear = endYear
+        self.originOrdinal = date(startYear, 1, 1).toordinal()
+        self._tables = False
+        self._expiries = {}
+
+    def _ensure_tables(self) -> None:
+        if self._tables:
+            return
+        import numpy as np
+
+        self.busdaycal = np.busdaycalendar(
+            weekmask=self.weekmask, holidays=sorted(self.holidays)
+        )
+        self.origin = np.datetime64(f"{self.startYear}-01-01", "D")
+        self.end = np.datetime64(f"{self.endYear + 1}-01-01", "D")
+        days = np.arange(self.origin, self.end, dtype="datetime64[D]")
+        self.sessions = np.is_busday(days, busdaycal=self.busdaycal)
+        # cum[i] = number of sessions in [origin, origin + i)
+        self.cum = np.concatenate(([0], np.cumsum(self.sessions)))
+
+        # Index of the first session on or after / on or before each day
+        index = np.arange(len(days))
+        self.nextSession = np.minimum.accumulate(
+            np.where(self.sessions, index, len(days))[::-1]
+        )[::-1]
+        self.prevSession = np.maximum.accumulate(np.where(self.sessions, index, -1))
+        self.sessionDates = [
+            date.fromordinal(self.originOrdinal + int(i))
+            for i in np.flatnonzero(self.sessions)
+        ]
+        self._tables = True
+
+    def _index(self, day: date) -> int:
+        self._ensure_tables()
+        i = day.toordinal() - self.originOrdinal
+        if not 0 <= i < len(self.sessions):
+            raise ValueError(f"{day} is outside the {self.name} calendar range")
+        return i
+
+    def busday_count(self, begindates, enddates):
+        """np.busday_count(begindates, enddates) against this calendar"""
+        import numpy as np
+
+        self._ensure_tables()
+        begin = np.asarray(begindates, dtype="datetime64[D]")
+        end = np.asarray(enddates, dtype="datetime64[D]")
+        inRange = (
+            (begin >= self.origin) & (begin <= self.end)
+            & (end >= self.origin) & (end <= self.end)
+        )
+        if np.all(inRange):
+            return (
+                self.cum[(end - self.origin).astype(np.int64)]
+                - self.cum[(begin - self.origin).astype(np.int64)]
+            )
+        return np.busday_count(begin, end, busdaycal=self.busdaycal)
+
+    def days_in_year(self, year):
+        """Sessions in each calendar year"""
+        import numpy as np
+
+        year = np.asarray(year, dtype=np.int64)
+        return self.busday_count(
+            (year - 1970).astype("datetime64[Y]"),
+            (year - 1969).astype("datetime64[Y]"),
+        )
+
+    @staticmethod
+    def to_ist(ts: Union[datetime, None] = None) -> datetime:
+        """Current IST time, or ts in IST (naive timestamps are taken as IST)"""
+        if ts is None:
+            return datetime.now(IST)
+        if ts.tzinfo is None:
+            return IST.localize(ts)
+        return ts.astimezone(IST)
+
+    def is_holiday(self, day: date) -> bool:
+        return day in self.holidays
+
+    def is_session(self, day: date) -> bool:
+        """Weekday that is not an exchange holiday"""
+        return self.weekmask[day.weekday()] == "1" and day not in self.holidays
+
+    def is_open(self, ts: Union[datetime, None] = None, closeTime: Union[time, None] = None) -> bool:
+        """Session day and within trading hours (closeTime overrides the close)"""
+        now = self.to_ist(ts)
+        close = self.closeTime if closeTime is None else closeTime
+        return self.is_session(now.date()) and self.openTime <= now.time() <= close
+
+    def next_session(self, day: date) -> date:
+        """First session on or after day"""
+        i = self.nextSession[self._index(day)]
+        if i >= len(self.sessions):
+            raise ValueError(f"No {self.name} session after {day} in calendar range")
+        return date.fromordinal(self.originOrdinal + int(i))
+
+    def previous_session(self, day: date) -> date:
+        """Last session strictly before day"""
+        i = self.prevSession[self._index(day - timedelta(days=1))]
+        if i < 0:
+            raise ValueError(f"No {self.name} session before {day} in calendar range")
+        return date.fromordinal(self.originOrdinal + int(i))
+
+    def next_open(self, ts: Union[datetime, None] = None) -> datetime:
+        """Next session open at or after ts (ts itself when the market is open)"""
+        now = self.to_ist(ts)
+        if self.is_open(now):
+            return now
+        day = now.date()
+        if now.time() > self.closeTime:
+            day += timedelta(days=1)
+        return IST.localize(datetime.combine(self.next_session(day), self.openTime))
+
+    def expiries(self, weekday: int = 1, monthly: bool = False) -> List[date]:
+        """Sorted expiry dates: every weekday (0=Mon), or the last one of each
+        month, moved to the previous session when it falls on a holiday"""
+        key = (weekday, monthly)
+        if key not in self._expiries:
+            self._ensure_tables()
+            start = date.fromordinal(self.originOrdinal)
+            first = start + timedelta(days=(weekday - start.weekday()) % 7)
+            days = [first + timedelta(days=7 * n) for n in range((self.end - self.origin).astype(int) // 7)]
+            if monthly:
+                days = [d for d in days if (d + timedelta(days=7)).month != d.month]
+            self._expiries[key] = [
+                d if self.is_session(d) else self.previous_session(d)
+                for d in days[1:]
+            ]
+        return self._expiries[key]
+
+    def next_expiry(
+        self,
+        ts: Union[datetime, None] = None,
+        weekday: int = 1,
+        monthly: bool = False,
+        rollTime: time = time(16, 0),
+    ) -> date:
+        """Next weekly (or monthly) expiry; today's expiry rolls at rollTime"""
+        now = self.to_ist(ts)
+        expiries = self.expiries(weekday, monthly)
+        i = bisect_left(expiries, now.date())
+        if i < len(expiries) and expiries[i] == now.date() and now.time() >= rollTime:
+            i += 1
+        if i >= len(expiries):
+            raise ValueError(f"No {self.name} expiry after {now.date()} in calendar range")
+        return expiries[i]
+
+    def sessions_between(self, start: date, end: date) -> List[date]:
+        """Sessions in [start, end]"""
+        self._ensure_tables()
+        return self.sessionDates[
+            bisect_left(self.sessionDates, start):bisect_right(self.sessionDates, end)
+        ]
+
+
+NSE_EQ = TradingCalendar("NSE equity", NSE_HOLIDAYS)
+NSE_FO = TradingCalendar("NSE F&O", NSE_HOLIDAYS)
+MCX = TradingCalendar("MCX", MCX_HOLIDAYS, openTime=time(9, 0), closeTime=time(23, 30))
+
+CALENDARS = {"NSE_EQ": NSE_EQ, "NSE_FO": NSE_FO, "MCX": MCX}
+
+
+def get_calendar(exchange: str = "NSE_FO") -> TradingCalendar:
+    return CALENDARS[exchange.upper()]
@@ -0,0 +1,313 @@
+"""Per-stage timing and counters for the collectors.
+
+An entry point wrapped in job() is one run; inside it, span() marks a
+stage (fetch, decode, transform, write, iv, ...) and add() counts bytes,
+rows, requests and retries against the innermost open stage. http_client
+counts downloads and retries and times JSON decoding on its own, and
+write_csv counts the rows it writes. When the run ends one JSON record
+goes to METRICS_FILE:
+
+    {"job": "eco", "time": ..., "seconds": 1.82, "status": "ok", "peak_rss_mb": 61.3,
+     "totals": {"bytes": 52011, "requests": 3, ...},
+     "stages": {"fetch": {"calls": 3, "seconds": 1.7, "bytes": 52011, ...},
+                "fetch/decode": {...}, "write": {...}}}
+
+Stage seconds are summed over calls, so stages run on several threads can
+add up to more than the run. peak_rss_mb is the process high-water mark
+when the stage (or run) ended. With METRICS_PROM_DIR set, the run is also
+written there as <job>.prom in the Prometheus textfile format (for
+node_exporter's textfile collector). A job started inside another job's
+run (the collectors under run_watchlist) is a stage of that run. Threads
+started with bind(fn) carry the caller's stage. The workflows upload
+METRICS_FILE and METRICS_PROM_DIR as the run's "metrics" artifact. Usage:
+
+    python Scripts/metrics.py [--job eco] [--last 20] [--prom]
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial, wraps
+from typing import Dict, Iterable, List, Optional
+
+# One JSON line per run (empty METRICS_FILE: off)
+METRICS_FILE = os.getenv('METRICS_FILE', 'Data/metrics.jsonl')
+METRICS_PROM_DIR = os.getenv('METRICS_PROM_DIR', '')
+
+_current = contextvars.ContextVar('metrics_span', default=None)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of the process so far (None where unknown)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class _Span:
+    def __init__(self, name: str, parent: Optional['_Span'] = None) -> None:
+        self.parent = parent
+        self.run = parent.run if parent else self
+        self.path = (f"{parent.path}/{name}" if parent.path else name) if parent else ''
+        self.counters: Dict[str, float] = {}
+        if parent is None:
+            self.job = name
+            self.stages: Dict[str, Dict] = {}
+            self.info: Dict = {}
+            self.lock = threading.Lock()
+
+    def add(self, **counters) -> None:
+        with self.run.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def finish(self, seconds: float) -> None:
+        self.run.record(self.path, seconds, self.counters)
+
+    def record(self, path: str, seconds: float, counters: Dict[str, float]) -> None:
+        with self.lock:
+            stage = self.stages.setdefault(path, {'calls': 0, 'seconds': 0.0})
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            for key, value in counters.items():
+                stage[key] = stage.get(key, 0) + value
+            stage['peak_rss_mb'] = peak_rss_mb()
+
+
+def add(**counters) -> None:
+    """Count e.g. bytes=, rows=, retries= against the current stage (no-op
+    outside a run)"""
+    span = _current.get()
+    if span is not None:
+        span.add(**counters)
+
+
+def annotate(**fields) -> None:
+    """Extra top-level fields for the current run's record"""
+    span = _current.get()
+    if span is not None:
+        with span.run.lock:
+            span.run.info.update(fields)
+
+
+def record(stage: str, seconds: float, **counters) -> None:
+    """A stage timed elsewhere (e.g. in worker processes), under the
+    current stage"""
+    span = _current.get()
+    if span is not None:
+        span.run.record(f"{span.path}/{stage}" if span.path else stage, seconds, counters)
+
+
+@contextmanager
+def span(name: str):
+    """Time the block as stage name, nested under the current stage. Also a
+    decorator. Outside a run it only runs the block."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    current = _Span(name, parent)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.finish(time.perf_counter() - start)
+        _current.reset(token)
+
+
+@contextmanager
+def run(job_name: str):
+    """One run of job_name: its record is written when the block ends (a
+    stage of the enclosing run, if there is one)"""
+    if _current.get() is not None:
+        with span(job_name) as current:
+            yield current
+        return
+    root = _Span(job_name)
+    token = _current.set(root)
+    started = datetime.now().astimezone()
+    start = time.perf_counter()
+    status, error = 'ok', ''
+    try:
+        yield root
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status, error = 'failed', str(e.code)
+        raise
+    except BaseException as e:
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        emit(summarize(root, started, time.perf_counter() - start, status, error))
+
+
+def job(job_name: str):
+    """Decorator: each call of the entry point is a run of job_name"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with run(job_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn):
+    """fn for another thread (or pool), running inside the current stage.
+    Bind once per thread or task: a bound function is not reentrant."""
+    return partial(contextvars.copy_context().run, fn)
+
+
+def count_bytes(chunks: Iterable[bytes]) -> Iterable[bytes]:
+    """Pass chunks through, counting their bytes against the current stage"""
+    for chunk in chunks:
+        add(bytes=len(chunk))
+        yield chunk
+
+
+def summarize(root: _Span, started: datetime, seconds: float, status: str, error: str) -> Dict:
+    with root.lock:
+        stages = {path: {k: round(v, 4) if isinstance(v, float) else v for k, v in stage.items()}
+                  for path, stage in root.stages.items()}
+        totals = dict(root.counters)
+        for stage in root.stages.values():
+            for key, value in stage.items():
+                if key not in ('calls', 'seconds', 'peak_rss_mb'):
+                    totals[key] = totals.get(key, 0) + value
+        info = dict(root.info)
+    return {'job': root.job, 'time': started.isoformat(timespec='seconds'), 'seconds': round(seconds, 4),
+            'status': status, 'error': error, 'peak_rss_mb': peak_rss_mb(), 'totals': totals,
+            'stages': stages, **info}
+
+
+def emit(record: Dict, path: str = METRICS_FILE, prom_dir: str = METRICS_PROM_DIR) -> None:
+    """Append the run record to path, write its textfile to prom_dir and
+    print a one-line summary; a metrics failure never fails the run"""
+    top = sorted(((p, s) for p, s in record['stages'].items() if '/' not in p),
+                 key=lambda item: item[1]['seconds'], reverse=True)
+    slowest = ', '.join(f"{p} {s['seconds']:.2f}s" for p, s in top[:4])
+    print(f"Metrics: {record['job']} {record['seconds']:.2f}s" + (f" ({slowest})" if slowest else ''))
+    try:
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        if prom_dir:
+            os.makedirs(prom_dir, exist_ok=True)
+            target = os.path.join(prom_dir, f"{record['job']}.prom")
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(to_prometheus([record]))
+            os.replace(tmp, target)
+    except OSError as e:
+        print(f"Warning: could not write metrics: {e}")
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(records: List[Dict]) -> str:
+    """Prometheus text exposition of run records (the last one per job)"""
+    latest = {r['job']: r for r in records}
+    series = {
+        'collector_run_seconds': ('gauge', 'Wall time of the last run'),
+        'collector_run_success': ('gauge', '1 if the last run succeeded'),
+        'collector_run_timestamp_seconds': ('gauge', 'Start of the last run, Unix time'),
+        'collector_run_peak_rss_bytes': ('gauge', 'Peak resident memory of the last run'),
+        'collector_stage_seconds': ('gauge', 'Time in the stage during the last run, summed over calls'),
+        'collector_stage_calls': ('gauge', 'Times the stage ran during the last run'),
+        'collector_stage_bytes': ('gauge', 'Bytes downloaded in the stage during the last run'),
+        'collector_stage_rows': ('gauge', 'Rows produced in the stage during the last run'),
+        'collector_stage_requests': ('gauge', 'HTTP requests made in the stage during the last run'),
+        'collector_stage_retries': ('gauge', 'HTTP retries in the stage during the last run'),
+    }
+    samples = {name: [] for name in series}
+    for name, r in latest.items():
+        job = f'job="{_label(name)}"'
+        samples['collector_run_seconds'].append((job, r['seconds']))
+        samples['collector_run_success'].append((job, int(r['status'] == 'ok')))
+        samples['collector_run_timestamp_seconds'].append((job, datetime.fromisoformat(r['time']).timestamp()))
+        if r.get('peak_rss_mb') is not None:
+            samples['collector_run_peak_rss_bytes'].append((job, int(r['peak_rss_mb'] * 1024 * 1024)))
+        for path, stage in r['stages'].items():
+            labels = f'{job},stage="{_label(path)}"'
+            for key in ('seconds', 'calls', 'bytes', 'rows', 'requests', 'retries'):
+                if key in stage:
+                    samples[f'collector_stage_{key}'].append((labels, stage[key]))
+    lines = []
+    for name, (kind, help_text) in series.items():
+        if samples[name]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{{{labels}}} {value!r}" for labels, value in samples[name]]
+    return '\n'.join(lines) + '\n'
+
+
+def load_records(path: str = METRICS_FILE, job_name: Optional[str] = None) -> List[Dict]:
+    records = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a killed run
+                if job_name is None or r.get('job') == job_name:
+                    records.append(r)
+    except OSError:
+        pass
+    return records
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Where collector runs spend their time")
+    parser.add_argument('--file', default=METRICS_FILE)
+    parser.add_argument('--job', help="only this job")
+    parser.add_argument('--last', type=int, default=20, help="runs per job to summarize")
+    parser.add_argument('--prom', action='store_true', help="print the last run of each job as a Prometheus textfile")
+    args = parser.parse_args()
+
+    records = load_records(args.file, args.job)
+    if not records:
+        print(f"No runs recorded in {args.file}")
+        return
+    if args.prom:
+        sys.stdout.write(to_prometheus(records))
+        return
+    by_job: Dict[str, List[Dict]] = {}
+    for r in records:
+        by_job.setdefault(r['job'], []).append(r)
+    for name, runs in by_job.items():
+        runs = runs[-args.last:]
+        failed = sum(r['status'] != 'ok' for r in runs)
+        walls = sorted(r['seconds'] for r in runs)
+        print(f"\n{name}: {len(runs)} runs ({failed} failed), median {walls[len(walls) // 2]:.2f}s, "
+              f"max {walls[-1]:.2f}s, peak RSS {max(r.get('peak_rss_mb') or 0 for r in runs):.0f} MB")
+        stages: Dict[str, List[Dict]] = {}
+        for r in runs:
+            for path, stage in r['stages'].items():
+                stages.setdefault(path, []).append(stage)
+        print(f"  {'stage':32} {'runs':>5} {'mean s':>8} {'max s':>8} {'KB':>9} {'rows':>7} {'retries':>8}")
+        for path, seen in sorted(stages.items(), key=lambda item: -sum(s['seconds'] for s in item[1])):
+            mean = sum(s['seconds'] for s in seen) / len(seen)
+            print(f"  {path:32} {len(seen):>5} {mean:>8.3f} {max(s['seconds'] for s in seen):>8.3f} "
+                  f"{sum(s.get('bytes', 0) for s in seen) / len(seen) / 1024:>9.1f} "
+                  f"{sum(s.get('rows', 0) for s in seen) / len(seen):>7.0f} "
+                  f"{sum(s.get('retries', 0) for s in seen) / len(seen):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
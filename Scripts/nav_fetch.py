@@ -1,20 +1,15 @@
-import requests
-import pandas as pd
 from datetime import datetime, timedelta
-import pytz
 import os
+import sys
 from pathlib import Path
 
-HOLIDAYS = [
-    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10",
-    "2025-04-14", "2025-04-18", "2025-05-01", "2025-08-15",
-    "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
-    "2025-11-05", "2025-12-26", "2026-01-27", "2026-03-04", 
-    "2026-03-27", "2026-04-01", "2026-04-04", "2026-04-15", 
-    "2026-05-02", "2026-05-29", "2026-06-27", "2026-09-15", 
-    "2026-10-03", "2026-10-21", "2026-11-11", "2026-11-25", 
-    "2026-12-26"
-]
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from amfi_stream import CHUNK_SIZE, find_navs
+from http_client import get_client
+import metrics
+from market_calendar import IST, NSE_EQ
+from nav_store import NavStore
+from output_store import write_output
 
 target_funds = [
     "Aditya Birla Sun Life PSU Equity Fund-Direct Plan-Growth",
@@ -53,6 +48,8 @@ def extract_name(full):
 
 def load_old_data():
     """Load existing NAV data from CSV if exists"""
+    import pandas as pd
+    
     csv_path = Path('Data/Daily_NAV.csv')
     old_data = {}
     
@@ -76,62 +73,65 @@ def load_old_data():
     
     return old_data
 
+@metrics.job('nav_fetch')
 def main():
-    ist = pytz.timezone('Asia/Kolkata')
-    today = datetime.now(ist)
+    today = datetime.now(IST)
     
-    # Check if today is holiday or weekend
-    if today.weekday() in [0, 6] or today.strftime('%Y-%m-%d') in HOLIDAYS:
-        print(f"{today.strftime('%Y-%m-%d')} is holiday/weekend. Exiting.")
+    # NAVs are published for the previous session; nothing to fetch when
+    # yesterday was a weekend or exchange holiday
+    target_date = today - timedelta(days=1)
+    if not NSE_EQ.is_session(target_date.date()):
+        print(f"{target_date.strftime('%Y-%m-%d')} is holiday/weekend. Exiting.")
         exit()
     
+    import pandas as pd
+    
     # Load old data before fetching new data
     old_data = load_old_data()
     
-    # Calculate target date for NAV fetch
-    if today.weekday() == 0:  # Monday
-        target_date = today - timedelta(days=3)
-    elif today.weekday() == 6:  # Sunday (shouldn't happen due to check above)
-        target_date = today - timedelta(days=2)
-    else:  # Tuesday to Friday
-        target_date = today - timedelta(days=1)
-    
     target_date_str = target_date.strftime('%Y-%m-%d')
     print(f"Fetching NAV data for date: {target_date_str}")
     
     # Fetch new NAV data from API
     url = f"https://www.amfiindia.com/api/nav-history?query_type=all_for_date&from_date={target_date_str}"
     
+    # The payload covers every scheme in the industry: stream it and stop
+    # reading once all tracked funds have been seen
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.RequestException as e:
+        with metrics.span('fetch'), get_client().request('GET', url, stream=True) as response:
+            response.raise_for_status()
+            navs = find_navs(metrics.count_bytes(response.iter_content(CHUNK_SIZE)), target_funds)
+    except OSError as e:
         print(f"Error fetching API data: {e}")
+        metrics.annotate(error=str(e))
         exit()
     
     # Process new NAV data
     display_names = [extract_name(fund) for fund in target_funds]
-    fund_mapping = dict(zip(display_names, target_funds))
     
     new_nav_data = {}
-    if 'data' in data:
-        for fund in data['data']:
-            if 'schemes' in fund:
-                for scheme in fund['schemes']:
-                    if 'navs' in scheme:
-                        for nav in scheme['navs']:
-                            if nav['NAV_Name'] in target_funds:
-                                name = extract_name(nav['NAV_Name'])
-                                time_str = nav.get('hNAV_Upload_display', '')
-                                date_only = ' '.join(time_str.split()[:2]) if time_str else '-'
-                                new_nav_data[name] = {
-                                    'NAV': str(nav.get('hNAV_Amt', '-')).strip(),
-                                    'Update Time': date_only
-                                }
+    for nav in navs.values():
+        name = extract_name(nav['NAV_Name'])
+        time_str = nav.get('hNAV_Upload_display', '')
+        date_only = ' '.join(time_str.split()[:2]) if time_str else '-'
+        new_nav_data[name] = {
+            'NAV': str(nav.get('hNAV_Amt', '-')).strip(),
+            'Update Time': date_only
+        }
     
     print(f"New data fetched for {len(new_nav_data)} funds")
     
+    # Keep every published NAV; the history files are only ever appended to
+    history = {}
+    for nav in navs.values():
+        try:
+            history[nav['NAV_Name']] = float(nav['hNAV_Amt'])
+        except (KeyError, TypeError, ValueError):
+            pass
+    with metrics.span('store'):
+        written = NavStore().append(history, target_date.date())
+    print(f"NAV history: {written} records appended")
+    
     # Prepare records - use new data if available, else retain old data
     records = []
     funds_with_new_data = 0
@@ -172,14 +172,16 @@ def main():
         'Update Time': timestamp
     })
     
-    # Ensure Data directory exists
-    os.makedirs('Data', exist_ok=True)
-    
-    # Save to CSV
+    # Save to CSV, unless only the timestamp row changed
     df = pd.DataFrame(records)
-    df.to_csv('Data/Daily_NAV.csv', index=False)
-    
-    print(f"File saved: Data/Daily_NAV.csv")
+    with metrics.span('write'):
+        metrics.add(rows=len(df) - 1)
+        saved = write_output('Data/Daily_NAV.csv', df.iloc[:-1].to_csv(index=False),
+                             df.iloc[-1:].to_csv(index=False, header=False))
+    if saved:
+        print("File saved: Data/Daily_NAV.csv")
+    else:
+        print("Data/Daily_NAV.csv unchanged")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,214 @@
+"""Append-only NAV history, one binary file per fund.
+
+Each fund's file is a run of (date, nav) records -- int32 days since
+1970-01-01 and float64 NAV, 12 bytes each -- opened with np.memmap, so a
+run appends today's record without touching what is stored. index.json maps
+fund names to files. Analytics work on a funds x dates matrix (NAVs carried
+forward over days a fund did not publish) and are vectorized across funds:
+
+    python Scripts/nav_store.py [--root Data/nav_history]
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+NAV_HISTORY_DIR = os.getenv('NAV_HISTORY_DIR', 'Data/nav_history')
+RECORD_DTYPE = [('date', '<i4'), ('nav', '<f8')]
+
+# Calendar days; periods of a year or more are annualized (CAGR)
+PERIODS = {'1M': 30, '3M': 91, '6M': 182, '1Y': 365, '3Y': 1095, '5Y': 1826}
+TRADING_DAYS = 252
+
+
+def _record_dtype():
+    import numpy as np
+    return np.dtype(RECORD_DTYPE)
+
+
+class NavStore:
+    def __init__(self, root: str = NAV_HISTORY_DIR) -> None:
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def funds(self) -> List[str]:
+        return sorted(self.index)
+
+    def _path(self, fund: str) -> str:
+        if fund not in self.index:
+            slug = re.sub(r'[^a-z0-9]+', '-', fund.lower()).strip('-')[:60]
+            digest = hashlib.sha1(fund.encode()).hexdigest()[:8]
+            self.index[fund] = {'file': f"{slug}-{digest}.bin"}
+        return os.path.join(self.root, self.index[fund]['file'])
+
+    def history(self, fund: str):
+        """Records for fund as a read-only structured memmap (empty if none)"""
+        import numpy as np
+
+        dtype = _record_dtype()
+        path = self._path(fund) if fund in self.index else None
+        # The file length, not the index, is authoritative
+        if path is None or not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+            return np.zeros(0, dtype=dtype)
+        count = os.path.getsize(path) // dtype.itemsize
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def append(self, navs: Dict[str, float], day: date) -> int:
+        """Append day's NAV per fund; funds that already have day (or a later
+        date) are skipped. Returns the number of records written."""
+        import numpy as np
+
+        dtype = _record_dtype()
+        ordinal = (day - date(1970, 1, 1)).days
+        os.makedirs(self.root, exist_ok=True)
+        written = 0
+        for fund, nav in navs.items():
+            stored = self.history(fund)
+            if len(stored) and stored['date'][-1] >= ordinal:
+                continue
+            path = self._path(fund)
+            with open(path, 'ab') as f:
+                # Drop a torn record left by an interrupted append
+                f.truncate(os.path.getsize(path) // dtype.itemsize * dtype.itemsize)
+                f.write(np.array([(ordinal, nav)], dtype=dtype).tobytes())
+            entry = self.index[fund]
+            entry['count'] = len(stored) + 1
+            entry['last'] = day.isoformat()
+            entry.setdefault('first', day.isoformat())
+            written += 1
+        if written:
+            tmp = f"{self.index_path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.index, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.index_path)
+        return written
+
+    def matrix(self, funds: Optional[Iterable[str]] = None):
+        """(funds, dates, navs): the union of dates as datetime64[D] and a
+        funds x dates float array, NaN before a fund's first NAV"""
+        import numpy as np
+
+        funds = list(funds) if funds is not None else self.funds()
+        histories = [self.history(fund) for fund in funds]
+        days = np.unique(np.concatenate([h['date'] for h in histories] or [np.zeros(0, 'i4')]))
+        navs = np.full((len(funds), len(days)), np.nan)
+        for row, h in enumerate(histories):
+            navs[row, np.searchsorted(days, h['date'])] = h['nav']
+        return funds, days.astype('datetime64[D]'), forward_fill(navs)
+
+
+def forward_fill(navs):
+    """Carry the last NAV forward along each row (leading NaNs stay NaN)"""
+    import numpy as np
+
+    if navs.size == 0:
+        return navs
+    cols = np.arange(navs.shape[1])
+    last = np.maximum.accumulate(np.where(np.isnan(navs), 0, cols), axis=1)
+    return navs[np.arange(navs.shape[0])[:, None], last]
+
+
+def _annualize(ret, days):
+    return (1 + ret) ** (365 / days) - 1 if days >= 365 else ret
+
+
+def point_to_point(dates, navs, days: int, asof=None):
+    """Return per fund from the last NAV on or before asof back `days`
+    calendar days (NAV on or before that date); annualized from 1Y"""
+    import numpy as np
+
+    asof = dates[-1] if asof is None else np.datetime64(asof, 'D')
+    end = np.searchsorted(dates, asof, side='right') - 1
+    start = np.searchsorted(dates, dates[end] - days, side='right') - 1 if end >= 0 else -1
+    if start < 0:
+        return np.full(navs.shape[0], np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _annualize(navs[:, end] / navs[:, start] - 1, days)
+
+
+def rolling_returns(dates, navs, days: int):
+    """funds x dates array of `days` returns ending on each date (NaN where
+    the window reaches before the history)"""
+    import numpy as np
+
+    start = np.searchsorted(dates, dates - days, side='right') - 1
+    valid = start >= 0
+    out = np.full(navs.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, valid] = _annualize(navs[:, valid] / navs[:, start[valid]] - 1, days)
+    return out
+
+
+def max_drawdown(navs):
+    """Deepest fall from a running peak per fund (negative fraction)"""
+    import numpy as np
+
+    with np.errstate(invalid='ignore'):
+        drawdown = navs / np.fmax.accumulate(navs, axis=1) - 1
+    empty = np.all(np.isnan(drawdown), axis=1)
+    worst = np.min(np.where(np.isnan(drawdown), 0, drawdown), axis=1)
+    return np.where(empty, np.nan, worst)
+
+
+def volatility(navs, periods_per_year: int = TRADING_DAYS):
+    """Annualized standard deviation of daily log returns per fund"""
+    import numpy as np
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        logret = np.diff(np.log(navs), axis=1)
+    counts = np.sum(~np.isnan(logret), axis=1)
+    vol = np.full(navs.shape[0], np.nan)
+    enough = counts > 1
+    vol[enough] = np.nanstd(logret[enough], axis=1, ddof=1) * np.sqrt(periods_per_year)
+    return vol
+
+
+def analytics(store: NavStore, funds: Optional[Iterable[str]] = None, asof=None,
+              periods: Dict[str, int] = PERIODS, rolling: str = '1Y') -> Dict:
+    """Point-to-point returns per period, rolling-return summary, max
+    drawdown and volatility for every fund in one pass"""
+    import numpy as np
+
+    funds, dates, navs = store.matrix(funds)
+    result = {'funds': funds}
+    if not len(dates):
+        return result
+    for name, days in periods.items():
+        result[name] = point_to_point(dates, navs, days, asof)
+    windows = rolling_returns(dates, navs, periods[rolling])
+    has = ~np.all(np.isnan(windows), axis=1)
+    for stat, fn in (('mean', np.nanmean), ('min', np.nanmin), ('max', np.nanmax)):
+        values = np.full(len(funds), np.nan)
+        if has.any():
+            values[has] = fn(windows[has], axis=1)
+        result[f'rolling {rolling} {stat}'] = values
+    result['max drawdown'] = max_drawdown(navs)
+    result['volatility'] = volatility(navs)
+    return result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NAV history analytics")
+    parser.add_argument('--root', default=NAV_HISTORY_DIR)
+    parser.add_argument('--asof', help="YYYY-MM-DD, default the latest NAV date")
+    args = parser.parse_args()
+
+    store = NavStore(args.root)
+    result = analytics(store, asof=args.asof)
+    columns = [k for k in result if k != 'funds']
+    print(f"{'fund':60} " + ' '.join(f"{c:>16}" for c in columns))
+    for i, fund in enumerate(result['funds']):
+        print(f"{fund[:60]:60} " + ' '.join(f"{result[c][i] * 100:>15.2f}%" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
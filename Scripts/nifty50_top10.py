@@ -1,16 +1,14 @@
-import requests
-import pandas as pd
-from datetime import datetime
 import pytz
 import os
-headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'
-}
+import sys
 
-url = "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%2050"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from http_client import fetched_at
+from nse_client import get_client
+from output_store import write_csv
 
-response = requests.get(url, headers=headers)
-data = response.json()
+url = "/api/equity-stockIndices?index=NIFTY%2050"
 
 target_symbols = [
     "RELIANCE",
@@ -25,40 +23,50 @@ target_symbols = [
     "HINDUNILVR"
 ]
 
-symbol_dict = {}
-for item in data['data']:
-    symbol = item.get('symbol')
-    
-    if symbol in target_symbols:
-        pchange = item.get('pChange')
-        if pchange is not None:
-            percent_change_str = f"{pchange}%"
-        else:
-            percent_change_str = ""
+def build_records(data):
+    symbol_dict = {}
+    for item in data['data']:
+        symbol = item.get('symbol')
         
-        symbol_dict[symbol] = {
-            'Symbol': symbol,
-            'LTP': item.get('lastPrice'),
-            'Chng': item.get('change'),
-            '%': percent_change_str,
-            'Previous': item.get('previousClose'),
-            'Yr Hi': item.get('yearHigh'),
-            'Yr Lo': item.get('yearLow')
-        }
+        if symbol in target_symbols:
+            pchange = item.get('pChange')
+            if pchange is not None:
+                percent_change_str = f"{pchange}%"
+            else:
+                percent_change_str = ""
+            
+            symbol_dict[symbol] = {
+                'Symbol': symbol,
+                'LTP': item.get('lastPrice'),
+                'Chng': item.get('change'),
+                '%': percent_change_str,
+                'Previous': item.get('previousClose'),
+                'Yr Hi': item.get('yearHigh'),
+                'Yr Lo': item.get('yearLow')
+            }
 
-records = []
-for symbol in target_symbols:
-    if symbol in symbol_dict:
-        records.append(symbol_dict[symbol])
-os.makedirs('../Data', exist_ok=True)
-df = pd.DataFrame(records)
-filename = 'Data/nifty50_stocks_top10.csv'
-df.to_csv(filename, index=False)
+    records = []
+    for symbol in target_symbols:
+        if symbol in symbol_dict:
+            records.append(symbol_dict[symbol])
+    return records
 
-# Add timestamp row
-ist = pytz.timezone('Asia/Kolkata')
-timestamp = datetime.now(ist).strftime("%d-%b %H:%M")
-with open(filename, 'a') as f:
-    f.write(f',,,,,Update Time:,{timestamp}\n')
+@metrics.job('nifty50_top10')
+def main():
+    with metrics.span('fetch'):
+        data = get_client().get_json(url)
 
-print("CSV created successfully!")
+    with metrics.span('transform'):
+        records = build_records(data)
+    # Add timestamp row (when the quotes were fetched, for a stale fallback)
+    ist = pytz.timezone('Asia/Kolkata')
+    timestamp = fetched_at(data, ist).strftime("%d-%b %H:%M")
+    fieldnames = ['Symbol', 'LTP', 'Chng', '%', 'Previous', 'Yr Hi', 'Yr Lo']
+    records.append({'Yr Hi': 'Update Time:', 'Yr Lo': timestamp})
+    with metrics.span('write'):
+        write_csv('Data/nifty50_stocks_top10.csv', records, fieldnames=fieldnames, footer_rows=1)
+
+    print("CSV created successfully!")
+
+if __name__ == "__main__":
+    main()
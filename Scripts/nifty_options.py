@@ -1,76 +1,65 @@
-import requests
-import pandas as pd
-from datetime import datetime, timedelta, time, date
-import pytz
+from datetime import datetime, time
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from iv_calculator import CalcIvGreeks, TryMatchWith
-
-# Define holidays (same as before)
-HOLIDAYS = [
-    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10",
-    "2025-04-14", "2025-04-18", "2025-05-01", "2025-08-15",
-    "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
-    "2025-11-05", "2025-12-25", "2026-01-26", "2026-03-03", 
-    "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14", 
-    "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", 
-    "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", 
-    "2026-12-25"
-]
+import metrics
+from market_calendar import IST, NSE_FO
+from output_store import write_output
+
+# requests, numpy, pandas and iv_calculator (scipy) are imported inside the
+# functions that use them, so the market-closed exit never loads them
 
-HOLIDAY_DATES = [datetime.strptime(holiday, "%Y-%m-%d").date() for holiday in HOLIDAYS]
+MARKET_CLOSE_GRACE = time(15, 40)
+IV_STATE_FILE = os.getenv('IV_STATE_FILE', 'Data/iv_state.json')
+# Every fetched chain is appended here (empty OPTION_ARCHIVE_DIR: off)
+OPTION_ARCHIVE_DIR = os.getenv('OPTION_ARCHIVE_DIR', 'Data/option_archive')
+
+# Underlyings and expiries per run, e.g. OPTION_SYMBOLS=NIFTY,BANKNIFTY,RELIANCE.
+# The nearest NIFTY expiry goes to Data/Option.csv, every other symbol/expiry
+# to OPTION_DIR/<SYMBOL>_<EXPIRY>.csv with its own IV state file.
+OPTION_SYMBOLS = [s.strip().upper() for s in os.getenv('OPTION_SYMBOLS', 'NIFTY').split(',') if s.strip()]
+OPTION_EXPIRIES = int(os.getenv('OPTION_EXPIRIES', '1'))
+# Strikes either side of ATM in the CSV, 'all' for the whole chain
+OPTION_WINDOW = os.getenv('OPTION_WINDOW', '10')
+OPTION_DIR = os.getenv('OPTION_DIR', 'Data/options')
+OPTION_WORKERS = int(os.getenv('OPTION_WORKERS', '8'))
+
+# NSE chain type, strike step shown in the CSV (0: every listed strike),
+# weekly expiries and the TradingView future used as the forward of the
+# nearest expiry (later ones use put-call parity on their own chain)
+UNDERLYINGS = {
+    'NIFTY': {'type': 'Indices', 'step': 100, 'weekly': True, 'future': 'NSEIX:NIFTY1!'},
+    'BANKNIFTY': {'type': 'Indices', 'step': 100, 'weekly': False, 'future': 'NSE:BANKNIFTY1!'},
+    'FINNIFTY': {'type': 'Indices', 'step': 50, 'weekly': False, 'future': 'NSE:FINNIFTY1!'},
+    'MIDCPNIFTY': {'type': 'Indices', 'step': 25, 'weekly': False, 'future': 'NSE:MIDCPNIFTY1!'},
+}
+
+def underlying_settings(symbol):
+    """UNDERLYINGS entry for symbol; anything else is a stock F&O contract"""
+    return UNDERLYINGS.get(symbol, {'type': 'Equity', 'step': 0, 'weekly': False, 'future': f"NSE:{symbol}1!"})
 
 def is_market_day():
     """Check if current day is a trading day (weekday and not a holiday)"""
-    ist = pytz.timezone('Asia/Kolkata')
-    ist_now = datetime.now(ist)
-    current_date = ist_now.date()
-    
-    if ist_now.weekday() >= 5:
-        return False
-    
-    if current_date in HOLIDAY_DATES:
-        return False
-    
-    return True
+    return NSE_FO.is_session(datetime.now(IST).date())
 
 def is_market_hours():
     """Check if current time is within market hours (IST: 9:15 AM to 3:40 PM)"""
-    ist = pytz.timezone('Asia/Kolkata')
-    ist_now = datetime.now(ist)
-    
-    if not is_market_day():
-        return False
-    
-    current_time = ist_now.time()
-    market_open = time(9, 15)
-    market_close = time(15, 40)
-    
-    return market_open <= current_time <= market_close
+    return NSE_FO.is_open(closeTime=MARKET_CLOSE_GRACE)
 
 def get_market_status_message():
     """Get detailed message about why market is closed"""
-    ist = pytz.timezone('Asia/Kolkata')
-    ist_now = datetime.now(ist)
+    ist_now = datetime.now(IST)
     current_date = ist_now.date()
-    current_time_str = ist_now.strftime('%Y-%m-%d %H:%M:%S IST')
     weekday = ist_now.strftime('%A')
     
     if ist_now.weekday() >= 5:
         return f"Market closed - {weekday} (Weekend)", False
     
-    if current_date in HOLIDAY_DATES:
-        holiday_str = ""
-        for holiday in HOLIDAYS:
-            if holiday.startswith(str(current_date)):
-                holiday_str = f" ({holiday})"
-                break
-        return f"Market closed - {weekday}{holiday_str} (Holiday)", False
+    if NSE_FO.is_holiday(current_date):
+        return f"Market closed - {weekday} ({current_date}) (Holiday)", False
     
-    market_open = time(9, 15)
-    market_close = time(15, 40)
+    market_open = NSE_FO.openTime
     current_time = ist_now.time()
     
     if current_time < market_open:
@@ -79,15 +68,15 @@ def get_market_status_message():
         minutes = remainder // 60
         return f"Market opens in {hours}h {minutes}m at 9:15 AM", False
     
-    if current_time > market_close:
+    if current_time > MARKET_CLOSE_GRACE:
         return f"Market closed at 3:30 PM today", False
     
     return f"Market open - {weekday}", True
 
+@metrics.job('nifty_options')
 def main():
     status_message, is_open = get_market_status_message()
-    ist = pytz.timezone('Asia/Kolkata')
-    current_time = datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S IST')
+    current_time = datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S IST')
     
     print(f"Current time: {current_time}")
     print(f"Status: {status_message}")
@@ -99,123 +88,222 @@ def main():
     
     print("Fetching option chain data...")
     
-    expiry_date = get_next_tuesday()
-    data, expiry = get_option_chain(expiry=expiry_date)
-    
-    if data:
-        df = create_option_chain_dataframe(data, expiry)
-        os.makedirs('Data', exist_ok=True)
-        
-        output_file = 'Data/Option.csv'
-        df.to_csv(output_file, index=False)
-        
-        current_time = datetime.now(ist).strftime('%d-%b %H:%M')
-        
-        print(f"Option chain saved to: {output_file}")
-        print(f"Timestamp: {current_time} IST")
-        print(f"Underlying: {data['records']['underlyingValue']}")
-        print(f"Expiry: {expiry}")
-        print(f"Rows: {len(df)}")
-    else:
-        print("Failed to fetch option chain data")
-
-headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0',
-    'Accept': 'application/json',
-    'Accept-Language': 'en-US,en;q=0.9',
-    'Referer': 'https://www.nseindia.com/option-chain'
-}
+    strike_range = None if OPTION_WINDOW.lower() == 'all' else int(OPTION_WINDOW)
+    prune_expired()
+    jobs = []
+    for symbol in OPTION_SYMBOLS:
+        try:
+            with metrics.span('expiries'):
+                expiries = get_expiries(symbol, OPTION_EXPIRIES)
+        except Exception as e:
+            print(f"{symbol}: could not list expiries: {e}")
+            continue
+        for rank, expiry in enumerate(expiries):
+            if symbol == 'NIFTY' and not any(job[0] == 'NIFTY' for job in jobs):
+                output_file, state_file = 'Data/Option.csv', IV_STATE_FILE
+            else:
+                name = os.path.join(OPTION_DIR, f"{symbol}_{expiry}")
+                output_file, state_file = f"{name}.csv", IV_STATE_FILE and f"{name}_iv_state.json"
+            jobs.append((symbol, expiry, output_file, state_file, rank == 0))
+    
+    # Each symbol/expiry is fetched and priced on its own thread; the NSE
+    # client and the quote cache are shared
+    from concurrent.futures import ThreadPoolExecutor
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(OPTION_WORKERS, len(jobs)))) as pool:
+        futures = [pool.submit(metrics.bind(run_chain), *job, strike_range=strike_range) for job in jobs]
+        results = []
+        for job, future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"{job[0]} {job[1]}: failed: {e}")
+                results.append(None)
+    
+    current_time = datetime.now(IST).strftime('%d-%b %H:%M')
+    print(f"Timestamp: {current_time} IST")
+    for job, result in zip(jobs, results):
+        if result is None:
+            print(f"{job[0]} {job[1]}: failed to fetch option chain data")
+        else:
+            print(f"{job[0]} {job[1]}: underlying {result['underlying']}, {result['rows']} rows "
+                  f"({result['strikes']} strikes priced) -> {job[2]}")
+
+def run_chain(symbol, expiry, output_file, state_file, front=True, strike_range=10):
+    """Fetch, price and save one symbol/expiry (front: the symbol's nearest
+    expiry); returns a summary dict"""
+    with metrics.span('fetch'):
+        data, expiry = get_option_chain(symbol, expiry)
+    if not data or not data.get('records', {}).get('data'):
+        raise ValueError("empty option chain")
+    
+    # Warm-start IVs from the solver state (the last CSV when the state
+    # file is disabled, then without iterations-saved accounting)
+    warm_start = load_previous_ivs(state_file or output_file, expiry)
+    
+    with metrics.span('build'):
+        chain = build_option_chain(data, expiry, warm_start=warm_start, state_file=state_file,
+                                   strike_range=strike_range, symbol=symbol, front=front)
+    with metrics.span('render'):
+        df = render_option_chain(chain, expiry)
+    # The last row is the run timestamp; the CSV is rewritten only when
+    # the rows above it change
+    with metrics.span('write'):
+        metrics.add(rows=len(df) - 1)
+        write_output(output_file, df.iloc[:-1].to_csv(index=False), df.iloc[-1:].to_csv(index=False, header=False))
+    if OPTION_ARCHIVE_DIR:
+        with metrics.span('archive'):
+            archive_snapshot(data, expiry, chain, symbol)
+    
+    import numpy as np
+    return {'underlying': chain['underlying'], 'rows': len(df),
+            'strikes': int(np.isfinite(chain['iv']).sum())}
+
+def prune_expired(directory=OPTION_DIR, today=None):
+    """Delete the <SYMBOL>_<EXPIRY> CSV and IV state files of expiries that
+    have passed"""
+    import re
+
+    today = today or datetime.now(IST).date()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        match = re.search(r'_(\d{2}-[A-Z]{3}-\d{4})(?:\.csv|_iv_state\.json)$', name)
+        if match and datetime.strptime(match.group(1), '%d-%b-%Y').date() < today:
+            os.remove(os.path.join(directory, name))
+            print(f"Removed expired {os.path.join(directory, name)}")
+
+def archive_snapshot(data, expiry_date, chain, symbol="NIFTY"):
+    """Append the full chain (all strikes, with the call and put IVs
+    computed for the window) to the binary snapshot archive"""
+    from chain_archive import ChainArchive, parse_nse_timestamp
+
+    expiry = datetime.strptime(expiry_date, '%d-%b-%Y').date()
+    archive = ChainArchive(OPTION_ARCHIVE_DIR)
+    timestamp = parse_nse_timestamp(data)
+    if timestamp:
+        # Outside market hours NSE keeps serving the closing snapshot
+        segment = archive.day(timestamp.date())
+        positions = segment.select(symbol, expiry)
+        if len(positions) and segment.index['time'][positions[-1]] == int(timestamp.timestamp()):
+            print(f"Snapshot already archived ({data['records']['timestamp']})")
+            return
+    archive.append(symbol, expiry, chain, spot=chain['underlying'], future=chain['future'],
+                   timestamp=timestamp)
+    print(f"Snapshot archived to: {OPTION_ARCHIVE_DIR}")
 
 def get_future_price(symbol="NIFTY"):
-    """Fetch NIFTY futures price with fallback"""
+    """Fetch the underlying's near futures price (0 when unavailable)"""
+    from tv_quotes import fetch_quote
+
     try:
-        if "NIFTY" in symbol.upper():
-            url = "https://scanner.tradingview.com/symbol?symbol=NSEIX:NIFTY1!&fields=close&no_404=true"
-            response = requests.get(url, headers=headers, timeout=5)
-            data = response.json()
-            future_price = float(data.get('close', 0))
-            
-            if future_price <= 0:
-                # Fallback: calculate from spot using put-call parity
-                print("Warning: Future price not available, using synthetic future")
-                return 0
-            return future_price
-        return 0
+        # NIFTY shares fetch_and_save's GIFT-NIFTY quote when that is still
+        # fresh; expiries of one symbol share one request
+        data = fetch_quote(underlying_settings(symbol)['future'], fields=("close",), timeout=5)
+        if data is None:
+            raise ValueError("no response from scanner")
+        future_price = float(data.get('close') or 0)
+        
+        if future_price <= 0:
+            # Fallback: calculate from spot using put-call parity
+            print("Warning: Future price not available, using synthetic future")
+            return 0
+        return future_price
     except Exception as e:
         print(f"Warning: Could not fetch future price: {e}")
         return 0
 
+def chain_forward(chain, underlying_value, expiry_date, symbol="NIFTY"):
+    """Forward of one expiry from put-call parity on its chain (0 when no
+    strike trades on both sides); the near future only matches the front
+    expiry"""
+    import numpy as np
+    from replay import Snapshot, parity_forward
+
+    expiry = datetime.strptime(expiry_date, '%d-%b-%Y').date()
+    snapshot = Snapshot(0, symbol, expiry, float(underlying_value), float('nan'),
+                        chain['strike'], chain['call_ltp'], chain['put_ltp'])
+    forward = parity_forward(snapshot, 0.0)
+    return forward if np.isfinite(forward) else 0
+
 def get_next_tuesday():
-    """Get the next Tuesday expiry date"""
-    ist = pytz.timezone('Asia/Kolkata')
-    now = datetime.now(ist)
-    today = now.date()
-    
-    days_ahead = 1 - today.weekday()
-    if days_ahead < 0 or (days_ahead == 0 and now.hour >= 16):
-        days_ahead += 7
+    """Get the next Tuesday expiry date (previous session when it is a holiday)"""
+    return NSE_FO.next_expiry(weekday=1).strftime('%d-%b-%Y').upper()
+
+def get_expiries(symbol="NIFTY", count=1):
+    """The next count expiries ('DD-MON-YYYY') from NSE's contract info,
+    else from the exchange calendar"""
+    try:
+        from nse_client import get_client
+        
+        listed = get_client().get_json(f"/api/option-chain-contract-info?symbol={symbol}")['expiryDates']
+        if listed:
+            return [expiry.upper() for expiry in listed[:count]]
+    except Exception as e:
+        print(f"Warning: Could not fetch {symbol} expiries, using the calendar: {e}")
     
-    next_tuesday_date = today + timedelta(days=days_ahead)
-    return next_tuesday_date.strftime('%d-%b-%Y').upper()
+    weekly = underlying_settings(symbol)['weekly']
+    first = NSE_FO.next_expiry(weekday=1, monthly=not weekly)
+    expiries = [e for e in NSE_FO.expiries(weekday=1, monthly=not weekly) if e >= first][:count]
+    return [e.strftime('%d-%b-%Y').upper() for e in expiries]
 
-def round_to_nearest_100(price):
-    return round(price / 100) * 100
+def round_to_step(price, step):
+    return round(price / step) * step
 
-def get_filtered_strike_prices(data, strike_range=10):
-    underlying_value = data['records']['underlyingValue']
-    rounded_strike = round_to_nearest_100(underlying_value)
-    
-    all_strikes = sorted([item['strikePrice'] for item in data['records']['data'] if item['strikePrice'] % 100 == 0])
-    
-    target_index = all_strikes.index(rounded_strike) if rounded_strike in all_strikes else \
-                   min(range(len(all_strikes)), key=lambda i: abs(all_strikes[i] - rounded_strike))
-    
-    start_index = max(0, target_index - strike_range)
-    end_index = min(len(all_strikes), target_index + strike_range + 1)
-    
-    return all_strikes[start_index:end_index], underlying_value, rounded_strike, target_index - start_index
+def select_window(strikes, underlying_value, strike_range=10, step=100):
+    """Positions in the sorted strikes array of the strikes on the step grid
+    (step 0: every strike) within strike_range (None: all) of the one nearest
+    the underlying (rounded to the step)"""
+    import numpy as np
+    
+    on_grid = np.flatnonzero(strikes % step == 0) if step else np.arange(len(strikes))
+    if len(on_grid) == 0 or strike_range is None:
+        return on_grid
+    candidates = strikes[on_grid]
+    rounded_strike = round_to_step(underlying_value, step) if step else underlying_value
+    
+    # Exact match, else the nearer neighbour (the lower one on a tie)
+    target = min(int(np.searchsorted(candidates, rounded_strike)), len(candidates) - 1)
+    if candidates[target] != rounded_strike and target > 0 and \
+            abs(candidates[target - 1] - rounded_strike) <= abs(candidates[target] - rounded_strike):
+        target -= 1
+    
+    return on_grid[max(0, target - strike_range):target + strike_range + 1]
 
 def get_option_chain(symbol="NIFTY", expiry=None):
     if expiry is None:
         expiry = get_next_tuesday()
     
-    url = f"https://www.nseindia.com/api/option-chain-v3?type=Indices&symbol={symbol}&expiry={expiry}"
-    
-    session = requests.Session()
-    session.headers.update(headers)
-    session.get("https://www.nseindia.com")
+    from nse_client import BASE_URL, get_client
     
-    response = session.get(url)
-    data = response.json()
+    # Never a stale chain: it would be priced and saved as the current one
+    data = get_client().get_json(
+        f"/api/option-chain-v3?type={underlying_settings(symbol)['type']}&symbol={symbol}&expiry={expiry}",
+        referer=f"{BASE_URL}/option-chain", stale=False,
+    )
     
     return data, expiry
 
-def find_atm_strike_and_prices(df, future_price):
+def find_atm_strike_and_prices(strikes, call_prices, put_prices, future_price):
     """
-    Find ATM strike based on future price with validation
+    Find ATM strike based on future price with validation.
+    strikes must be sorted; returns (None, 0, 0) when there are none.
     """
-    valid_rows = []
-    for _, row in df.iterrows():
-        if isinstance(row['STRIKE'], (int, float)):
-            valid_rows.append(row)
+    import numpy as np
     
-    if not valid_rows:
+    if len(strikes) == 0:
         return None, 0, 0
     
-    # Find strike closest to future price
-    atm_strike = min(valid_rows, key=lambda x: abs(x['STRIKE'] - future_price))['STRIKE']
-    
-    atm_row = None
-    for _, row in df.iterrows():
-        if row['STRIKE'] == atm_strike:
-            atm_row = row
-            break
+    # Strike closest to future price (the lower one on a tie)
+    i = min(int(np.searchsorted(strikes, future_price)), len(strikes) - 1)
+    if i > 0 and abs(strikes[i - 1] - future_price) <= abs(strikes[i] - future_price):
+        i -= 1
+    atm_strike = float(strikes[i])
     
-    if atm_row is None:
-        return atm_strike, 0, 0
-    
-    atm_call_price = float(atm_row['CALL LTP']) if atm_row['CALL LTP'] not in ['', None, 0] else 0
-    atm_put_price = float(atm_row['PUT LTP']) if atm_row['PUT LTP'] not in ['', None, 0] else 0
+    atm_call_price = float(call_prices[i]) if call_prices[i] > 0 else 0
+    atm_put_price = float(put_prices[i]) if put_prices[i] > 0 else 0
     
     # Validate ATM prices
     if atm_call_price <= 0 or atm_put_price <= 0:
@@ -228,154 +316,280 @@ def find_atm_strike_and_prices(df, future_price):
     
     return atm_strike, calc_call_price, calc_put_price
 
-def calculate_iv_for_dataframe(df, future_price, expiry_datetime):
+def load_previous_ivs(path, expiry_date):
     """
-    Calculate IV using Black-76 model with futures price
+    Previous snapshot's IVs per strike for warm-starting the solver.
+    Reads the solver state JSON (call/put IVs and cold iteration counts) or
+    an earlier Option.csv (OTM IV for both sides). Empty when the file is
+    missing or was written for another expiry.
     """
+    import csv
+    import json
+    
+    if not path or not os.path.exists(path):
+        return {}
+    
+    try:
+        if path.endswith('.json'):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get('expiry') != expiry_date:
+                return {}
+            return {float(k): v for k, v in state.get('strikes', {}).items()}
+        
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        if not any(row.get('PUT LTP') == f"Expiry: {expiry_date}" for row in rows):
+            return {}
+        previous = {}
+        for row in rows:
+            try:
+                strike, iv = float(row['STRIKE']), float(row['IV']) / 100
+            except (TypeError, ValueError):
+                continue
+            if row.get('CALL LTP'):
+                previous[strike] = {'call': iv, 'put': iv}
+        return previous
+    except Exception as e:
+        print(f"Warning: Could not load previous IVs from {path}: {e}")
+        return {}
+
+def save_iv_state(path, expiry_date, strikes, call_ivs, put_ivs, stats, warm_start):
+    """Persist this snapshot's IVs and cold-solve iteration counts"""
+    import json
+    
+    # The time of the run is in the output manifest, so an unchanged
+    # chain leaves the state file untouched
+    state = {'expiry': expiry_date, 'strikes': {}}
+    for i, strike in enumerate(strikes):
+        previous = warm_start.get(float(strike), {})
+        entry = {'call': float(call_ivs[i]), 'put': float(put_ivs[i])}
+        # Keep the iteration count of the last cold solve for each side
+        for side in ('call', 'put'):
+            if stats[f'{side}Warm'][i]:
+                if f'{side}Cold' in previous:
+                    entry[f'{side}Cold'] = previous[f'{side}Cold']
+            else:
+                entry[f'{side}Cold'] = int(stats[f'{side}Iterations'][i])
+        state['strikes'][str(float(strike))] = entry
+    
+    try:
+        write_output(path, json.dumps(state))
+    except OSError as e:
+        print(f"Warning: Could not save IV state to {path}: {e}")
+
+def report_warm_start(strikes, stats, warm_start):
+    """Print how many solves were warm-started and the iterations saved"""
+    warm = int(stats['callWarm'].sum() + stats['putWarm'].sum())
+    used = int(stats['callIterations'].sum() + stats['putIterations'].sum())
+    message = f"Warm start: {warm}/{2 * len(strikes)} solves, {used} solver iterations"
+    
+    warm_used, cold_known = 0, 0
+    for i, strike in enumerate(strikes):
+        previous = warm_start.get(float(strike), {})
+        for side in ('call', 'put'):
+            if stats[f'{side}Warm'][i] and f'{side}Cold' in previous:
+                warm_used += int(stats[f'{side}Iterations'][i])
+                cold_known += previous[f'{side}Cold']
+    if cold_known:
+        message += f", saved {cold_known - warm_used} vs cold solves"
+    print(message)
+
+@metrics.span('iv')
+def calculate_chain_ivs(strikes, call_prices, put_prices, future_price, expiry_datetime,
+                        warm_start=None, state_file=None, sides=False):
+    """
+    IV in percent (OTM side, as displayed) per strike using Black-76 with the
+    futures price; NaN where a strike has no price or no setup was possible.
+    strikes must be sorted. warm_start (from load_previous_ivs) seeds the
+    solver with the previous snapshot's IVs; state_file saves this
+    snapshot's IVs for the next run. sides also returns the call and put
+    IVs, unrounded decimal fractions: (iv, call_iv, put_iv).
+    """
+    import numpy as np
+    from iv_calculator import CalcIvGreeks, TryMatchWith, implied_vol_chain
+    
+    strikes = np.asarray(strikes, dtype=float)
+    call_prices = np.nan_to_num(np.asarray(call_prices, dtype=float))
+    put_prices = np.nan_to_num(np.asarray(put_prices, dtype=float))
+    iv_values = np.full(len(strikes), np.nan)
+    call_values, put_values = iv_values.copy(), iv_values.copy()
+    result = (iv_values, call_values, put_values) if sides else iv_values
+    
     # Use future price for ATM selection
-    atm_strike, atm_call_price, atm_put_price = find_atm_strike_and_prices(df, future_price)
+    atm_strike, atm_call_price, atm_put_price = find_atm_strike_and_prices(
+        strikes, call_prices, put_prices, future_price)
     
     if atm_strike is None or future_price <= 0:
-        return [''] * len(df)
+        return result
     
     print(f"ATM Calculation: Strike={atm_strike}, Future={future_price:.2f}, "
           f"Call={atm_call_price:.2f}, Put={atm_put_price:.2f}")
     
-    iv_values = []
-    
-    for idx, row in df.iterrows():
-        if not isinstance(row['STRIKE'], (int, float)):
-            iv_values.append('')
-            continue
-            
-        strike = float(row['STRIKE'])
-        
-        call_price = float(row['CALL LTP']) if row['CALL LTP'] not in ['', None] else 0
-        put_price = float(row['PUT LTP']) if row['PUT LTP'] not in ['', None] else 0
-        
-        # Skip if both prices are zero or invalid
-        if (call_price <= 0 and put_price <= 0) or strike <= 0:
-            iv_values.append('')
-            continue
-        
-        # Use minimum 5 paisa for calculation
-        calc_call_price = max(call_price, 0.05) if call_price > 0 else 0.05
-        calc_put_price = max(put_price, 0.05) if put_price > 0 else 0.05
-        
-        try:
-            # Initialize calculator with Black-76 parameters
-            calculator = CalcIvGreeks(
-                FuturePrice=future_price,
-                AtmStrike=atm_strike,
-                AtmStrikeCallPrice=atm_call_price,
-                AtmStrikePutPrice=atm_put_price,
-                ExpiryDateTime=expiry_datetime,
-                tryMatchWith=TryMatchWith.CUSTOM
-            )
-            
-            # Get IV and Greeks for this strike
-            result = calculator.GetImpVolAndGreeks(
-                StrikePrice=strike,
-                StrikeCallPrice=calc_call_price,
-                StrikePutPrice=calc_put_price,
-                useOtmLiquidity=True
-            )
-            
-            iv_values.append(round(result['ImplVol'], 2))
-                
-        except Exception as e:
-            print(f"Error calculating IV for strike {strike}: {e}")
-            iv_values.append('')
-    
+    # One calculator for the chain: validates the ATM pair and fixes T
+    try:
+        calculator = CalcIvGreeks(
+            FuturePrice=future_price,
+            AtmStrike=atm_strike,
+            AtmStrikeCallPrice=atm_call_price,
+            AtmStrikePutPrice=atm_put_price,
+            ExpiryDateTime=expiry_datetime,
+            tryMatchWith=TryMatchWith.CUSTOM
+        )
+    except Exception as e:
+        print(f"Error setting up IV calculator: {e}")
+        return result
+    
+    # Skip strikes where both prices are zero or invalid
+    solvable = ((call_prices > 0) | (put_prices > 0)) & (strikes > 0)
+    if not solvable.any():
+        return result
+    
+    # Solve every strike's call and put IV in one vectorized pass
+    solve_strikes = strikes[solvable]
+    warm_start = warm_start or {}
+    initial_call_ivs = [warm_start.get(k, {}).get('call', np.nan) for k in solve_strikes]
+    initial_put_ivs = [warm_start.get(k, {}).get('put', np.nan) for k in solve_strikes]
+    call_ivs, put_ivs, stats = implied_vol_chain(
+        calculator.F, calculator.T, solve_strikes, call_prices[solvable], put_prices[solvable],
+        interestRate=calculator.r * 100,
+        initialCallIVs=initial_call_ivs if warm_start else None,
+        initialPutIVs=initial_put_ivs if warm_start else None,
+        returnStats=True
+    )
+    
+    if warm_start:
+        report_warm_start(solve_strikes, stats, warm_start)
+    if state_file:
+        expiry_date = expiry_datetime.strftime('%d-%b-%Y').upper()
+        save_iv_state(state_file, expiry_date, solve_strikes, call_ivs, put_ivs, stats, warm_start)
+    
+    # Use OTM option's IV: OTM call when strike >= future price
+    strike_ivs = np.where(solve_strikes >= calculator.F, call_ivs, put_ivs)
+    iv_values[solvable] = np.round(np.round(strike_ivs, 6) * 100, 2)
+    call_values[solvable] = call_ivs
+    put_values[solvable] = put_ivs
+    
+    return result
+
+def calculate_iv_for_dataframe(df, future_price, expiry_datetime, warm_start=None, state_file=None):
+    """
+    calculate_chain_ivs for a DataFrame with STRIKE / CALL LTP / PUT LTP
+    columns; rows whose STRIKE is not a number (display rows) get ''.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    numeric = df['STRIKE'].map(type) != str
+    strikes = pd.to_numeric(df['STRIKE'].where(numeric), errors='coerce').to_numpy(dtype=float)
+    calls = pd.to_numeric(df['CALL LTP'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    puts = pd.to_numeric(df['PUT LTP'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    
+    rows = np.flatnonzero(~np.isnan(strikes))
+    order = rows[np.argsort(strikes[rows], kind='stable')]
+    ivs = calculate_chain_ivs(strikes[order], calls[order], puts[order], future_price, expiry_datetime,
+                              warm_start=warm_start, state_file=state_file)
+    
+    iv_values = [''] * len(df)
+    for pos, iv in zip(order, ivs):
+        if not np.isnan(iv):
+            iv_values[pos] = float(iv)
     return iv_values
 
-def create_option_chain_dataframe(data, expiry_date):
-    filtered_strikes, underlying_value, rounded_strike, _ = get_filtered_strike_prices(data)
-    
-    strike_map = {item['strikePrice']: item for item in data['records']['data'] if item['strikePrice'] % 100 == 0}
-    
-    option_data = []
-    inserted_underlying = False
+def build_option_chain(data, expiry_date, warm_start=None, state_file=None, strike_range=10,
+                       symbol="NIFTY", step=None, front=True):
+    """
+    The whole chain as typed columns (chain_archive.columns_from_nse) plus
+    'window' (positions shown in the CSV), 'iv' (percent, NaN outside the
+    window), 'call_iv' / 'put_iv' (decimal fractions, unrounded), 'future'
+    and 'underlying'. step defaults to the symbol's
+    UNDERLYINGS step; strike_range None prices the whole chain. The forward
+    is the symbol's near future for the front expiry and put-call parity
+    on the chain for later ones.
+    """
+    import numpy as np
+    from chain_archive import columns_from_nse
     
-    for strike in filtered_strikes:
-        if strike not in strike_map:
-            continue
-        
-        if strike > underlying_value and not inserted_underlying:
-            option_data.append({
-                'CALL OI': '', 'CALL OI CHNG': '', 'CALL VOLUME': '', 
-                'CALL CHNG': '', 'CALL LTP': '', 'STRIKE': f"{underlying_value}",
-                'PUT LTP': 'Expiry: ' + expiry_date, 'PUT CHNG': '', 
-                'PUT VOLUME': '', 'PUT OI CHNG': '', 'PUT OI': ''
-            })
-            inserted_underlying = True
-        
-        item = strike_map[strike]
-        ce_data = item.get('CE', {})
-        pe_data = item.get('PE', {})
-        
-        option_data.append({
-            'CALL OI': ce_data.get('openInterest', 0),
-            'CALL OI CHNG': ce_data.get('changeinOpenInterest', 0),
-            'CALL VOLUME': ce_data.get('totalTradedVolume', 0),
-            'CALL CHNG': ce_data.get('change', 0),
-            'CALL LTP': ce_data.get('lastPrice', 0),
-            'STRIKE': strike,
-            'PUT LTP': pe_data.get('lastPrice', 0),
-            'PUT CHNG': pe_data.get('change', 0),
-            'PUT VOLUME': pe_data.get('totalTradedVolume', 0),
-            'PUT OI CHNG': pe_data.get('changeinOpenInterest', 0),
-            'PUT OI': pe_data.get('openInterest', 0)
-        })
-    
-    if not inserted_underlying:
-        option_data.append({
-            'CALL OI': '', 'CALL OI CHNG': '', 'CALL VOLUME': '', 
-            'CALL CHNG': '', 'CALL LTP': '', 'STRIKE': f"{underlying_value}",
-            'PUT LTP': 'Expiry: ' + expiry_date, 'PUT CHNG': '', 
-            'PUT VOLUME': '', 'PUT OI CHNG': '', 'PUT OI': ''
-        })
-    
-    df = pd.DataFrame(option_data)
+    chain = columns_from_nse(data)
+    underlying_value = data['records']['underlyingValue']
+    step = underlying_settings(symbol)['step'] if step is None else step
+    window = select_window(chain['strike'], underlying_value, strike_range, step)
     
     # Get futures price
-    future_price = get_future_price()
+    with metrics.span('future'):
+        future_price = get_future_price(symbol) if front else chain_forward(chain, underlying_value, expiry_date, symbol)
     
     if future_price <= 0:
         print("Warning: Could not fetch futures price, using spot as fallback")
         future_price = underlying_value
     
-    print(f"Future Price: {future_price:.2f}, Spot: {underlying_value}")
+    print(f"{symbol} {expiry_date}: Future Price: {future_price:.2f}, Spot: {underlying_value}")
     
     # Create expiry datetime
     expiry_datetime = datetime.strptime(expiry_date, '%d-%b-%Y')
     expiry_datetime = expiry_datetime.replace(hour=15, minute=30, second=0)
-    expiry_datetime = pytz.timezone('Asia/Kolkata').localize(expiry_datetime)
+    expiry_datetime = IST.localize(expiry_datetime)
     
     # Calculate IV using Black-76
-    iv_column = calculate_iv_for_dataframe(df, future_price, expiry_datetime)
-    
-    df['IV'] = iv_column
-    
-    columns_order = ['CALL OI', 'CALL OI CHNG', 'CALL VOLUME', 'CALL CHNG', 'CALL LTP',
-                     'STRIKE', 'IV', 
-                     'PUT LTP', 'PUT CHNG', 'PUT VOLUME', 'PUT OI CHNG', 'PUT OI']
-    df = df[columns_order]
-    
-    ist = pytz.timezone('Asia/Kolkata')
-    current_time = datetime.now(ist).strftime('%d-%b %H:%M')
-    
-    timestamp_row = pd.DataFrame([{
-        'CALL OI': '', 'CALL OI CHNG': '', 'CALL VOLUME': '', 
-        'CALL CHNG': '', 'CALL LTP': '', 'STRIKE': '',
-        'IV': '', 
-        'PUT LTP': '', 'PUT CHNG': '', 'PUT VOLUME': '',
-        'PUT OI CHNG': 'Update Time', 'PUT OI': current_time
-    }])
-    
-    df = pd.concat([df, timestamp_row], ignore_index=True)
-    
-    return df
+    ivs, call_ivs, put_ivs = (np.full(len(chain['strike']), np.nan) for _ in range(3))
+    ivs[window], call_ivs[window], put_ivs[window] = calculate_chain_ivs(
+        chain['strike'][window], chain['call_ltp'][window], chain['put_ltp'][window],
+        future_price, expiry_datetime, warm_start=warm_start, state_file=state_file, sides=True)
+    
+    chain.update(window=window, iv=ivs, call_iv=call_ivs, put_iv=put_ivs, future=future_price,
+                 underlying=underlying_value)
+    return chain
+
+DISPLAY_COLUMNS = [
+    ('CALL OI', 'call_oi'), ('CALL OI CHNG', 'call_oi_chg'), ('CALL VOLUME', 'call_volume'),
+    ('CALL CHNG', 'call_chng'), ('CALL LTP', 'call_ltp'), ('STRIKE', 'strike'), ('IV', 'iv'),
+    ('PUT LTP', 'put_ltp'), ('PUT CHNG', 'put_chng'), ('PUT VOLUME', 'put_volume'),
+    ('PUT OI CHNG', 'put_oi_chg'), ('PUT OI', 'put_oi'),
+]
+
+def _display_values(values):
+    """Object column for the CSV: whole numbers as ints (as NSE sends
+    them), NaN as ''"""
+    import numpy as np
+    
+    out = values.astype(object)
+    whole = np.isfinite(values) & (values == np.round(values))
+    out[whole] = [int(v) for v in values[whole]]
+    out[np.isnan(values)] = ''
+    return out
+
+def render_option_chain(chain, expiry_date, current_time=None):
+    """
+    Option.csv layout for the window of a build_option_chain result: the
+    display-only rows (underlying/expiry after the last strike below the
+    underlying, update time at the end) are added here.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    window = chain['window']
+    underlying_value = chain['underlying']
+    columns = {name: _display_values(chain[field][window]) for name, field in DISPLAY_COLUMNS if field != 'iv'}
+    # IVs are always shown as floats
+    columns['IV'] = chain['iv'][window].astype(object)
+    columns['IV'][np.isnan(chain['iv'][window])] = ''
+    
+    blank = {name: '' for name, _ in DISPLAY_COLUMNS}
+    underlying_row = dict(blank, STRIKE=f"{underlying_value}", **{'PUT LTP': 'Expiry: ' + expiry_date})
+    current_time = current_time or datetime.now(IST).strftime('%d-%b %H:%M')
+    timestamp_row = dict(blank, **{'PUT OI CHNG': 'Update Time', 'PUT OI': current_time})
+    
+    insert_at = int(np.searchsorted(chain['strike'][window], underlying_value, side='right'))
+    for name, _ in DISPLAY_COLUMNS:
+        columns[name] = np.concatenate([
+            columns[name][:insert_at], [underlying_row[name]], columns[name][insert_at:], [timestamp_row[name]]
+        ])
+    
+    return pd.DataFrame({name: columns[name] for name, _ in DISPLAY_COLUMNS})
+
+def create_option_chain_dataframe(data, expiry_date, warm_start=None, state_file=None):
+    """Option.csv DataFrame for a response (build_option_chain + render_option_chain)"""
+    return render_option_chain(build_option_chain(data, expiry_date, warm_start, state_file), expiry_date)
 
 if __name__ == "__main__":
     main()
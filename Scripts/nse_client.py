@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import metrics
+from http_client import get_client as get_http_client
+
+BASE_URL = os.getenv('NSE_BASE_URL', 'https://www.nseindia.com')
+# Cookies survive between runs here (empty NSE_COOKIE_FILE: in-process only)
+COOKIE_FILE = os.getenv('NSE_COOKIE_FILE', os.path.join(tempfile.gettempdir(), 'nse_cookies.json'))
+# NSE's session cookies carry no expiry; reuse them this long after warming
+SESSION_COOKIE_TTL = 30 * 60
+
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0',
+    'Accept': 'application/json',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+class NSEClient:
+    """requests.Session for the NSE APIs that warms its cookies once.
+
+    Cookies come from the cookie file when they have not expired, otherwise
+    from one homepage fetch; they are written back after every request so
+    the next run (or another collector) skips the warm-up. A 401/403 means
+    the cookies went stale: the client re-warms and retries once. Requests
+    go through the shared http_client (timeouts, retries, NSE's breaker).
+    """
+
+    def __init__(self, base_url: str = BASE_URL, cookie_file: Optional[str] = COOKIE_FILE,
+                 timeout: float = 10, pool_size: int = 8) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.cookie_file = cookie_file
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.warmups = 0
+        self._session = None
+        self._warmed = False
+        self._lock = threading.Lock()
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update(headers)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _load_cookies(self) -> bool:
+        """Unexpired cookies from the cookie file into the session"""
+        if not self.cookie_file:
+            return False
+        try:
+            with open(self.cookie_file) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if saved.get('base_url') != self.base_url:
+            return False
+        now = time.time()
+        loaded = 0
+        for c in saved.get('cookies', []):
+            expires = c['expires'] if c['expires'] is not None else saved['saved'] + SESSION_COOKIE_TTL
+            if expires > now:
+                self.session.cookies.set(c['name'], c['value'], domain=c['domain'], path=c['path'],
+                                         expires=c['expires'], secure=c['secure'])
+                loaded += 1
+        return loaded > 0
+
+    def _save_cookies(self) -> None:
+        if not self.cookie_file:
+            return
+        cookies = [
+            {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path,
+             'expires': c.expires, 'secure': c.secure}
+            for c in self.session.cookies
+        ]
+        tmp = f"{self.cookie_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'base_url': self.base_url, 'saved': time.time(), 'cookies': cookies}, f)
+            os.replace(tmp, self.cookie_file)
+        except OSError:
+            pass
+
+    def warm(self, stale: int = -1) -> None:
+        """Fetch the homepage for fresh cookies. With stale set to the warm-up
+        count a failed request saw, concurrent callers warm only once."""
+        with self._lock:
+            if stale >= 0 and self.warmups != stale:
+                return
+            self.session.cookies.clear()
+            get_http_client().request('GET', self.base_url, session=self.session, timeout=self.timeout)
+            self.warmups += 1
+            self._warmed = True
+            self._save_cookies()
+
+    def _ensure_cookies(self) -> None:
+        with self._lock:
+            if self._warmed:
+                return
+            self._warmed = self._load_cookies()
+            seen = self.warmups
+        if not self._warmed:
+            self.warm(stale=seen)
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith('http') else self.base_url + path
+
+    def get(self, path: str, referer: Optional[str] = None):
+        """GET base_url + path with cookies, re-warming once on 401/403"""
+        self._ensure_cookies()
+        url = self._url(path)
+        request_headers = {'Referer': referer or self.base_url + '/'}
+        for attempt in range(2):
+            seen = self.warmups
+            response = get_http_client().request('GET', url, session=self.session, headers=request_headers,
+                                                 timeout=self.timeout)
+            if response.status_code not in (401, 403) or attempt:
+                break
+            self.warm(stale=seen)
+        with self._lock:
+            # Picks up cookies NSE refreshed on this response
+            self._save_cookies()
+        return response
+
+    def get_json(self, path: str, referer: Optional[str] = None, stale: bool = True) -> Dict:
+        """Decoded JSON of a successful response; with stale, the last good
+        one (marked stale) when the request fails"""
+        def fetch():
+            response = self.get(path, referer)
+            response.raise_for_status()
+            with metrics.span('decode'):
+                return response.json()
+
+        if not stale:
+            return fetch()
+        return get_http_client().with_fallback(f"GET {self._url(path)}", fetch)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> NSEClient:
+    """Process-wide client so every NSE collector shares cookies and connections"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = NSEClient()
+        return _client
@@ -0,0 +1,136 @@
+"""Change-detecting writer for the Data/ outputs.
+
+Every collector ends its CSV with a run-timestamp row ("Update Time"), so
+the file differed on every run even when the data had not. write_output
+hashes the payload without that footer and rewrites the file (atomically,
+via a temporary file and os.replace) only when the hash changes. The run
+times live in one sidecar manifest, MANIFEST_FILE:
+
+    {"Data/etf.csv": {"sha256": ..., "bytes": ..., "changed": ..., "checked": ...}}
+
+changed is when the payload last changed (and the file was written),
+checked is the last run that produced it. The footer in the file therefore
+shows when the data last changed. The workflows commit the manifest only
+together with a data change, so checked is local to the runner: in the
+repository it is as of the last data commit. Usage:
+
+    python Scripts/output_store.py [--changed-since 2025-12-26T09:15]
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import metrics
+from market_calendar import IST
+
+MANIFEST_FILE = os.getenv('OUTPUT_MANIFEST', 'Data/manifest.json')
+
+# Collectors run as threads of one process (run_watchlist); the manifest is
+# read, updated and replaced under this lock
+_lock = threading.Lock()
+_changed: List[str] = []
+
+
+def _key(path: str) -> str:
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+def load_manifest(manifest: str = MANIFEST_FILE) -> Dict[str, Dict]:
+    try:
+        with open(manifest) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _replace(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_output(path: str, payload: str, footer: str = '', manifest: str = MANIFEST_FILE,
+                 encoding: str = 'utf-8') -> bool:
+    """Write payload + footer to path unless payload is unchanged since the
+    last write; footer (the run timestamp) is not hashed. Returns whether
+    the file was written."""
+    data = payload.encode(encoding)
+    digest = hashlib.sha256(data).hexdigest()
+    now = datetime.now(IST).isoformat(timespec='seconds')
+    key = _key(path)
+
+    with _lock:
+        entries = load_manifest(manifest) if manifest else {}
+        entry = entries.get(key, {})
+        changed = entry.get('sha256') != digest or not os.path.exists(path)
+        if changed:
+            _replace(path, data + footer.encode(encoding))
+            entry = {'sha256': digest, 'bytes': len(data), 'changed': now}
+            if key not in _changed:
+                _changed.append(key)
+        entry['checked'] = now
+        entries[key] = entry
+        if manifest:
+            _replace(manifest, json.dumps(entries, indent=2, sort_keys=True).encode() + b'\n')
+    return changed
+
+
+def write_csv(path: str, rows: Sequence, fieldnames: Optional[List[str]] = None, footer_rows: int = 0,
+              lineterminator: str = '\n', **kwargs) -> bool:
+    """write_output for CSV rows (dicts when fieldnames is given, else
+    sequences); the last footer_rows rows are the run timestamp"""
+    def render(part, with_header):
+        buffer = io.StringIO()
+        if fieldnames is not None:
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator=lineterminator)
+            if with_header:
+                writer.writeheader()
+        else:
+            writer = csv.writer(buffer, lineterminator=lineterminator)
+        writer.writerows(part)
+        return buffer.getvalue()
+
+    split = len(rows) - footer_rows
+    # Sequence rows start with their header row
+    metrics.add(rows=split if fieldnames is not None else max(split - 1, 0))
+    return write_output(path, render(rows[:split], True), render(rows[split:], False), **kwargs)
+
+
+def changed_outputs() -> List[str]:
+    """Outputs this process rewrote, in write order"""
+    with _lock:
+        return list(_changed)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the outputs in the manifest")
+    parser.add_argument('--manifest', default=MANIFEST_FILE)
+    parser.add_argument('--changed-since', help="ISO time (IST): only outputs changed after it")
+    args = parser.parse_args()
+
+    since = None
+    if args.changed_since:
+        since = datetime.fromisoformat(args.changed_since)
+        since = IST.localize(since) if since.tzinfo is None else since
+    for key, entry in sorted(load_manifest(args.manifest).items()):
+        if since and datetime.fromisoformat(entry['changed']) <= since:
+            continue
+        print(f"{key:40} changed {entry['changed']}  checked {entry['checked']}  "
+              f"{entry['bytes']:>8} bytes  {entry['sha256'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""Recompute IVs and Greeks over archived option-chain snapshots.
+
+Sources (files or directories, mixed freely):
+    *.json   raw NSE option-chain(-v3) responses, one snapshot per expiry
+    *.csv    saved Option.csv files (window strikes, forward from parity)
+    a chain_archive root or day segment (Data/option_archive)
+
+Snapshots are streamed from disk and grouped by expiry into batches of about
+--batch-strikes strikes. Time to expiry is worked out once per day and expiry
+in a batch and spread over its snapshots by time of day; the batch is then
+solved and priced in one implied_vol_chain / black76_greeks_chain call (per-
+strike forward and T) on a pool of worker processes. Results are appended to
+one file per column in --output (columns.json lists them, load() maps them):
+
+    python Scripts/replay.py Data/option_archive raw_chains/ --output replay_out
+"""
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from market_calendar import IST
+
+BATCH_STRIKES = 50000
+# IST has no daylight saving, local time is epoch seconds plus this offset
+IST_OFFSET = 5 * 3600 + 30 * 60
+
+OUTPUT_COLUMNS = [
+    ('time', '<i8'), ('symbol', 'S16'), ('expiry', '<i4'), ('strike', '<f8'),
+    ('future', '<f8'), ('tte', '<f8'), ('call_iv', '<f8'), ('put_iv', '<f8'), ('iv', '<f8'),
+    ('call_delta', '<f8'), ('put_delta', '<f8'), ('gamma', '<f8'), ('vega', '<f8'),
+    ('theta', '<f8'), ('rho_call', '<f8'), ('rho_put', '<f8'),
+]
+GREEK_COLUMNS = {'call_delta': 'CallDelta', 'put_delta': 'PutDelta', 'gamma': 'Gamma', 'vega': 'Vega',
+                 'theta': 'Theta', 'rho_call': 'RhoCall', 'rho_put': 'RhoPut'}
+
+
+class Snapshot(NamedTuple):
+    time: int           # epoch seconds
+    symbol: str
+    expiry: date
+    spot: float
+    future: float       # NaN: derived from put-call parity
+    strikes: object     # float arrays, sorted by strike
+    call_ltp: object
+    put_ltp: object
+
+
+def _snapshot(time_, symbol, expiry, spot, future, strikes, calls, puts) -> Snapshot:
+    import numpy as np
+
+    strikes = np.asarray(strikes, dtype=float)
+    order = np.argsort(strikes, kind='stable')
+    return Snapshot(int(time_), symbol, expiry, float(spot), float(future), strikes[order],
+                    np.asarray(calls, dtype=float)[order], np.asarray(puts, dtype=float)[order])
+
+
+def read_nse_json(path: str, symbol: str) -> Iterator[Snapshot]:
+    from chain_archive import parse_nse_timestamp
+
+    with open(path) as f:
+        data = json.load(f)
+    records = data['records']
+    stamp = parse_nse_timestamp(data)
+    epoch = stamp.timestamp() if stamp else os.path.getmtime(path)
+    default_expiry = (records.get('expiryDates') or [None])[0]
+
+    by_expiry: Dict[str, List] = {}
+    for item in records['data']:
+        ce, pe = item.get('CE') or {}, item.get('PE') or {}
+        expiry = item.get('expiryDates') or item.get('expiryDate') or ce.get('expiryDate') \
+            or pe.get('expiryDate') or default_expiry
+        by_expiry.setdefault(expiry, []).append(
+            (item['strikePrice'], ce.get('lastPrice') or 0, pe.get('lastPrice') or 0))
+    for expiry, rows in by_expiry.items():
+        if expiry is None:
+            continue
+        strikes, calls, puts = zip(*rows)
+        yield _snapshot(epoch, symbol, datetime.strptime(expiry, '%d-%b-%Y').date(),
+                        records.get('underlyingValue', float('nan')), float('nan'), strikes, calls, puts)
+
+
+def read_option_csv(path: str, symbol: str) -> Iterator[Snapshot]:
+    """An Option.csv as written by nifty_options (sentinel rows included)"""
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    expiry, spot, updated = None, float('nan'), None
+    strikes, calls, puts = [], [], []
+    for row in rows:
+        if (row.get('PUT LTP') or '').startswith('Expiry: '):
+            expiry = datetime.strptime(row['PUT LTP'][len('Expiry: '):], '%d-%b-%Y').date()
+            spot = float(row['STRIKE'])
+        elif row.get('PUT OI CHNG') == 'Update Time':
+            updated = row['PUT OI']
+        elif row.get('STRIKE') and row.get('CALL LTP'):
+            strikes.append(float(row['STRIKE']))
+            calls.append(float(row['CALL LTP'] or 0))
+            puts.append(float(row['PUT LTP'] or 0))
+    if expiry is None or not strikes:
+        return
+    # "26-Dec 15:30" carries no year: the latest one not after the expiry
+    epoch = os.path.getmtime(path)
+    if updated:
+        stamp = datetime.strptime(f"{updated} {expiry.year}", '%d-%b %H:%M %Y')
+        if stamp.date() > expiry:
+            stamp = stamp.replace(year=expiry.year - 1)
+        epoch = IST.localize(stamp).timestamp()
+    yield _snapshot(epoch, symbol, expiry, spot, float('nan'), strikes, calls, puts)
+
+
+def read_archive(path: str) -> Iterator[Snapshot]:
+    """Every snapshot of a chain_archive root (all days) or day segment"""
+    from chain_archive import EPOCH, ChainArchive, DaySegment
+
+    if os.path.exists(os.path.join(path, 'index.bin')):
+        segments = [DaySegment(path)]
+    else:
+        archive = ChainArchive(path)
+        segments = [archive.day(day) for day in archive.days()]
+    for segment in segments:
+        for position in segment.select():
+            entry = segment.index[position]
+            records = segment.snapshot(position)
+            yield _snapshot(entry['time'], entry['symbol'].decode(), EPOCH + timedelta(days=int(entry['expiry'])),
+                            entry['spot'], entry['future'], records['strike'], records['call_ltp'],
+                            records['put_ltp'])
+
+
+def _is_archive(path: str) -> bool:
+    if os.path.exists(os.path.join(path, 'index.bin')):
+        return True
+    return any(os.path.exists(os.path.join(path, name, 'index.bin')) for name in os.listdir(path))
+
+
+def iter_snapshots(paths: Iterable[str], symbol: str = 'NIFTY', stats: Optional[Dict] = None) -> Iterator[Snapshot]:
+    """Snapshots from every source in paths, files in name order"""
+    stats = stats if stats is not None else {}
+    for path in paths:
+        if os.path.isdir(path) and _is_archive(path):
+            stats['files'] = stats.get('files', 0) + 1
+            yield from read_archive(path)
+            continue
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+                           if name.endswith(('.json', '.csv')))
+        for file in files:
+            reader = read_nse_json if file.endswith('.json') else read_option_csv
+            try:
+                yield from reader(file, symbol)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Skipping {file}: {e}", file=sys.stderr)
+                stats['skipped'] = stats.get('skipped', 0) + 1
+            stats['files'] = stats.get('files', 0) + 1
+
+
+def tte_for_times(times, expiry: date, dayCountType) -> object:
+    """Years to expiry for epoch-second times and one expiry.
+
+    The calendar is evaluated once per day (at local midnight); within a day
+    days to expiry fall linearly with the time of day in every day count.
+    """
+    import numpy as np
+    from iv_calculator import days_to_expiry, time_to_expiry
+
+    local = np.asarray(times, dtype=np.int64) + IST_OFFSET
+    days = local // 86400
+    tte = np.empty(len(local))
+    for day in np.unique(days):
+        mask = days == day
+        midnight = datetime(1970, 1, 1) + timedelta(days=int(day))
+        dte = float(days_to_expiry(midnight, expiry, dayCountType))
+        years = float(time_to_expiry(midnight, expiry, dayCountType))
+        if dte == 0:
+            tte[mask] = [float(time_to_expiry(datetime(1970, 1, 1) + timedelta(seconds=int(t)), expiry, dayCountType))
+                         for t in local[mask]]
+            continue
+        tte[mask] = (dte - (local[mask] - day * 86400) / 86400) * (years / dte)
+    return tte
+
+
+def parity_forward(snapshot: Snapshot, tte: float, interestRate: float = 0.0) -> float:
+    """Forward from put-call parity at the traded strike nearest spot (or
+    where calls and puts are closest in price when spot is unknown)"""
+    import numpy as np
+
+    both = (snapshot.call_ltp > 0) & (snapshot.put_ltp > 0)
+    if not both.any():
+        return float('nan')
+    strikes, calls, puts = snapshot.strikes[both], snapshot.call_ltp[both], snapshot.put_ltp[both]
+    if np.isfinite(snapshot.spot):
+        i = np.argmin(np.abs(strikes - snapshot.spot))
+    else:
+        i = np.argmin(np.abs(calls - puts))
+    return float(strikes[i] + (calls[i] - puts[i]) * np.exp(interestRate / 100 * max(tte, 0.0)))
+
+
+def assemble(snapshots: List[Snapshot], dayCountType, interestRate: float = 0.0) -> Dict:
+    """One expiry's snapshots as flat per-strike arrays for price_batch"""
+    import numpy as np
+
+    tte = tte_for_times([s.time for s in snapshots], snapshots[0].expiry, dayCountType)
+    futures = []
+    for s, t in zip(snapshots, tte):
+        futures.append(s.future if np.isfinite(s.future) and s.future > 0 else parity_forward(s, t, interestRate))
+    counts = np.array([len(s.strikes) for s in snapshots])
+    strikes = np.concatenate([s.strikes for s in snapshots])
+    calls = np.concatenate([s.call_ltp for s in snapshots])
+    puts = np.concatenate([s.put_ltp for s in snapshots])
+    # Strikes with no trade on either side are not priced
+    keep = ((calls > 0) | (puts > 0)) & (strikes > 0)
+    return {
+        'time': np.repeat([s.time for s in snapshots], counts)[keep],
+        'symbol': np.repeat(np.array([s.symbol.encode()[:16] for s in snapshots], dtype='S16'), counts)[keep],
+        'expiry': np.full(int(keep.sum()), (snapshots[0].expiry - date(1970, 1, 1)).days, dtype=np.int32),
+        'strike': strikes[keep],
+        'future': np.repeat(np.asarray(futures, dtype=float), counts)[keep],
+        'tte': np.repeat(tte, counts)[keep],
+        'call_ltp': calls[keep],
+        'put_ltp': puts[keep],
+        'interestRate': interestRate,
+    }
+
+
+def price_batch(batch: Dict) -> Dict:
+    """IVs and Greeks for an assembled batch (runs in a worker process)"""
+    import numpy as np
+    from iv_calculator import black76_greeks_chain, implied_vol_chain
+
+    start = time.perf_counter()
+    F, T, K = batch['future'], batch['tte'], batch['strike']
+    usable = np.isfinite(F) & np.isfinite(T)
+    F, T = np.where(usable, F, 0.0), np.where(usable, T, 0.0)
+    callIV, putIV = implied_vol_chain(F, T, K, batch['call_ltp'], batch['put_ltp'],
+                                      interestRate=batch['interestRate'])
+    solved = time.perf_counter()
+
+    out = {name: batch[name] for name in ('time', 'symbol', 'expiry', 'strike', 'future', 'tte')}
+    # OTM side's IV for the strike, as nifty_options reports it
+    iv = np.where(K >= F, callIV, putIV)
+    usable &= (F > 0) & (T > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        greeks = black76_greeks_chain(np.where(usable, F, 1.0), np.where(usable, T, 1.0), K, iv,
+                                      callIV, putIV, interestRate=batch['interestRate'])
+    for column, field in GREEK_COLUMNS.items():
+        out[column] = np.where(usable, greeks[field], np.nan)
+    out['call_iv'] = np.where(usable, callIV, np.nan)
+    out['put_iv'] = np.where(usable, putIV, np.nan)
+    out['iv'] = np.where(usable, iv, np.nan)
+    out['timings'] = {'solve': solved - start, 'greeks': time.perf_counter() - solved}
+    return out
+
+
+class ColumnWriter:
+    """Appends batches to one raw file per column under root"""
+
+    def __init__(self, root: str) -> None:
+        import numpy as np
+
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.dtypes = {name: np.dtype(t) for name, t in OUTPUT_COLUMNS}
+        with open(os.path.join(root, 'columns.json'), 'w') as f:
+            json.dump({'columns': OUTPUT_COLUMNS}, f, indent=2)
+        for name in self.dtypes:
+            open(os.path.join(root, f'{name}.bin'), 'wb').close()
+        self.rows = 0
+
+    def write(self, result: Dict) -> None:
+        for name, dtype in self.dtypes.items():
+            with open(os.path.join(self.root, f'{name}.bin'), 'ab') as f:
+                f.write(result[name].astype(dtype, copy=False).tobytes())
+        self.rows += len(result['strike'])
+
+
+def load(root: str) -> Dict:
+    """Replay output as {column: read-only memmap}"""
+    import numpy as np
+
+    with open(os.path.join(root, 'columns.json')) as f:
+        columns = json.load(f)['columns']
+    out = {}
+    for name, dtype in columns:
+        path = os.path.join(root, f'{name}.bin')
+        dtype = np.dtype(dtype)
+        count = os.path.getsize(path) // dtype.itemsize
+        out[name] = np.memmap(path, dtype=dtype, mode='r', shape=(count,)) if count else np.zeros(0, dtype)
+    return out
+
+
+def batches(snapshots: Iterable[Snapshot], batch_strikes: int = BATCH_STRIKES) -> Iterator[List[Snapshot]]:
+    """Snapshots grouped by (symbol, expiry), each group emitted once it
+    holds batch_strikes strikes (and the remainders at the end)"""
+    pending: Dict = {}
+    sizes: Dict = {}
+    for snapshot in snapshots:
+        key = (snapshot.symbol, snapshot.expiry)
+        pending.setdefault(key, []).append(snapshot)
+        sizes[key] = sizes.get(key, 0) + len(snapshot.strikes)
+        if sizes[key] >= batch_strikes:
+            yield pending.pop(key)
+            del sizes[key]
+    yield from pending.values()
+
+
+def replay(paths: List[str], output: str, workers: int = 0, batch_strikes: int = BATCH_STRIKES,
+           dayCountType=None, interestRate: float = 0.0, symbol: str = 'NIFTY',
+           progress: float = 5.0) -> Dict:
+    """Run the replay; returns counts and per-stage timings in seconds"""
+    from iv_calculator import DayCountType
+
+    dayCountType = DayCountType.CALENDARDAYS if dayCountType is None else dayCountType
+    workers = (os.cpu_count() or 1) if workers <= 0 else workers
+    stages = {'read': 0.0, 'assemble': 0.0, 'solve': 0.0, 'greeks': 0.0, 'write': 0.0}
+    stats = {'files': 0, 'skipped': 0, 'snapshots': 0, 'strikes': 0}
+    writer = ColumnWriter(output)
+    start = last = time.perf_counter()
+
+    def collect(result):
+        nonlocal last
+        for stage, seconds in result.pop('timings').items():
+            stages[stage] += seconds
+        t0 = time.perf_counter()
+        writer.write(result)
+        stages['write'] += time.perf_counter() - t0
+        stats['strikes'] = writer.rows
+        if progress and time.perf_counter() - last >= progress:
+            last = time.perf_counter()
+            elapsed = last - start
+            print(f"  {stats['files']} files, {stats['snapshots']} snapshots, {writer.rows} strikes, "
+                  f"{writer.rows / elapsed * 60:,.0f} strikes/min", file=sys.stderr)
+
+    def timed_snapshots():
+        source = iter_snapshots(paths, symbol, stats)
+        while True:
+            t0 = time.perf_counter()
+            snapshot = next(source, None)
+            stages['read'] += time.perf_counter() - t0
+            if snapshot is None:
+                return
+            stats['snapshots'] += 1
+            yield snapshot
+
+    def assembled():
+        for group in batches(timed_snapshots(), batch_strikes):
+            t0 = time.perf_counter()
+            batch = assemble(group, dayCountType, interestRate)
+            stages['assemble'] += time.perf_counter() - t0
+            yield batch
+
+    if workers == 1:
+        for batch in assembled():
+            collect(price_batch(batch))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # A bounded number of batches in flight keeps memory flat; results
+        # are written in submission order
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            inflight = deque()
+            for batch in assembled():
+                inflight.append(pool.submit(price_batch, batch))
+                if len(inflight) >= 2 * workers:
+                    collect(inflight.popleft().result())
+            while inflight:
+                collect(inflight.popleft().result())
+
+    stats['wall'] = time.perf_counter() - start
+    stats['workers'] = workers
+    stats['stages'] = stages
+    return stats
+
+
+def main():
+    import argparse
+
+    import metrics
+
+    from iv_calculator import DayCountType
+
+    parser = argparse.ArgumentParser(description="Replay archived option chains through the IV/Greeks solver")
+    parser.add_argument('paths', nargs='+', help="JSON/CSV files, directories or chain archives")
+    parser.add_argument('--output', default='replay_out', help="directory for the column files")
+    parser.add_argument('--workers', type=int, default=0, help="worker processes (0: one per CPU)")
+    parser.add_argument('--batch-strikes', type=int, default=BATCH_STRIKES)
+    parser.add_argument('--day-count', choices=[d.name.lower() for d in DayCountType], default='calendardays')
+    parser.add_argument('--rate', type=float, default=0.0, help="interest rate in percent")
+    parser.add_argument('--symbol', default='NIFTY', help="symbol for JSON/CSV sources")
+    parser.add_argument('--progress', type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    with metrics.run('replay'):
+        stats = replay(args.paths, args.output, args.workers, args.batch_strikes,
+                       DayCountType[args.day_count.upper()], args.rate, args.symbol, args.progress)
+        # Timed in the workers, so recorded here rather than spanned
+        for stage, seconds in stats['stages'].items():
+            metrics.record(stage, seconds)
+        metrics.add(rows=stats['strikes'])
+    wall = stats['wall']
+    print(f"{stats['files']} sources ({stats['skipped']} skipped), {stats['snapshots']} snapshots, "
+          f"{stats['strikes']} strikes in {wall:.2f}s on {stats['workers']} workers "
+          f"({stats['strikes'] / wall * 60 if wall else 0:,.0f} strikes/min)")
+    for stage, seconds in stats['stages'].items():
+        note = ' (summed over workers)' if stage in ('solve', 'greeks') else ''
+        print(f"  {stage:9} {seconds:8.3f}s{note}")
+    print(f"Columns written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
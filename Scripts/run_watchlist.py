@@ -0,0 +1,142 @@
+"""Run the MyWatchList collectors concurrently in one process.
+
+Each collector is imported and its entry point run in a daemon thread, so
+interpreter startup and the pandas import are paid once and a slow source
+only delays itself. A task starts once the tasks it depends on have
+finished (whether or not they succeeded); a task that raises, exits or
+runs past its timeout is reported and the others carry on. Usage:
+
+    python Scripts/run_watchlist.py [--only eco cash] [--timeout 90]
+
+Exits non-zero only when every task failed.
+"""
+import argparse
+import importlib
+import os
+import sys
+import threading
+import time
+import traceback
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from output_store import changed_outputs
+
+# name -> (entry point, tasks it waits for, timeout in seconds)
+TASKS = {
+    "fetch_and_save": ("main", [], 60),
+    "nifty50_top10": ("main", [], 60),
+    "etf_fetch": ("main", [], 60),
+    "global_data": ("main", [], 60),
+    "global_commodity": ("main", [], 60),
+    "eco": ("main", [], 60),
+    "cash": ("main", [], 60),
+    "nifty_options": ("main", [], 120),
+}
+
+
+class Task:
+    def __init__(self, name, entry, deps, timeout):
+        self.name = name
+        self.entry = entry
+        self.deps = deps
+        self.timeout = timeout
+        self.status = "pending"
+        self.error = ""
+        self.started = None
+        self.elapsed = None
+        self.done = threading.Event()
+
+    def run(self):
+        self.started = time.perf_counter()
+        self.status = "running"
+        status, error = "ok", ""
+        try:
+            module = importlib.import_module(self.name)
+            getattr(module, self.entry)()
+        except SystemExit as e:
+            # Collectors exit with a message on fatal errors, 0/None is success
+            if e.code not in (None, 0):
+                status, error = "failed", str(e.code)
+        except BaseException as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            # A task already reported as timed out keeps that status
+            if self.status == "running":
+                self.status, self.error = status, error
+                self.elapsed = time.perf_counter() - self.started
+            self.done.set()
+
+
+def run_tasks(tasks):
+    """Start tasks as their dependencies finish, wait for each up to its timeout"""
+    threads = {}
+
+    def start(task):
+        for dep in task.deps:
+            if dep in tasks:
+                tasks[dep].done.wait()
+        if task.status == "pending":
+            task.run()
+
+    for task in tasks.values():
+        # Each collector's stages are recorded under its name in this run
+        threads[task.name] = threading.Thread(target=metrics.bind(start), args=(task,), name=task.name, daemon=True)
+        threads[task.name].start()
+
+    for task in tasks.values():
+        # The clock starts when the task does, dependencies are not charged
+        while not task.done.is_set():
+            if task.started is not None and time.perf_counter() - task.started >= task.timeout:
+                break
+            task.done.wait(0.05)
+        if not task.done.is_set():
+            task.status = "timeout"
+            task.elapsed = time.perf_counter() - task.started
+            task.error = f"still running after {task.timeout}s"
+            # Dependents must not wait on a task that will not finish
+            task.done.set()
+    return tasks
+
+
+def print_summary(tasks, total):
+    print(f"\n{'task':18} {'status':8} {'seconds':>8}  error")
+    for task in sorted(tasks.values(), key=lambda t: t.elapsed or 0, reverse=True):
+        elapsed = f"{task.elapsed:.2f}" if task.elapsed is not None else "-"
+        print(f"{task.name:18} {task.status:8} {elapsed:>8}  {task.error}")
+    print(f"Total wall time: {total:.2f}s")
+    changed = changed_outputs()
+    print(f"Outputs changed: {', '.join(changed) if changed else 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(TASKS), help="run just these tasks")
+    parser.add_argument("--timeout", type=float, help="override every task timeout (seconds)")
+    args = parser.parse_args()
+
+    names = args.only or list(TASKS)
+    tasks = {
+        name: Task(name, TASKS[name][0], TASKS[name][1], args.timeout or TASKS[name][2])
+        for name in names
+    }
+
+    start = time.perf_counter()
+    with metrics.run("run_watchlist"):
+        run_tasks(tasks)
+        metrics.annotate(tasks={t.name: t.status for t in tasks.values()})
+    print_summary(tasks, time.perf_counter() - start)
+
+    failed = [t for t in tasks.values() if t.status != "ok"]
+    code = 1 if failed and len(failed) == len(tasks) else 0
+    if any(t.status == "timeout" for t in tasks.values()):
+        # Don't wait at exit for threads still blocked on the network
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
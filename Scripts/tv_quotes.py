@@ -0,0 +1,193 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import metrics
+from http_client import get_client as get_http_client
+
+SCANNER_URL = os.getenv('TV_SCANNER_URL', 'https://scanner.tradingview.com/symbol')
+QUOTE_FIELDS = ("close[1]", "change_abs", "price_52_week_high", "price_52_week_low", "close", "change")
+MAX_WORKERS = int(os.getenv('TV_MAX_WORKERS', '16'))
+
+# Quotes are reused for QUOTE_TTL seconds, across scripts through the cache
+# file (an empty TV_QUOTE_CACHE keeps the cache in-process only)
+QUOTE_TTL = float(os.getenv('TV_QUOTE_TTL', '60'))
+QUOTE_CACHE_FILE = os.getenv('TV_QUOTE_CACHE', os.path.join(tempfile.gettempdir(), 'tv_quote_cache.json'))
+CACHE_MAX_AGE = 24 * 3600
+
+headers = {'User-Agent': 'Mozilla/5.0'}
+
+_session = None
+_session_lock = threading.Lock()
+
+# symbol -> [{"time", "fields", "data"}], one entry per field set
+_cache: Dict[str, List[Dict]] = {}
+_cache_loaded = False
+_cache_dirty = False
+_inflight: Dict[tuple, Future] = {}
+_cache_lock = threading.Lock()
+
+
+def get_session():
+    """Shared keep-alive session; its pool holds MAX_WORKERS connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.headers.update(headers)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _request_quote(symbol, fields, timeout, url):
+    try:
+        # Retries, hedging and the scanner's breaker come from http_client
+        response = get_http_client().request(
+            'GET', f"{url or SCANNER_URL}?symbol={symbol}&fields={','.join(fields)}&no_404=true",
+            session=get_session(), timeout=timeout,
+        )
+        # A 4xx error body is not a quote; None is not cached
+        if not response.ok:
+            return None
+        with metrics.span('decode'):
+            return response.json()
+    except (OSError, ValueError):
+        return None
+
+
+def _read_cache_file():
+    if not QUOTE_CACHE_FILE:
+        return {}
+    try:
+        with open(QUOTE_CACHE_FILE) as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge(cache, symbol, entry):
+    """Add entry, replacing an older one for the same field set"""
+    entries = cache.get(symbol, [])
+    same = [e for e in entries if set(e["fields"]) == set(entry["fields"])]
+    if same and same[0]["time"] >= entry["time"]:
+        return
+    cache[symbol] = [e for e in entries if e not in same] + [entry]
+
+
+def _lookup(symbol, fields, ttl):
+    """Fresh cached quote covering fields (a quote with more fields will do)"""
+    now = time.time()
+    for entry in sorted(_cache.get(symbol, []), key=lambda e: e["time"], reverse=True):
+        if now - entry["time"] <= ttl and fields <= set(entry["fields"]):
+            return {k: v for k, v in entry["data"].items() if k in fields or k not in entry["fields"]}
+    return None
+
+
+def save_cache() -> None:
+    """Merge new quotes into the cache file (atomic replace)"""
+    global _cache_dirty
+    with _cache_lock:
+        if not (_cache_dirty and QUOTE_CACHE_FILE):
+            return
+        cache = _read_cache_file()
+        for symbol, entries in _cache.items():
+            for entry in entries:
+                _merge(cache, symbol, entry)
+        cutoff = time.time() - CACHE_MAX_AGE
+        cache = {s: [e for e in entries if e["time"] >= cutoff] for s, entries in cache.items()}
+        tmp = f"{QUOTE_CACHE_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({s: entries for s, entries in cache.items() if entries}, f)
+            os.replace(tmp, QUOTE_CACHE_FILE)
+            _cache_dirty = False
+        except OSError:
+            pass
+
+
+def _cached_quote(symbol, fields, timeout, url, ttl):
+    global _cache_loaded, _cache_dirty
+    fields = tuple(fields)
+    key = (symbol, frozenset(fields))
+    ttl = QUOTE_TTL if ttl is None else ttl
+    with _cache_lock:
+        if not _cache_loaded:
+            for cachedSymbol, entries in _read_cache_file().items():
+                for entry in entries:
+                    _merge(_cache, cachedSymbol, entry)
+            _cache_loaded = True
+        if ttl > 0:
+            hit = _lookup(symbol, key[1], ttl)
+            if hit is not None:
+                return hit
+        # Concurrent requests for the same quote share one network call
+        pending = _inflight.get(key)
+        owner = pending is None
+        if owner:
+            pending = _inflight[key] = Future()
+    if not owner:
+        return pending.result()
+
+    data = None
+    try:
+        data = _request_quote(symbol, fields, timeout, url)
+    finally:
+        with _cache_lock:
+            if isinstance(data, dict) and ttl > 0:
+                _merge(_cache, symbol, {"time": time.time(), "fields": list(fields), "data": data})
+                _cache_dirty = True
+            del _inflight[key]
+        pending.set_result(data)
+    return data
+
+
+def fetch_quote(symbol: str, fields: Sequence[str] = QUOTE_FIELDS, timeout: float = 5,
+                url: Optional[str] = None, ttl: Optional[float] = None) -> Optional[Dict]:
+    """One scanner quote as a dict, None when the request or JSON fails.
+
+    A quote for the symbol with these fields (or more) younger than ttl
+    seconds is served from the cache; ttl defaults to QUOTE_TTL and 0
+    always fetches.
+    """
+    data = _cached_quote(symbol, fields, timeout, url, ttl)
+    save_cache()
+    return data
+
+
+def fetch_quotes(symbols: Sequence[str], fields: Sequence[str] = QUOTE_FIELDS, timeout: float = 5,
+                 deadline: Optional[float] = None, max_workers: int = MAX_WORKERS,
+                 url: Optional[str] = None, ttl: Optional[float] = None) -> List[Optional[Dict]]:
+    """Fetch symbols concurrently, results in the order given.
+
+    At most max_workers requests are in flight. timeout applies to each
+    request (connect and read); deadline, if set, bounds the whole batch and
+    anything still pending then comes back as None like a failed request.
+    The cache is used as in fetch_quote.
+    """
+    if not symbols:
+        return []
+    start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols))))
+    futures = [pool.submit(metrics.bind(_cached_quote), symbol, fields, timeout, url, ttl) for symbol in symbols]
+    results = []
+    for future in futures:
+        remaining = None if deadline is None else max(0, deadline - (time.monotonic() - start))
+        try:
+            results.append(future.result(timeout=remaining))
+        except Exception:
+            results.append(None)
+    # Late requests finish in the background, nothing waits for them
+    pool.shutdown(wait=False, cancel_futures=True)
+    save_cache()
+    return results